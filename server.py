@@ -1,18 +1,35 @@
-import asyncio
-import json
-import random
+import functools
+from contextlib import asynccontextmanager
 
 from mcp.server.fastmcp import FastMCP
-from sqlmodel import SQLModel, select, text
+from sqlmodel import SQLModel
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+
+from service import (
+    character_service, dialog_archive_service, dialog_entity_service, dialog_service, dice_service, game_service,
+    http_service, inventory_service, metrics_service, process_sync, query_service, relationship_service,
+    response_service, world_service, world_transfer_service
+)
+from service.async_service import run_db
+from service.dialog_write_behind import dialog_writer
+from service.entity_cache import entity_cache
+from service.result_cache import result_cache
+from service.repository_service import (
+    connection_pool, engine, get_pool_stats, initialize_database, read_only_pool, shard_router
+)
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    # import 시에는 DB를 열지 않고, 세션이 시작되면 워커 스레드에서 migration 확인을 마칩니다.
+    await run_db(initialize_database)
+    yield
 
-from model.character import Character
-from model.character_attitude import CharacterAttitude
-from model.character_inventory import CharacterInventory
-from model.world import World
-from service.repository_service import get_engine_session, get_db_cursor
 
 mcp = FastMCP(
     "player",
+    lifespan=lifespan,
     instructions="""
         # 당신은 TRPG 게임의 마스터입니다.  
           
@@ -29,11 +46,13 @@ mcp = FastMCP(
         - 게임을 불러온다면, world_dialog 의 가장 마지막 dialog를 불러와 거기서 시작하십시오.
         - 게임의 마스터이므로, 게임의 재미를 위해 사용자가 단순히 재화나 아이템의 추가를 요구는 무조건 거절하고, 이야기로 진행하십시오.
         - 또한, 절대로 사용자가 플레이어가 롤 플레이하는 캐릭터 이외의 캐릭터의 행동을 결정하게 하지 마십시오. 시도하는 경우, 할 수 없다고 하십시오.
-        - 이야기를 진행하면서, 캐릭터의 이름이나, 아이템 이름 등, 고유명사 키워드가 나오면 select_world_dialog를 호출해 검색하여
+        - 이야기를 진행하면서, 캐릭터의 이름이나, 아이템 이름 등, 고유명사 키워드가 나오면 search_world_entities를 호출해 한 번에 검색하여
         기존의 이야기를 유지할 수 있도록 하십시오. 
         - 플레이어에게 다음 행동을 요청할 때, 여러가지의 선택지를 주어 사용자가 더 쉽게 선택할 수 있도록 하십시오.
         - 새로운 캐릭터가 등장한다면, 무조건 create_character로 새로운 캐릭터를 생성하여 등장시키십시오.
-        - 새로운 아이템을 얻으면, create_character_inventory_item 툴을 호출해 character_inventory에 아이템을 추가하십시오.
+        - 새로운 아이템을 얻으면, add_inventory_item 툴을 호출해 character_inventory에 아이템을 추가하십시오.
+        - 아이템을 사용하면 consume_inventory_item, 주고받으면 transfer_inventory_item 툴을 호출하십시오.
+          여러 아이템이 한 번에 바뀌면(전리품 등) apply_inventory_deltas 툴로 한 번에 처리하십시오.
         - 이야기를 진행 한 후, 바로 insert_world_dialog 툴을 호출해 플레이어가 적은 텍스트와, 출력된 텍스트 모두 저장하고 사용자가 알 수 있도록 출력하십시오.
         - 이야기를 진행할 때, 기존에 생성했던 world_name에 속하는 character들을 계속 주시하며 낮은 빈도로 재등장시키는것이 권장됩니다.
         이는 스토리의 퀄리티를 높이기 위함입니다.
@@ -44,7 +63,7 @@ mcp = FastMCP(
         - 어떤 문제를 해결해야 할 때, 각 스탯별로 할 수 있는 행동을 구별하십시오.
         - 평범한 행동의 스탯 기준은 6입니다. 쉬운 행동이라면 그만큼 수치를 줄이십시오. 어려운 행동이라면 그 만큼 수치를 높이십시오.
         - 아이템이 있는지 확인하여, 적절하다면 사용할 수 있도록 행동을 제시하십시오.
-        - 아이템을 사용한다면, 해당 아이템의 갯수를 사용한 만큼 빼고, update하십시오. 0 개면 전부 소모한 것이므로, 사용 불가능합니다.
+        - 아이템을 사용한다면, consume_inventory_item 툴로 사용한 만큼 빼십시오. 갯수가 모자라면 오류가 나며, 사용 불가능합니다.
         - is_action_successful 툴을 사용해 특정 스탯을 사용하는 행동이 성공적이었는지 판단하십시오.
         - 모든 행동은 실패할 수 있습니다.
         
@@ -58,7 +77,12 @@ def get_schema() -> str:
     사용할 모든 Database의 이름과 그 내용을 포함합니다.
     query_data 툴을 사용하기 전에, 여기서 어떤 table이 어떤 구조를 가지고 있는지 이해하고 사용하십시오.
     """
+    return _schema_json()
 
+
+@functools.cache
+def _schema_json() -> str:
+    # 모델은 실행 중에 바뀌지 않으므로 한 번만 직렬화합니다.
     result = []
     for table_name, table in SQLModel.metadata.tables.items():
         table_info = {
@@ -78,43 +102,56 @@ def get_schema() -> str:
 
         result.append(table_info)
 
-    return json.dumps(result)
+    return response_service.dumps(result)
+
+
+@mcp.resource("metrics://main")
+def get_metrics() -> str:
+    """
+    툴별 호출 수, 오류 수, 지연 시간 분포, SQL 문장 수와 읽은 행 수, 응답 크기와
+    SQL 문장별 실행 시간, 느린 쿼리의 EXPLAIN QUERY PLAN, 연결 풀과 캐시 통계를 포함합니다.
+    """
+    return response_service.dumps({
+        **metrics_service.metrics.snapshot(),
+        'pool': get_pool_stats(),
+        'entity_cache': entity_cache.stats(),
+        'result_cache': result_cache.stats(),
+        'dialog_write_behind': dialog_writer.stats(),
+        'process_sync': process_sync.stats(),
+    })
 
 
 @mcp.tool()
-def select_data(sql: str) -> str:
+async def select_data(
+        sql: str,
+
+        max_rows: int = query_service.SELECT_MAX_ROWS,
+        max_bytes: int = query_service.SELECT_MAX_BYTES,
+        world_name: str | None = None
+) -> str:
     """
     SELECT 전용입니다. SELECT만 호출하십시오.
     player_name이 무엇인지 모르면 절대 호출하지 마십시오.
     주어진 player_name에 한한 명령만 수행하여야 합니다.
     절대로 다른 player_name에도 영향을 줄 수 있는 쿼리를 수행하지 마십시오.
+    읽기 전용으로 실행되며, 최대 max_rows개, max_bytes 크기까지만 반환됩니다. truncated가 true라면 결과가 잘린 것입니다.
+    결과의 rows는 columns 순서의 값 배열입니다.
+    warnings가 있다면 테이블 전체를 읽는 쿼리이므로 world_name 조건이나 LIMIT을 추가하십시오.
+    world의 데이터를 읽을 때는 world_name을 함께 넘기십시오. 넘기지 않으면 sql에 world_name = '...' 조건이 하나만 있어야 합니다.
     """
-
-    session = next(get_engine_session())
-
-    query_result = session.exec(text(sql)).mappings().all()
-
-    result = []
-
-    for query_result_row in query_result:
-        result.append(dict(query_result_row))
-
-    return json.dumps(result)
+    return await run_db(query_service.select_data, sql, max_rows, max_bytes, world_name=world_name)
 
 
 @mcp.tool()
-def upsert_data(sql: str):
+async def upsert_data(sql: str, world_name: str | None = None):
     """
     UPDATE나 INSERT 전용입니다. UPDATE나 INSERT만 호출하십시오.
     player_name이 무엇인지 모르면 절대 호출하지 마십시오.
     주어진 player_name에 한한 명령만 수행하여야 합니다.
     절대로 다른 player_name에도 영향을 줄 수 있는 쿼리를 수행하지 마십시오.
+    world의 데이터를 바꿀 때는 world_name을 함께 넘기십시오. INSERT의 VALUES에 있는 world_name으로는 world를 알 수 없습니다.
     """
-    session = next(get_engine_session())
-
-    session.exec(text(sql))
-
-    session.commit()
+    await run_db(query_service.upsert_data, sql, world_name)
 
 
 @mcp.tool()
@@ -123,28 +160,67 @@ async def create_world(world_name: str, world_description: str) -> str:
     새로운 세계를 생성합니다. 캐릭터를 생성하기 전에, 세상이 있어야 합니다.
     world_description에 진행할 게임의 세계관을 기재하여야 합니다.
     """
+    new_world = await run_db(world_service.create_world, world_name, world_description)
+
+    return response_service.dumps(new_world)
+
+
+@mcp.tool()
+async def get_world(world_name: str, fields: list[str] | None = None) -> str:
+    """
+    게임을 불러올 때, world_name에 해당하는 세계의 world_description을 확인하십시오.
+    fields로 필요한 컬럼만 받을 수 있습니다.
+    """
+    target_world = await run_db(world_service.get_world, world_name)
+
+    return response_service.dumps(response_service.project(target_world, fields))
+
 
-    session = next(get_engine_session())
+@mcp.tool()
+async def list_worlds(
+        limit: int = 100,
+        offset: int = 0,
+        fields: list[str] | None = None,
+        max_bytes: int = response_service.RESPONSE_MAX_BYTES
+) -> str:
+    """
+    생성된 세계의 목록을 world_name 순으로 확인합니다. 불러올 게임의 world_name을 모를 때 호출하십시오.
+    이름만 필요하면 fields에 ["world_name"]을 지정하십시오. max_bytes를 넘으면 truncated가 true입니다.
+    """
+    worlds = await run_db(world_service.list_worlds, limit, offset)
 
-    new_world = World()
+    return response_service.encode_row_set(worlds, world_service.WORLD_COLUMNS, fields, None, max_bytes)
 
-    new_world.world_name = world_name
-    new_world.world_description = world_description
 
-    session.add(new_world)
-    session.commit()
+@mcp.tool()
+async def load_game(
+        world_name: str,
 
-    return json.dumps(dict(new_world))
+        dialog_limit: int = game_service.RESUME_DIALOG_LIMIT,
+        max_dialog_bytes: int = game_service.RESUME_DIALOG_MAX_BYTES,
+        entity_limit: int = game_service.RESUME_ENTITY_LIMIT,
+        fields: dict[str, list[str]] | None = None
+) -> str:
+    """
+    게임을 불러올 때, 다른 툴들을 여러 번 호출하는 대신 이 툴을 먼저 한 번 호출하십시오.
+    world의 world_description, 모든 character와 스탯, 0개가 아닌 character_inventory, character_attitude,
+    가장 최근의 dialog_limit개의 world_dialog를 한 번에 반환합니다.
+    fields에 {"character": ["character_name", "situation"]} 처럼 섹션별로 필요한 컬럼만 지정할 수 있으며, 빈 목록이면 해당 섹션을 생략합니다.
+    world 외의 섹션은 columns와 rows(columns 순서의 값 배열)로 반환되며, truncated에 포함된 섹션은 잘린 것입니다. next_dialog_cursor가 있다면 select_all_before_dialogs의 cursor로 더 이전의 이야기를 불러올 수 있습니다.
+    """
+    game = await run_db(game_service.load_game, world_name, dialog_limit, max_dialog_bytes, entity_limit, fields)
 
+    return response_service.dumps(game)
 
 
 # region PLAYER
 
 @mcp.tool()
-def divide_character_stat(total_stat:int) -> str:
+async def divide_character_stat(total_stat: int, world_name: str | None = None) -> str:
     """
     게임 캐릭터를 생성할 때, 이 함수를 먼저 호출해서 캐릭터의 스탯을 결정하십시오.
     total_stat은 총 스탯합이며, 이를 무작위로 분배합니다.
+    world_name을 지정하면 해당 world의 난수 흐름을 사용합니다.
     모든 캐릭터의 스탯의 기준은 이하와 같습니다.
 
     - 총 스탯의 합이 30인 것이 평범한 사람의 기준입니다.
@@ -152,21 +228,20 @@ def divide_character_stat(total_stat:int) -> str:
     - 캐릭터가 평범한 사람보다 고등하다면 고등한 만큼 총 스탯의 합을 30보다 높게하십시오.
     - 각 스탯의 값은 6인 경우가 평범한 수준입니다.
     """
-    STAT_COUNT = 6
+    stats = await run_db(dice_service.divide_stats, [total_stat], world_name)
 
-    dividers = sorted(random.sample(range(1, total_stat), STAT_COUNT - 1))
+    return response_service.dumps(stats[0])
 
-    dividers = [0] + dividers + [total_stat]
-    result = [dividers[i + 1] - dividers[i] for i in range(STAT_COUNT)]
 
-    return json.dumps({
-        'stat_charisma': result[0],
-        'stat_strength': result[1],
-        'stat_wisdom': result[2],
-        'stat_dexterity': result[3],
-        'stat_intelligence': result[4],
-        'stat_constitution': result[5],
-    })
+@mcp.tool()
+async def divide_character_stats(total_stats: list[int], world_name: str | None = None) -> str:
+    """
+    여러 캐릭터(군중 NPC 등)를 한 번에 생성할 때, divide_character_stat을 여러 번 호출하는 대신 이 툴을 호출하십시오.
+    total_stats의 각 총 스탯합마다 divide_character_stat과 같은 방식으로 분배한 스탯을 순서대로 반환합니다.
+    """
+    stats = await run_db(dice_service.divide_stats, total_stats, world_name)
+
+    return response_service.dumps(stats)
 
 
 @mcp.tool()
@@ -181,7 +256,9 @@ async def create_character(
         stat_wisdom: int,
         stat_dexterity: int,
         stat_intelligence: int,
-        stat_constitution: int
+        stat_constitution: int,
+
+        fields: list[str] | None = None
 ) -> str:
     """
     world_name world에 속하는 character_name을 갖고 있는 캐릭터를 생성합니다.
@@ -190,30 +267,51 @@ async def create_character(
     해당 캐릭터의 성격과 특징을 characteristic에 상세하게 기재하십시오.
     캐릭터의 입체감을 위하여 해당 world_name에 속하는 world의 world_description을 참고하여
     situation에 생성할 캐릭터가 어떤 상황에 있는지를 기재해서 characteristic을 강화시키십시오.
+    생성된 캐릭터의 character_name과 스탯을 반환하며, 다른 컬럼이 필요하면 fields에 지정하십시오.
     """
+    new_character = await run_db(
+        character_service.create_character,
+        world_name,
+        character_name,
+        characteristic,
+        situation,
+
+        stat_charisma,
+        stat_strength,
+        stat_wisdom,
+        stat_dexterity,
+        stat_intelligence,
+        stat_constitution
+    )
+
+    return response_service.dumps(
+        response_service.project(new_character, fields or character_service.CHARACTER_RESPONSE_FIELDS)
+    )
 
-    session = next(get_engine_session())
-
-    new_character = Character()
-
-    new_character.world_name = world_name
-    new_character.character_name = character_name
-
-    new_character.characteristic = characteristic
-    new_character.situation = situation
 
-    # 스탯 분배
-    new_character.stat_constitution = stat_constitution
-    new_character.stat_strength = stat_strength
-    new_character.stat_intelligence = stat_intelligence
-    new_character.stat_dexterity = stat_dexterity
-    new_character.stat_wisdom = stat_wisdom
-    new_character.stat_charisma = stat_charisma
+@mcp.tool()
+async def create_characters(
+        world_name: str,
+        characters: list[dict],
 
-    session.add(new_character)
-    session.commit()
+        fields: list[str] | None = None
+) -> str:
+    """
+    한 장면에 여러 캐릭터가 새로 등장한다면, create_character를 여러 번 호출하는 대신 이 툴로 한 번에 생성하십시오.
+    characters의 각 항목은 create_character의 인자와 같은 character_name, characteristic, situation,
+    stat_charisma, stat_strength, stat_wisdom, stat_dexterity, stat_intelligence, stat_constitution을 가져야 합니다.
+    하나라도 잘못되면 아무 캐릭터도 생성되지 않습니다.
+    create_character처럼 character_name과 스탯만 반환하며, 다른 컬럼이 필요하면 fields에 지정하십시오.
+    """
+    new_characters = await run_db(character_service.create_characters, world_name, characters)
 
-    return json.dumps(dict(new_character))
+    return response_service.encode_row_set(
+        new_characters,
+        character_service.CHARACTER_COLUMNS,
+        fields or character_service.CHARACTER_RESPONSE_FIELDS,
+        None,
+        None
+    )
 
 
 @mcp.tool()
@@ -226,22 +324,111 @@ async def create_character_inventory_item(
         item_count: int
 ):
     """
-    world_name world에 속하는 캐릭터가 아이템을 획득하면, 이 함수를 호출하여 해당 아이템을 기록하십시오.
+    world_name world에 속하는 캐릭터의 아이템을 기록하십시오. 이미 있는 아이템이면 item_description, item_count를 덮어씁니다.
     item_description에 해당 아이템이 뭐하는 것인지 기재하십시오.
     item_count = 0이면 해당 아이템이 없는 것입니다.
+    개수를 더하거나 뺄 때는 add_inventory_item, consume_inventory_item을 사용하십시오.
     """
-    session = next(get_engine_session())
+    await run_db(
+        character_service.create_character_inventory_item,
+        world_name,
+        character_name,
 
-    new_item = CharacterInventory()
-    new_item.world_name = world_name
-    new_item.character_name = character_name
+        item_name,
+        item_description,
+        item_count
+    )
 
-    new_item.item_name = item_name
-    new_item.item_description = item_description
-    new_item.item_count = item_count
 
-    session.add(new_item)
-    session.commit()
+@mcp.tool()
+async def create_character_inventory_items(
+        world_name: str,
+        items: list[dict]
+):
+    """
+    world_name world에 속하는 캐릭터들이 여러 아이템을 한 번에 획득하면, 이 툴로 한 번에 기록하십시오.
+    items의 각 항목은 character_name, item_name, item_description, item_count를 가져야 합니다.
+    하나라도 잘못되면 아무 아이템도 기록되지 않습니다.
+    """
+    await run_db(character_service.create_character_inventory_items, world_name, items)
+
+
+@mcp.tool()
+async def add_inventory_item(
+        world_name: str,
+        character_name: str,
+
+        item_name: str,
+        count: int = 1,
+        item_description: str | None = None
+) -> str:
+    """
+    캐릭터가 아이템을 count개 얻으면 호출하십시오. 없던 아이템이면 만들고, 있던 아이템이면 개수를 더합니다.
+    새 아이템이면 item_description에 해당 아이템이 뭐하는 것인지 기재하십시오.
+    더한 뒤의 item_count를 반환합니다.
+    """
+    result = await run_db(inventory_service.add_item, world_name, character_name, item_name, count, item_description)
+
+    return response_service.dumps(result)
+
+
+@mcp.tool()
+async def consume_inventory_item(
+        world_name: str,
+        character_name: str,
+
+        item_name: str,
+        count: int = 1
+) -> str:
+    """
+    캐릭터가 아이템을 count개 사용하면 호출하십시오. 갯수를 읽고 다시 쓸 필요 없이 한 번에 뺍니다.
+    갯수가 모자라면 아무것도 바뀌지 않고 오류가 나므로, 그 행동은 할 수 없습니다.
+    뺀 뒤의 item_count를 반환합니다.
+    """
+    result = await run_db(inventory_service.consume_item, world_name, character_name, item_name, count)
+
+    return response_service.dumps(result)
+
+
+@mcp.tool()
+async def transfer_inventory_item(
+        world_name: str,
+        from_character_name: str,
+        to_character_name: str,
+
+        item_name: str,
+        count: int = 1
+) -> str:
+    """
+    from_character_name 캐릭터가 to_character_name 캐릭터에게 아이템을 count개 주면 호출하십시오.
+    두 캐릭터의 갯수가 함께 바뀌며, 보내는 캐릭터의 갯수가 모자라면 아무것도 바뀌지 않고 오류가 납니다.
+    """
+    result = await run_db(
+        inventory_service.transfer_item,
+        world_name,
+        from_character_name,
+        to_character_name,
+        item_name,
+        count
+    )
+
+    return response_service.dumps(result)
+
+
+@mcp.tool()
+async def apply_inventory_deltas(
+        world_name: str,
+        deltas: list[dict]
+) -> str:
+    """
+    전리품 분배처럼 여러 캐릭터, 여러 아이템의 갯수가 한 번에 바뀌면 이 툴로 한 번에 처리하십시오.
+    deltas의 각 항목은 character_name, item_name, delta(얻으면 양수, 사용하면 음수)와
+    선택적으로 item_description(새 아이템일 때)을 가집니다.
+    하나라도 갯수가 모자라면 아무것도 바뀌지 않습니다. 바뀐 뒤의 item_count 목록을 반환합니다.
+    """
+    result = await run_db(inventory_service.apply_deltas, world_name, deltas)
+
+    return response_service.encode_row_set(result, ('character_name', 'item_name', 'item_count'), None, None, None)
 
 
 # region ATTITUDE
@@ -259,18 +446,33 @@ async def create_character_attitude(
     또한 캐릭터가 같은 캐릭터와 상호작용할 때, character_attitude를 검색하여 그 데이터에 맞게 행동하십시오.
     상호작용은 보통 양방향으로 이루어지기 때문에, 서로 상반되도록 2번 호출하여 상호간에 어떤지를 둘 다 기록하십시오.
     """
+    await run_db(
+        character_service.create_character_attitude,
+        world_name,
+        character_name,
+        target_character_name,
 
-    session = next(get_engine_session())
+        attitude
+    )
 
-    new_character_attitude = CharacterAttitude()
 
-    new_character_attitude.world_name = world_name
-    new_character_attitude.character_name = character_name
-    new_character_attitude.target_character_name = target_character_name
-    new_character_attitude.attitude = attitude
+@mcp.tool()
+async def create_character_attitudes(
+        world_name: str,
+        relations: list[dict]
+) -> str:
+    """
+    world_name world에 속하는 여러 캐릭터 쌍의 감정 및 태도를 한 번에 기록합니다.
+    relations의 각 항목은 character_name, target_character_name, attitude(character_name -> target_character_name),
+    target_attitude(target_character_name -> character_name)를 가지며, 한 항목으로 양방향을 모두 기록합니다.
+    target_attitude를 생략한 항목은 character_name -> target_character_name 한 방향만 기록되며,
+    그런 항목은 응답의 one_way에 [character_name, target_character_name]으로 표시됩니다.
+    create_character_attitude를 2번씩 호출하는 대신 이 툴을 사용하십시오.
+    하나라도 잘못되면 아무 태도도 기록되지 않습니다.
+    """
+    result = await run_db(character_service.create_character_attitudes, world_name, relations)
 
-    session.add(new_character_attitude)
-    session.commit()
+    return response_service.dumps(result)
 
 
 @mcp.tool()
@@ -282,19 +484,68 @@ async def get_character_attitude(
     """
     world_name에 속하는 character_name을 갖는 캐릭터가 target_character_name과 상호작용한다면,
     해당 character_name을 갖는 캐릭터가 target_character_name 캐릭터에게 어떤 감정 및 태도를 갖고 있는지 검색합니다.
-    상호작용은 보통 양방향으로 이루어지기 때문에, 서로 상반되도록 2번 호출하여 상호간에 어떤지를 검색하십시오.
+    두 캐릭터 이상이 함께 등장하는 장면이라면 get_character_attitudes 툴로 모든 방향의 태도를 한 번에 검색하십시오.
+    """
+    target_character_attitude = await run_db(
+        character_service.get_character_attitude,
+        world_name,
+        character_name,
+        target_character_name
+    )
+
+    return response_service.dumps(target_character_attitude)
+
+
+@mcp.tool()
+async def get_character_attitudes(
+        world_name: str,
+        character_names: list[str]
+) -> str:
+    """
+    장면에 함께 등장하는 character_names 캐릭터들이 서로에게 갖는 모든 방향의 감정 및 태도를 한 번에 검색합니다.
+    각 항목은 character_name이 target_character_name에게 갖는 attitude입니다.
+    """
+    attitudes = await run_db(relationship_service.get_attitudes_among, world_name, character_names)
+
+    return response_service.encode_row_set(attitudes, relationship_service.EDGE_COLUMNS)
+
+
+@mcp.tool()
+async def get_character_relations(
+        world_name: str,
+        character_name: str,
+
+        direction: str = 'both'
+) -> str:
+    """
+    character_name 캐릭터가 다른 캐릭터들에게 갖는 태도(out)와, 다른 캐릭터들이 이 캐릭터에게 갖는 태도(in)를 검색합니다.
+    direction은 'out', 'in', 'both' 중 하나입니다.
     """
+    relations = await run_db(relationship_service.get_attitude_edges, world_name, character_name, direction)
+
+    return response_service.dumps({
+        key: response_service.row_set(edges, relationship_service.EDGE_COLUMNS) for key, edges in relations.items()
+    })
+
+
+@mcp.tool()
+async def get_character_neighborhood(
+        world_name: str,
+        character_name: str,
 
-    session = next(get_engine_session())
+        depth: int = 1
+) -> str:
+    """
+    character_name 캐릭터와 태도 관계로 depth(최대 3) 단계 안에 연결된 캐릭터들과, 그 캐릭터들 사이의 모든 태도를 검색합니다.
+    이야기에 재등장시킬 캐릭터를 고를 때 사용하십시오.
+    """
+    neighborhood = await run_db(relationship_service.get_attitude_neighborhood, world_name, character_name, depth)
 
-    target_character_attitude = session.exec(
-        select(CharacterAttitude)
-        .where(CharacterAttitude.world_name == world_name)
-        .where(CharacterAttitude.character_name == character_name)
-        .where(CharacterAttitude.target_character_name == target_character_name)
-    ).first()
+    return response_service.dumps({
+        'character_names': neighborhood['character_names'],
+        'attitudes': response_service.row_set(neighborhood['attitudes'], relationship_service.EDGE_COLUMNS),
+    })
 
-    return json.dumps(dict(target_character_attitude))
 
 #endregion
 
@@ -311,28 +562,43 @@ async def is_action_successful(
     req_stat_name에는 6가지의 스탯 중 하나로, character의 stat_으로 시작하는 컬럼명을 기재해야만 합니다. 아니면 오류 발생합니다.
     req_stat은 req_stat_name을 평범하게 100% 성공하는 스탯 기준입니다. 6이 보통 난이도입니다.
     """
+    results = await run_db(
+        dice_service.resolve_checks,
+        world_name,
+        [{'character_name': character_name, 'req_stat_name': req_stat_name, 'req_stat': req_stat}]
+    )
 
-    session = next(get_engine_session())
+    return results[0]['result']
 
-    target_character = session.exec(
-        select(Character)
-        .where(Character.world_name == world_name)
-        .where(Character.character_name == character_name)
-    ).first()
 
-    character_stat = getattr(target_character, req_stat_name)
+@mcp.tool()
+async def resolve_actions(
+        world_name: str,
 
-    if character_stat >= req_stat:
-        return 'success'
+        checks: list[dict],
+        fields: list[str] | None = None
+) -> str:
+    """
+    여러 캐릭터의 행동(파티 전체의 판정 등)이 성공적이었는지 한 번에 판단합니다.
+    checks의 각 항목은 is_action_successful의 인자와 같은 character_name, req_stat_name, req_stat을 가져야 합니다.
+    각 항목마다 result에 success 혹은 fail이 순서대로 반환됩니다. 결과만 필요하면 fields에 ["character_name", "result"]를 지정하십시오.
+    """
+    results = await run_db(dice_service.resolve_checks, world_name, checks)
 
-    lack_stat = req_stat - character_stat
+    return response_service.encode_row_set(results, dice_service.CHECK_RESULT_COLUMNS, fields, None, None)
 
-    random_value = random.randint(0, 9)
 
-    if random_value < lack_stat:
-        return 'fail'
+@mcp.tool()
+async def seed_world_dice(
+        world_name: str,
 
-    return 'success'
+        seed: int
+):
+    """
+    world_name world의 주사위와 스탯 분배에 사용하는 난수를 seed로 고정합니다.
+    같은 seed로 같은 순서의 판정을 하면 같은 결과가 나오므로, 플레이어가 재현을 요청할 때만 사용하십시오.
+    """
+    await run_db(dice_service.seed_world, world_name, seed)
 
 
 @mcp.tool()
@@ -345,73 +611,72 @@ async def insert_world_dialog(
     플레이어의 요청의 응답, 스토리 진행 출력 후 바로 이 툴을 호출해 플레이어가 적은 요청 텍스트와, 출력된 텍스트 모두 저장하고 출력하십시오.
     이는 이전에 이야기가 어떻게 흘러가는지 저장하기 위함이며, 매번 검색해야 합니다.
     """
-
-    with get_db_cursor() as cursor:
-        conn = cursor.connection
-
-        cursor.execute("""
-            INSERT INTO world_dialog (world_name, dialog) VALUES (?, ?)""",
-           (world_name, dialog))
-
-        conn.commit()
+    await run_db(dialog_service.insert_world_dialog, world_name, dialog)
 
 
 @mcp.tool()
 async def select_world_dialog(
         world_name: str,
 
-        keyword: str
+        keyword: str,
+        limit: int = dialog_service.DIALOG_SEARCH_LIMIT,
+        excerpt: str = 'dialog',
+        max_bytes: int = dialog_service.DIALOG_SEARCH_MAX_BYTES
 )-> str:
     """
     게임 이야기의 통일성을 위하여 이야기를 작성할 때 특정한 캐릭터 이름, 인벤토리 아이템, 키워드 등을 이 툴을 호출하여야만 합니다.
     1단어의 키워드를 검색해 관련된 이야기를 검색합니다.
     1단어로만 검색하십시오.
+    결과는 관련도가 높은 순서로 최대 limit개 반환됩니다.
+    excerpt에 snippet을 지정하면 키워드 주변의 일부만, highlight를 지정하면 키워드를 [ ]로 표시한 전체 이야기를 반환합니다.
+    결과는 columns(id, dialog)와 rows이며, max_bytes를 넘으면 truncated가 true입니다.
     """
+    return await run_db(dialog_service.select_world_dialog, world_name, keyword, limit, excerpt, max_bytes)
 
-    dialogs = []
-
-    with get_db_cursor() as cursor:
-        conn = cursor.connection
 
-        for row in cursor.execute(
-            f"""
-                SELECT * FROM world_dialog
-                WHERE world_name = '{world_name}'
-                    AND id IN (
-                    SELECT rowid 
-                    FROM world_dialog_fts5 
-                    WHERE dialog 
-                    MATCH '{keyword}*')
-            """
-        ):
-            dialogs.append(row)
+@mcp.tool()
+async def search_world_entities(
+        world_name: str,
 
-    return json.dumps(dialogs)
+        keywords: list[str],
+        limit: int = dialog_entity_service.ENTITY_SEARCH_LIMIT
+) -> str:
+    """
+    이야기에 등장하는 고유명사(캐릭터 이름, 아이템 이름 등)가 여러 개라면 select_world_dialog를 여러 번 호출하는 대신 이 툴로 한 번에 검색하십시오.
+    keywords의 키워드마다 등장한 이야기 수(count)와 가장 최근의 이야기 최대 limit개를 [id, dialog]로 반환합니다.
+    캐릭터 이름이나 아이템 이름과 정확히 같은 키워드는 색인(source: entity)으로, 나머지는 단어 검색(source: fulltext)으로 찾습니다.
+    단어 검색의 count는 최근 이야기만으로 limit개를 채우면 압축된 오래된 이야기를 세지 않습니다.
+    """
+    return await run_db(dialog_entity_service.select_entities, world_name, keywords, limit)
 
 
 @mcp.tool()
 async def select_all_before_dialogs(
-        world_name: str
+        world_name: str,
+
+        after_id: int | None = None,
+        before_id: int | None = None,
+        limit: int = dialog_service.DIALOG_PAGE_LIMIT,
+        max_bytes: int = dialog_service.DIALOG_PAGE_MAX_BYTES,
+        cursor: str | None = None
 )-> str:
     """
     게임을 이어하거나 불러올 때, 모든 이야기의 추적이 필요하다면 이 함수를 호출하십시오.
+    이야기는 id 순서대로 limit개, 최대 max_bytes 크기까지만 columns(id, dialog)와 rows로 반환됩니다.
+    결과의 next_cursor가 null이 아니라면, 그 값을 cursor에 넣어 다시 호출하여 다음 이야기를 이어서 불러오십시오.
+    after_id 이후, before_id 이전의 이야기만 불러올 수도 있습니다. before_id만 지정하면 그 직전의 최근 이야기부터 과거로 거슬러 올라갑니다.
     """
+    if cursor is not None:
+        after_id, before_id = dialog_service.decode_dialog_cursor(cursor)
 
-    dialogs = []
-
-    with get_db_cursor() as cursor:
-        conn = cursor.connection
-
-        for row in cursor.execute(
-            f"""
-                SELECT * 
-                FROM world_dialog
-                WHERE world_name = '{world_name}'
-            """
-        ):
-            dialogs.append(row)
-
-    return json.dumps(dialogs)
+    return await run_db(
+        dialog_service.select_all_before_dialogs,
+        world_name,
+        after_id,
+        before_id,
+        limit,
+        max_bytes
+    )
 
 
 @mcp.tool()
@@ -422,27 +687,99 @@ async def select_last_world_dialog(
     게임을 이어하기, 혹은 불러온다면, 가장 마지막 dialog가 무엇이었는지 파악해야 합니다. 파악한 이야기를 복원하여 이야기를 진행해야만 합니다.
     이야기를 더 잘 복원하기 위해 키워드를 찾아 select_world_dialog 툴로 불러온 이야기를 잘 복원하십시오.
     """
+    dialogs = await run_db(dialog_service.select_last_world_dialog, world_name)
 
-    dialogs = []
+    return response_service.encode_row_set(
+        dialogs, dialog_service.DIALOG_COLUMNS, dialog_service.DIALOG_RESPONSE_COLUMNS, None, None
+    )
 
-    with get_db_cursor() as cursor:
-        conn = cursor.connection
 
-        for row in cursor.execute(
-            f"""
-                SELECT * FROM world_dialog 
-                WHERE world_name = '{world_name}'
-                ORDER BY id DESC LIMIT 1
-            """
-        ):
-            dialogs.append(row)
+@mcp.tool()
+async def archive_world_dialogs(
+        world_name: str,
 
+        keep_recent: int = dialog_archive_service.ARCHIVE_KEEP_RECENT
+) -> str:
+    """
+    world의 최근 keep_recent개를 제외한 오래된 dialog를 압축 보관합니다. 긴 게임에서 DB 크기를 줄일 때 호출하십시오.
+    압축된 dialog도 select_world_dialog, select_all_before_dialogs로 그대로 검색하고 읽을 수 있지만,
+    select_data의 world_dialog 테이블에는 더 이상 나타나지 않습니다.
+    """
+    result = await run_db(dialog_archive_service.archive_world_dialogs, world_name, keep_recent)
 
-    return json.dumps(dialogs)
+    return response_service.dumps(result)
 
 
 # endregion
 
 
+# region BACKUP
+
+@mcp.tool()
+async def export_world(world_name: str, file_name: str | None = None) -> str:
+    """
+    플레이어가 world의 백업이나 이동을 요청할 때만 호출하십시오.
+    world와 그 캐릭터, 인벤토리, 태도, 모든 이야기를 서버의 data/exports 아래 file_name(경로가 아닌 파일 이름, 없으면 자동)에
+    gzip 압축 NDJSON 파일로 내보냅니다. 이미 있는 파일은 덮어쓰지 않습니다.
+    """
+    result = await run_db(world_transfer_service.export_world, world_name, file_name)
+
+    return response_service.dumps(result)
+
+
+@mcp.tool()
+async def import_world(file_name: str, world_name: str | None = None, replace: bool = False) -> str:
+    """
+    export_world로 data/exports에 내보낸 file_name을 world_name(없으면 원래 이름)의 world로 가져옵니다.
+    같은 이름의 world가 있으면 오류이며, 플레이어가 덮어쓰기를 명시적으로 요청한 경우에만 replace를 true로 하십시오.
+    """
+    result = await run_db(world_transfer_service.import_world, file_name, world_name, replace)
+
+    return response_service.dumps(result)
+
+
+@mcp.tool()
+async def snapshot_database(name: str | None = None) -> str:
+    """
+    서버를 멈추지 않고 모든 world의 DB 파일을 data/snapshots 아래의 새 디렉터리 name(없으면 시각)에 일관된 상태로 복사합니다.
+    """
+    result = await run_db(world_transfer_service.snapshot_database, name)
+
+    return response_service.dumps(result)
+
+
+# endregion
+
+
+# region HTTP
+@mcp.custom_route("/healthz", methods=["GET"])
+async def healthz(request: Request) -> PlainTextResponse:
+    # 프로세스가 요청을 받을 수 있는지만 확인합니다.
+    return PlainTextResponse("ok")
+
+
+@mcp.custom_route("/readyz", methods=["GET"])
+async def readyz(request: Request) -> JSONResponse:
+    try:
+        result = await run_db(http_service.check_ready)
+    except Exception as e:
+        return JSONResponse({"ready": False, "error": repr(e)}, status_code=503)
+
+    return JSONResponse({"ready": True, **result})
+
+
+def create_http_app():
+    """uvicorn의 app factory입니다. (python -m service.http_service)"""
+    return mcp.sse_app()
+
+
+# endregion
+
+
+# 모든 툴이 등록된 뒤에 측정을 설치해야 합니다.
+metrics_service.instrument(mcp, engine, connection_pool, read_only_pool)
+shard_router.add_listener(metrics_service.instrument_shard)
+
+
 if __name__ == "__main__":
     mcp.run()
@@ -0,0 +1,29 @@
+import functools
+import os
+
+import anyio
+
+from service.process_sync import sync_caches
+
+# 동시에 DB 작업을 수행할 수 있는 워커 스레드 수
+DB_CONCURRENCY = int(os.environ.get('RPG_DB_CONCURRENCY', '8'))
+
+db_limiter = anyio.CapacityLimiter(DB_CONCURRENCY)
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    블로킹 DB 작업을 워커 스레드에서 실행합니다.
+    이벤트 루프를 막지 않으며, 동시 실행 수는 DB_CONCURRENCY로 제한됩니다.
+    """
+    return await anyio.to_thread.run_sync(
+        functools.partial(_synced_call, func, args, kwargs),
+        limiter=db_limiter,
+    )
+
+
+def _synced_call(func, args: tuple, kwargs: dict):
+    # 다른 프로세스가 쓴 내용이 있다면 캐시를 비운 뒤 실행합니다. (RPG_CROSS_PROCESS_SYNC=1일 때만)
+    sync_caches()
+
+    return func(*args, **kwargs)
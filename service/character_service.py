@@ -0,0 +1,275 @@
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import select
+
+from model.character import Character
+from model.character_attitude import CharacterAttitude
+from model.character_inventory import CharacterInventory
+from service.entity_cache import entity_cache
+from service.repository_service import get_engine_session
+from service.result_cache import write_generations
+
+CHARACTER_COLUMNS = tuple(Character.model_fields)
+
+# create_character(s)가 기본으로 돌려주는 컬럼입니다. characteristic, situation은 요청한 글을 그대로 되풀이하므로 뺍니다.
+CHARACTER_RESPONSE_FIELDS = [
+    'character_name',
+    'stat_charisma', 'stat_strength', 'stat_wisdom', 'stat_dexterity', 'stat_intelligence', 'stat_constitution',
+]
+
+
+def create_character(
+        world_name: str,
+        character_name: str,
+        characteristic: str,
+        situation: str,
+
+        stat_charisma: int,
+        stat_strength: int,
+        stat_wisdom: int,
+        stat_dexterity: int,
+        stat_intelligence: int,
+        stat_constitution: int
+) -> dict:
+    with get_engine_session(world_name) as session:
+        new_character = Character()
+
+        new_character.world_name = world_name
+        new_character.character_name = character_name
+
+        new_character.characteristic = characteristic
+        new_character.situation = situation
+
+        # 스탯 분배
+        new_character.stat_constitution = stat_constitution
+        new_character.stat_strength = stat_strength
+        new_character.stat_intelligence = stat_intelligence
+        new_character.stat_dexterity = stat_dexterity
+        new_character.stat_wisdom = stat_wisdom
+        new_character.stat_charisma = stat_charisma
+
+        session.add(new_character)
+        result = new_character.model_dump()
+        session.commit()
+
+        entity_cache.put(('character', world_name, character_name), result)
+        write_generations.bump('character', world_name)
+
+        return result
+
+
+def get_character(world_name: str, character_name: str) -> dict | None:
+    cache_key = ('character', world_name, character_name)
+
+    found, cached = entity_cache.get(cache_key)
+    if found:
+        return cached
+
+    with get_engine_session(world_name) as session:
+        target_character = session.exec(
+            select(Character)
+            .where(Character.world_name == world_name)
+            .where(Character.character_name == character_name)
+        ).first()
+
+        if target_character is None:
+            return None
+
+        result = target_character.model_dump()
+        entity_cache.put(cache_key, result)
+
+        return result
+
+
+def get_characters(world_name: str, character_names: list[str]) -> dict[str, dict]:
+    """character_names의 캐릭터를 character_name별로 반환합니다. 캐시에 없는 캐릭터만 한 번의 쿼리로 읽습니다."""
+    result = {}
+    missing = []
+
+    for character_name in dict.fromkeys(character_names):
+        found, cached = entity_cache.get(('character', world_name, character_name))
+        if found:
+            result[character_name] = cached
+        else:
+            missing.append(character_name)
+
+    if missing:
+        with get_engine_session(world_name) as session:
+            for target_character in session.exec(
+                select(Character)
+                .where(Character.world_name == world_name)
+                .where(Character.character_name.in_(missing))
+            ):
+                character = target_character.model_dump()
+                entity_cache.put(('character', world_name, target_character.character_name), character)
+                result[target_character.character_name] = character
+
+    return result
+
+
+def _upsert_inventory_items(world_name: str, items: list[CharacterInventory]):
+    # 이미 있는 아이템이면 실패하지 않고 item_description, item_count를 새 값으로 바꿉니다.
+    statement = insert(CharacterInventory).values([item.model_dump() for item in items])
+    statement = statement.on_conflict_do_update(
+        index_elements=['world_name', 'character_name', 'item_name'],
+        set_={
+            'item_description': statement.excluded.item_description,
+            'item_count': statement.excluded.item_count,
+        }
+    )
+
+    with get_engine_session(world_name) as session:
+        session.execute(statement)
+        session.commit()
+
+    write_generations.bump('character_inventory', world_name)
+
+
+def create_character_inventory_item(
+        world_name: str,
+        character_name: str,
+
+        item_name: str,
+        item_description: str,
+        item_count: int
+):
+    new_item = CharacterInventory()
+    new_item.world_name = world_name
+    new_item.character_name = character_name
+
+    new_item.item_name = item_name
+    new_item.item_description = item_description
+    new_item.item_count = item_count
+
+    _upsert_inventory_items(world_name, [new_item])
+
+
+def create_character_attitude(
+        world_name: str,
+        character_name: str,
+        target_character_name: str,
+
+        attitude: str
+):
+    with get_engine_session(world_name) as session:
+        new_character_attitude = CharacterAttitude()
+
+        new_character_attitude.world_name = world_name
+        new_character_attitude.character_name = character_name
+        new_character_attitude.target_character_name = target_character_name
+        new_character_attitude.attitude = attitude
+
+        session.add(new_character_attitude)
+        result = new_character_attitude.model_dump()
+        session.commit()
+
+        entity_cache.put(('character_attitude', world_name, character_name, target_character_name), result)
+        write_generations.bump('character_attitude', world_name)
+
+
+def get_character_attitude(
+        world_name: str,
+        character_name: str,
+        target_character_name: str,
+) -> dict | None:
+    cache_key = ('character_attitude', world_name, character_name, target_character_name)
+
+    found, cached = entity_cache.get(cache_key)
+    if found:
+        return cached
+
+    with get_engine_session(world_name) as session:
+        target_character_attitude = session.exec(
+            select(CharacterAttitude)
+            .where(CharacterAttitude.world_name == world_name)
+            .where(CharacterAttitude.character_name == character_name)
+            .where(CharacterAttitude.target_character_name == target_character_name)
+        ).first()
+
+        if target_character_attitude is None:
+            return None
+
+        result = target_character_attitude.model_dump()
+        entity_cache.put(cache_key, result)
+
+        return result
+
+
+def _add_all_in_one_transaction(world_name: str, rows: list, key_fields: tuple[str, ...]):
+    keys = [tuple(getattr(row, field) for field in key_fields) for row in rows]
+    if len(set(keys)) != len(keys):
+        raise ValueError(f'duplicate {key_fields} in batch')
+
+    with get_engine_session(world_name) as session:
+        session.add_all(rows)
+        result = [row.model_dump() for row in rows]
+        session.commit()
+
+        return result
+
+
+def create_characters(world_name: str, characters: list[dict]) -> list[dict]:
+    new_characters = [
+        Character.model_validate({**character, 'world_name': world_name})
+        for character in characters
+    ]
+
+    result = _add_all_in_one_transaction(world_name, new_characters, ('character_name',))
+
+    for character in result:
+        entity_cache.put(('character', world_name, character['character_name']), character)
+    write_generations.bump('character', world_name)
+
+    return result
+
+
+def create_character_inventory_items(world_name: str, items: list[dict]):
+    new_items = [
+        CharacterInventory.model_validate({**item, 'world_name': world_name})
+        for item in items
+    ]
+
+    keys = [(item.character_name, item.item_name) for item in new_items]
+    if len(set(keys)) != len(keys):
+        raise ValueError("duplicate ('character_name', 'item_name') in batch")
+
+    if new_items:
+        _upsert_inventory_items(world_name, new_items)
+
+
+def create_character_attitudes(world_name: str, relations: list[dict]) -> dict:
+    """
+    relations의 각 항목은 character_name, target_character_name, attitude와
+    선택적으로 target_attitude(target_character_name -> character_name 방향의 태도)를 가집니다.
+    기록한 태도 수와, target_attitude가 없어 한 방향만 기록한 (character_name, target_character_name)들을 반환합니다.
+    """
+    new_attitudes = []
+    one_way = []
+
+    for relation in relations:
+        new_attitudes.append(CharacterAttitude.model_validate({
+            'world_name': world_name,
+            'character_name': relation.get('character_name'),
+            'target_character_name': relation.get('target_character_name'),
+            'attitude': relation.get('attitude'),
+        }))
+
+        if relation.get('target_attitude') is not None:
+            new_attitudes.append(CharacterAttitude.model_validate({
+                'world_name': world_name,
+                'character_name': relation.get('target_character_name'),
+                'target_character_name': relation.get('character_name'),
+                'attitude': relation.get('target_attitude'),
+            }))
+        else:
+            one_way.append([relation.get('character_name'), relation.get('target_character_name')])
+
+    result = _add_all_in_one_transaction(world_name, new_attitudes, ('character_name', 'target_character_name'))
+
+    for attitude in result:
+        entity_cache.put(
+            ('character_attitude', world_name, attitude['character_name'], attitude['target_character_name']),
+            attitude
+        )
+    write_generations.bump('character_attitude', world_name)
+
+    return {'recorded': len(result), 'one_way': one_way}
@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import threading
+
+# 모든 연결에 적용되는 PRAGMA (journal_mode는 DB 파일에 영구 저장되므로 최초 1회만 설정)
+JOURNAL_MODE = 'WAL'
+CONNECTION_PRAGMAS = (
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -16000),  # 음수는 KiB 단위, 약 16MB
+    ('mmap_size', 256 * 1024 * 1024),
+    ('temp_store', 'MEMORY'),
+)
+BUSY_TIMEOUT_MS = 5000
+
+
+class TrackedConnection(sqlite3.Connection):
+    """commit을 풀에 알려, 이 프로세스의 commit과 다른 프로세스의 commit을 구분할 수 있게 합니다."""
+
+    pool: 'ConnectionPool | None' = None
+
+    def commit(self):
+        if self.pool is None or not self.in_transaction:
+            return super().commit()
+
+        self.pool.local_commit(self, super().commit)
+
+
+class ConnectionPool:
+    """
+    하나의 SQLite 파일에 대한 연결을 관리합니다.
+    sqlite3 경로는 스레드마다 하나의 연결을 재사용하고,
+    SQLAlchemy 엔진은 creator로 open_connection을 사용해 같은 설정의 연결을 받습니다.
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = BUSY_TIMEOUT_MS, read_only: bool = False):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.read_only = read_only
+
+        # get_db_cursor가 만드는 커서의 클래스 (metrics_service가 측정용 커서로 바꿉니다)
+        self.cursor_factory = sqlite3.Cursor
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: set[sqlite3.Connection] = set()
+        self._thread_connections: dict[int, sqlite3.Connection] = {}
+        self._journal_mode_set = False
+
+        # 다른 연결(다른 프로세스 포함)의 commit을 감지하기 위한 전용 연결
+        self._watch_conn: sqlite3.Connection | None = None
+        self._watch_lock = threading.Lock()
+        self._data_version: int | None = None
+        # 이 프로세스가 아닌 연결의 commit을 local_commit에서 발견했는지
+        self._foreign_commit = False
+
+        self._stats = {
+            'opened': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'reused': 0,
+        }
+
+    def open_connection(self) -> sqlite3.Connection:
+        if self.read_only:
+            # 읽기 전용 연결은 파일을 mode=ro로 열고, query_only로 한 번 더 쓰기를 막습니다.
+            conn = sqlite3.connect(
+                f'file:{os.path.abspath(self.db_path)}?mode=ro',
+                uri=True,
+                timeout=self.busy_timeout_ms / 1000,
+                check_same_thread=False,
+            )
+            conn.execute('PRAGMA query_only = 1')
+        else:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.busy_timeout_ms / 1000,
+                check_same_thread=False,
+                factory=TrackedConnection,
+            )
+            conn.pool = self
+
+        with self._lock:
+            if not self._journal_mode_set and not self.read_only:
+                conn.execute(f'PRAGMA journal_mode = {JOURNAL_MODE}')
+                self._journal_mode_set = True
+
+            self._connections.add(conn)
+            self._stats['opened'] += 1
+
+        conn.execute(f'PRAGMA busy_timeout = {self.busy_timeout_ms}')
+        for name, value in CONNECTION_PRAGMAS:
+            conn.execute(f'PRAGMA {name} = {value}')
+
+        return conn
+
+    def discard_connection(self, conn: sqlite3.Connection):
+        """다른 곳(SQLAlchemy 풀 등)에서 닫은 연결을 관리 대상에서 제외합니다."""
+        with self._lock:
+            if conn not in self._connections:
+                return
+            self._connections.discard(conn)
+            self._stats['closed'] += 1
+
+    def close_connection(self, conn: sqlite3.Connection):
+        self.discard_connection(conn)
+        conn.close()
+
+    def connection(self) -> sqlite3.Connection:
+        """현재 스레드의 연결을 반환합니다. 없으면 새로 엽니다."""
+        conn = getattr(self._local, 'conn', None)
+
+        with self._lock:
+            self._stats['checkouts'] += 1
+            if conn is not None and conn in self._connections:
+                self._stats['reused'] += 1
+                return conn
+
+        self._close_dead_thread_connections()
+
+        conn = self.open_connection()
+        self._local.conn = conn
+        with self._lock:
+            self._thread_connections[threading.get_ident()] = conn
+
+        return conn
+
+    def _close_dead_thread_connections(self):
+        alive = {thread.ident for thread in threading.enumerate()}
+
+        with self._lock:
+            dead = [ident for ident in self._thread_connections if ident not in alive]
+            connections = [self._thread_connections.pop(ident) for ident in dead]
+
+        for conn in connections:
+            self.close_connection(conn)
+
+    def local_commit(self, conn: sqlite3.Connection, commit):
+        """
+        이 풀의 연결 conn이 commit할 때, 그 commit으로 바뀐 data_version을 기준값에 반영해
+        data_version_changed가 다른 프로세스의 commit에만 True를 반환하게 합니다.
+        commit 전(쓰기 잠금을 가진 동안)과 직후에 다른 연결의 commit이 있었다면 기준값과 함께 표시해 둡니다.
+        """
+        with self._watch_lock:
+            if self._watch_conn is None:
+                # 아직 기준값이 없으므로 첫 data_version_changed가 어차피 True를 반환합니다.
+                return commit()
+
+            if self._watch_conn.execute('PRAGMA data_version').fetchone()[0] != self._data_version:
+                self._foreign_commit = True
+
+            # 연결 자신의 data_version은 다른 연결의 commit에만 바뀝니다.
+            conn_version = conn.execute('PRAGMA data_version').fetchone()[0]
+
+            commit()
+
+            self._data_version = self._watch_conn.execute('PRAGMA data_version').fetchone()[0]
+
+            # 위의 기준값을 읽기 전에 다른 연결이 commit했다면 기준값에 섞여 있으므로 표시해 둡니다.
+            if conn.execute('PRAGMA data_version').fetchone()[0] != conn_version:
+                self._foreign_commit = True
+
+    def data_version_changed(self) -> bool:
+        """
+        마지막 확인 이후 이 프로세스가 아닌 연결이 이 DB에 commit했다면 True입니다. (PRAGMA data_version)
+        이 풀의 쓰기 연결이 한 commit은 local_commit이 기준값에 반영하므로 포함되지 않습니다.
+        처음 호출하면 기준값을 기록하고, 그 전에 무엇이 바뀌었는지 알 수 없으므로 True를 반환합니다.
+        """
+        with self._watch_lock:
+            if self._watch_conn is None:
+                self._watch_conn = self.open_connection()
+
+            data_version = self._watch_conn.execute('PRAGMA data_version').fetchone()[0]
+            changed = self._foreign_commit or data_version != self._data_version
+            self._data_version = data_version
+            self._foreign_commit = False
+
+            return changed
+
+    def close_all(self):
+        with self._watch_lock:
+            self._watch_conn = None
+            self._data_version = None
+            self._foreign_commit = False
+
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+            self._thread_connections.clear()
+            self._stats['closed'] += len(connections)
+
+        for conn in connections:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = dict(self._stats)
+            result['open'] = len(self._connections)
+
+        result['db_path'] = self.db_path
+        return result
@@ -0,0 +1,351 @@
+import json
+import os
+import zlib
+
+from service.dialog_write_behind import dialog_writer
+from service.fts_query import column_phrase, scoped_match, tokenize
+from service.repository_service import get_db_cursor
+from service.result_cache import write_generations
+
+# world마다 압축하지 않고 남겨 둘 최근 dialog 수
+ARCHIVE_KEEP_RECENT = int(os.environ.get('RPG_DIALOG_ARCHIVE_KEEP', '1000'))
+# 하나의 압축 블록에 넣을 연속된 dialog 수
+ARCHIVE_BLOCK_ROWS = 256
+ARCHIVE_COMPRESS_LEVEL = 9
+
+SNIPPET_TOKENS = 16
+
+
+def _compress(rows: list[tuple[int, str]]) -> tuple[bytes, int]:
+    raw = json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode()
+    return zlib.compress(raw, ARCHIVE_COMPRESS_LEVEL), len(raw)
+
+
+def decompress_block(data: bytes) -> list[tuple[int, str]]:
+    return [(row[0], row[1]) for row in json.loads(zlib.decompress(data))]
+
+
+def insert_archive_block(cursor, world_name: str, rows: list[tuple[int, str]]) -> tuple[int, int]:
+    """id 순서의 (id, dialog)들을 하나의 압축 블록으로 기록하고 단어를 색인합니다. (원본 크기, 압축 크기)를 반환합니다."""
+    data, raw_bytes = _compress(rows)
+
+    cursor.execute(
+        """
+            INSERT INTO world_dialog_archive (world_name, first_id, last_id, row_count, raw_bytes, data)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (world_name, rows[0][0], rows[-1][0], len(rows), raw_bytes, data)
+    )
+    block_id = cursor.lastrowid
+
+    terms = dict.fromkeys(token for row_id, dialog in rows for token, start, end in tokenize(dialog))
+    cursor.execute(
+        'INSERT INTO world_dialog_archive_fts5 (rowid, world_name, terms) VALUES (?, ?, ?)',
+        (block_id, world_name, ' '.join(terms))
+    )
+
+    return raw_bytes, len(data)
+
+
+def delete_archive_blocks(cursor, world_name: str) -> int:
+    """world의 모든 압축 블록과 그 색인을 지웁니다. contentless FTS는 색인했던 단어를 다시 계산해 넘겨야 지워집니다."""
+    blocks = cursor.execute('SELECT id FROM world_dialog_archive WHERE world_name = ?', (world_name,)).fetchall()
+
+    for (block_id,) in blocks:
+        data = cursor.execute('SELECT data FROM world_dialog_archive WHERE id = ?', (block_id,)).fetchone()[0]
+        terms = dict.fromkeys(token for row_id, dialog in decompress_block(data) for token, start, end in tokenize(dialog))
+
+        cursor.execute(
+            """
+                INSERT INTO world_dialog_archive_fts5 (world_dialog_archive_fts5, rowid, world_name, terms)
+                VALUES ('delete', ?, ?, ?)
+            """,
+            (block_id, world_name, ' '.join(terms))
+        )
+        cursor.execute('DELETE FROM world_dialog_archive WHERE id = ?', (block_id,))
+
+    return len(blocks)
+
+
+def iter_archive_blocks(cursor, world_name: str):
+    """world의 압축 블록을 id 순서로 하나씩 풀어 (id, dialog) 목록으로 반환합니다."""
+    block_ids = [
+        row[0]
+        for row in cursor.execute(
+            'SELECT id FROM world_dialog_archive WHERE world_name = ? ORDER BY last_id',
+            (world_name,)
+        ).fetchall()
+    ]
+
+    for block_id in block_ids:
+        data = cursor.execute('SELECT data FROM world_dialog_archive WHERE id = ?', (block_id,)).fetchone()[0]
+        yield decompress_block(data)
+
+
+def archive_world_dialogs(
+        world_name: str,
+        keep_recent: int = ARCHIVE_KEEP_RECENT,
+        block_rows: int = ARCHIVE_BLOCK_ROWS
+) -> dict:
+    """
+    world의 최근 keep_recent개를 제외한 dialog를 block_rows개씩 zlib으로 압축한 블록으로 옮깁니다.
+    블록은 원래의 id를 유지하며, 블록에 등장하는 단어는 world_dialog_archive_fts5에 색인됩니다.
+    블록마다 하나의 트랜잭션으로 옮기므로 중간에 멈춰도 옮겨진 블록까지는 일관됩니다.
+    """
+    # 최소 한 행은 남겨 두어야 새 dialog의 id가 압축된 id와 겹치지 않습니다.
+    keep_recent = max(1, keep_recent)
+    block_rows = max(1, block_rows)
+
+    dialog_writer.flush_world(world_name)
+
+    result = {'blocks': 0, 'rows': 0, 'raw_bytes': 0, 'compressed_bytes': 0}
+
+    with get_db_cursor(world_name) as cursor:
+        row = cursor.execute(
+            """
+                SELECT id FROM world_dialog
+                WHERE world_name = ?
+                ORDER BY id DESC
+                LIMIT 1 OFFSET ?
+            """,
+            (world_name, keep_recent - 1)
+        ).fetchone()
+
+    if row is None:
+        return result
+
+    cutoff_id = row[0]
+
+    while True:
+        with get_db_cursor(world_name) as cursor:
+            cursor.execute('BEGIN IMMEDIATE')
+
+            rows = cursor.execute(
+                """
+                    SELECT id, dialog FROM world_dialog
+                    WHERE world_name = ? AND id < ?
+                    ORDER BY id
+                    LIMIT ?
+                """,
+                (world_name, cutoff_id, block_rows)
+            ).fetchall()
+
+            if not rows:
+                break
+
+            raw_bytes, compressed_bytes = insert_archive_block(cursor, world_name, rows)
+
+            # world_dialog_ad 트리거가 world_dialog_fts5에서도 지웁니다.
+            cursor.execute(
+                'DELETE FROM world_dialog WHERE world_name = ? AND id BETWEEN ? AND ?',
+                (world_name, rows[0][0], rows[-1][0])
+            )
+
+        result['blocks'] += 1
+        result['rows'] += len(rows)
+        result['raw_bytes'] += raw_bytes
+        result['compressed_bytes'] += compressed_bytes
+
+    if result['rows']:
+        write_generations.bump('world_dialog', world_name)
+
+    return result
+
+
+def iter_world_dialogs(
+        cursor,
+        world_name: str,
+        after_id: int | None = None,
+        before_id: int | None = None,
+        descending: bool = False,
+        limit: int = -1
+):
+    """
+    압축된 블록과 world_dialog의 dialog를 id 순서로 (id, world_name, dialog)씩 반환합니다.
+    압축된 dialog는 항상 남아 있는 dialog보다 id가 작으므로 두 저장소를 이어 붙여 읽습니다.
+    limit은 world_dialog에서 읽을 최대 행 수이며, 블록은 필요한 만큼만 압축을 풉니다.
+    """
+    conditions = ['world_name = ?']
+    params: list = [world_name]
+
+    if after_id is not None:
+        conditions.append('id > ?')
+        params.append(after_id)
+    if before_id is not None:
+        conditions.append('id < ?')
+        params.append(before_id)
+
+    def archived():
+        # 범위와 겹치는 블록만 고르고, 블록 안의 행은 다시 범위로 거릅니다.
+        block_conditions = ['world_name = ?']
+        block_params: list = [world_name]
+
+        if after_id is not None:
+            block_conditions.append('last_id > ?')
+            block_params.append(after_id)
+        if before_id is not None:
+            block_conditions.append('first_id < ?')
+            block_params.append(before_id)
+
+        block_ids = [
+            block_row[0]
+            for block_row in cursor.execute(
+                f"""
+                    SELECT id FROM world_dialog_archive
+                    WHERE {' AND '.join(block_conditions)}
+                    ORDER BY last_id {'DESC' if descending else 'ASC'}
+                """,
+                block_params
+            ).fetchall()
+        ]
+
+        for block_id in block_ids:
+            data = cursor.execute('SELECT data FROM world_dialog_archive WHERE id = ?', (block_id,)).fetchone()[0]
+            rows = decompress_block(data)
+            if descending:
+                rows.reverse()
+
+            for row_id, dialog in rows:
+                if (after_id is None or row_id > after_id) and (before_id is None or row_id < before_id):
+                    yield row_id, world_name, dialog
+
+    def live():
+        yield from cursor.execute(
+            f"""
+                SELECT id, world_name, dialog
+                FROM world_dialog
+                WHERE {' AND '.join(conditions)}
+                ORDER BY id {'DESC' if descending else 'ASC'}
+                LIMIT ?
+            """,
+            (*params, limit)
+        )
+
+    if descending:
+        yield from live()
+        yield from archived()
+    else:
+        yield from archived()
+        yield from live()
+
+
+def get_archived_dialogs(cursor, world_name: str, dialog_ids) -> dict[int, str]:
+    """압축된 블록에서 dialog_ids의 dialog를 {id: dialog}로 반환합니다. 필요한 블록만 한 번씩 압축을 풉니다."""
+    wanted = set(dialog_ids)
+    if not wanted:
+        return {}
+
+    blocks = cursor.execute(
+        """
+            SELECT id, first_id, last_id FROM world_dialog_archive
+            WHERE world_name = ? AND last_id >= ? AND first_id <= ?
+        """,
+        (world_name, min(wanted), max(wanted))
+    ).fetchall()
+
+    result = {}
+
+    for block_id, first_id, last_id in blocks:
+        if not any(first_id <= dialog_id <= last_id for dialog_id in wanted):
+            continue
+
+        data = cursor.execute('SELECT data FROM world_dialog_archive WHERE id = ?', (block_id,)).fetchone()[0]
+        for row_id, dialog in decompress_block(data):
+            if row_id in wanted:
+                result[row_id] = dialog
+
+    return result
+
+
+def _phrase_matches(tokens: list[tuple[str, int, int]], query_tokens: list[str]) -> list[int]:
+    """FTS5의 "keyword"* 와 같이, 마지막 단어만 접두어로 일치하는 연속된 단어의 시작 위치를 반환합니다."""
+    count = len(query_tokens)
+    matches = []
+
+    for index in range(len(tokens) - count + 1):
+        if all(tokens[index + offset][0] == query_tokens[offset] for offset in range(count - 1)) \
+                and tokens[index + count - 1][0].startswith(query_tokens[-1]):
+            matches.append(index)
+
+    return matches
+
+
+def _highlight(dialog: str, tokens: list, matches: list[int], count: int, start: int = 0, end: int | None = None) -> str:
+    end = len(tokens) if end is None else end
+    text_start = tokens[start][1] if start > 0 else 0
+    text_end = tokens[end - 1][2] if end < len(tokens) else len(dialog)
+
+    parts = []
+    position = text_start
+    for index in matches:
+        if index < start or index + count > end:
+            continue
+
+        parts.append(dialog[position:tokens[index][1]])
+        parts.append('[' + dialog[tokens[index][1]:tokens[index + count - 1][2]] + ']')
+        position = tokens[index + count - 1][2]
+
+    parts.append(dialog[position:text_end])
+
+    return ''.join(parts)
+
+
+def search_archived_dialogs(
+        cursor,
+        world_name: str,
+        keyword: str,
+        limit: int,
+        excerpt: str = 'dialog'
+) -> list:
+    """
+    압축된 블록에서 keyword로 시작하는 단어를 포함하는 dialog를 최신 순으로 limit개까지 반환합니다.
+    블록 단위 색인으로 후보 블록을 고른 뒤, 압축을 풀어 실제로 일치하는 dialog만 남깁니다.
+    """
+    query_tokens = [token for token, start, end in tokenize(keyword)]
+    if not query_tokens or limit <= 0:
+        return []
+
+    match = scoped_match(world_name, ' AND '.join(column_phrase('terms', token, prefix=True) for token in query_tokens))
+
+    block_ids = [
+        row[0]
+        for row in cursor.execute(
+            """
+                SELECT a.id
+                FROM world_dialog_archive_fts5 f
+                JOIN world_dialog_archive a ON a.id = f.rowid
+                WHERE world_dialog_archive_fts5 MATCH ?
+                    AND a.world_name = ?
+                ORDER BY a.last_id DESC
+            """,
+            (match, world_name)
+        ).fetchall()
+    ]
+
+    result = []
+
+    for block_id in block_ids:
+        data = cursor.execute('SELECT data FROM world_dialog_archive WHERE id = ?', (block_id,)).fetchone()[0]
+
+        for row_id, dialog in reversed(decompress_block(data)):
+            tokens = tokenize(dialog)
+            matches = _phrase_matches(tokens, query_tokens)
+            if not matches:
+                continue
+
+            if excerpt == 'highlight':
+                dialog = _highlight(dialog, tokens, matches, len(query_tokens))
+            elif excerpt == 'snippet':
+                start = max(0, min(matches[0] - (SNIPPET_TOKENS - len(query_tokens)) // 2, len(tokens) - SNIPPET_TOKENS))
+                end = min(len(tokens), start + SNIPPET_TOKENS)
+                dialog = (
+                    ('...' if start > 0 else '')
+                    + _highlight(dialog, tokens, matches, len(query_tokens), start, end)
+                    + ('...' if end < len(tokens) else '')
+                )
+
+            result.append((row_id, world_name, dialog))
+            if len(result) >= limit:
+                return result
+
+    return result
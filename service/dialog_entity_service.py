@@ -0,0 +1,367 @@
+import functools
+import os
+import threading
+from collections import OrderedDict
+
+from service.dialog_archive_service import decompress_block, get_archived_dialogs, search_archived_dialogs
+from service.dialog_write_behind import dialog_writer
+from service.fts_query import column_phrase, fold, scoped_match, tokenize
+from service.repository_service import get_db_cursor
+from service.response_service import dumps
+from service.result_cache import result_cache, write_generations
+
+ENTITY_SEARCH_LIMIT = 5
+ENTITY_SEARCH_MAX_LIMIT = 50
+ENTITY_SEARCH_MAX_KEYWORDS = 50
+
+# 엔티티 이름 목록을 메모리에 올려 둘 world 수
+ENTITY_NAMES_CACHE_WORLDS = int(os.environ.get('RPG_ENTITY_NAMES_CACHE_WORLDS', '256'))
+
+INSERT_ENTITY_SQL = 'INSERT OR IGNORE INTO dialog_entity (world_name, entity_name, dialog_id) VALUES (?, ?, ?)'
+
+# 이름 바로 뒤에 붙어 한 단어가 되는 조사입니다. 단어가 이름과 같거나 이름에 이 조사만 붙은 경우에 등장으로 봅니다.
+# ("Ann"은 "Anna"에서 찾지 않지만, "아리아"는 "아리아가"에서, "Bob"은 "Bob에게"에서 찾습니다)
+JOSA = frozenset(
+    fold(josa) for josa in (
+        '이', '가', '은', '는', '을', '를', '의', '에', '에게', '에게서', '한테', '한테서', '께', '께서', '와', '과',
+        '도', '로', '으로', '로서', '으로서', '에서', '부터', '까지', '만', '랑', '이랑', '하고', '처럼', '보다',
+        '아', '야', '여', '이여', '이나', '나', '라고', '이라고', '이다', '다', '이야', '이고', '이며', '요',
+    )
+)
+JOSA_MAX_LENGTH = max(len(josa) for josa in JOSA)
+
+# world_name -> (쓰기 세대, 캐릭터 이름과 아이템 이름)
+_entity_names: OrderedDict[str, tuple[tuple, frozenset[str]]] = OrderedDict()
+_entity_names_lock = threading.Lock()
+
+
+def _entity_dependencies(world_name: str) -> list[tuple[str, str]]:
+    return [('character', world_name), ('character_inventory', world_name)]
+
+
+def entity_names(cursor, world_name: str) -> frozenset[str]:
+    """world의 모든 character_name과 item_name을 반환합니다. 캐릭터나 인벤토리가 바뀌기 전까지 캐시합니다."""
+    generation = write_generations.snapshot(_entity_dependencies(world_name))
+
+    with _entity_names_lock:
+        entry = _entity_names.get(world_name)
+        if entry is not None and entry[0] == generation:
+            _entity_names.move_to_end(world_name)
+            return entry[1]
+
+    names = frozenset(
+        row[0]
+        for row in cursor.execute(
+            """
+                SELECT character_name FROM character WHERE world_name = ?
+                UNION
+                SELECT item_name FROM character_inventory WHERE world_name = ?
+            """,
+            (world_name, world_name)
+        )
+        if row[0]
+    )
+
+    with _entity_names_lock:
+        _entity_names[world_name] = (generation, names)
+        _entity_names.move_to_end(world_name)
+        while len(_entity_names) > ENTITY_NAMES_CACHE_WORLDS:
+            _entity_names.popitem(last=False)
+
+    return names
+
+
+@functools.lru_cache(maxsize=65536)
+def _name_tokens(name: str) -> tuple[str, ...]:
+    return tuple(token for token, start, end in tokenize(name))
+
+
+def _is_hangul(token: str) -> bool:
+    # fold는 한글 음절을 자모로 풀어 둡니다.
+    return '\u1100' <= token[-1] <= '\u11ff'
+
+
+def _stems(token: str) -> set[str]:
+    """token과, token이 어떤 문자의 단어에 조사가 붙은 것이라면 조사를 뗀 단어들입니다."""
+    stems = {token}
+    if not _is_hangul(token):
+        return stems
+
+    # 조사는 초성 자모로 시작하므로 음절 경계에서만 뗍니다. 앞부분은 한글이 아니어도 됩니다. ("bob에게")
+    for length in range(1, min(JOSA_MAX_LENGTH, len(token) - 1) + 1):
+        if token[-length:] in JOSA:
+            stems.add(token[:-length])
+
+    return stems
+
+
+def _mentioned_names(names, dialog: str) -> list[str]:
+    """
+    dialog에 등장하는 names를 반환합니다. FTS와 같은 unicode61 규칙으로 나눈 단어 단위로 비교하며,
+    여러 단어로 된 이름은 연속된 단어로, 마지막 단어만 조사가 붙어도 일치합니다.
+    """
+    # 대부분의 dialog에는 이름이 없으므로, 단어로 나누기 전에 정규화한 전체 문자열에서 먼저 거릅니다.
+    folded = fold(dialog)
+    names = [name for name in names if _name_tokens(name) and _name_tokens(name)[-1] in folded]
+    if not names:
+        return []
+
+    tokens = [token for token, start, end in tokenize(dialog)]
+    stems = [_stems(token) for token in tokens]
+    all_stems = set().union(*stems)
+
+    mentioned = []
+    for name in names:
+        name_tokens = _name_tokens(name)
+        if name_tokens[-1] not in all_stems:
+            continue
+
+        count = len(name_tokens)
+        if count == 1 or any(
+                tuple(tokens[index:index + count - 1]) == name_tokens[:-1] and name_tokens[-1] in stems[index + count - 1]
+                for index in range(len(tokens) - count + 1)
+        ):
+            mentioned.append(name)
+
+    return mentioned
+
+
+def index_dialogs(cursor, world_name: str, dialogs):
+    """
+    새로 저장한 (id, dialog)들에 등장하는 엔티티 이름을 dialog_entity에 기록합니다.
+    dialog를 저장한 트랜잭션 안에서 호출해야 색인과 dialog가 함께 commit됩니다.
+    """
+    names = entity_names(cursor, world_name)
+    if not names:
+        return
+
+    cursor.executemany(
+        INSERT_ENTITY_SQL,
+        [(world_name, name, dialog_id) for dialog_id, dialog in dialogs for name in _mentioned_names(names, dialog)]
+    )
+
+
+def _candidate_rows(cursor, world_name: str, names: set[str]) -> list[tuple[str, int]]:
+    """
+    FTS 색인으로 names가 나올 수 있는 dialog와 압축 블록만 골라 실제로 등장하는 (이름, dialog id)를 반환합니다.
+    world_dialog를 먼저 읽어야, 그 사이에 압축된 dialog도 블록에서 찾습니다. (중복은 INSERT OR IGNORE가 거릅니다)
+    """
+    rows = []
+    block_names: dict[int, list[str]] = {}
+
+    for name in names:
+        name_tokens = _name_tokens(name)
+        if not name_tokens:
+            continue
+
+        # 조사가 붙은 단어("Bob에게")도 찾도록 마지막 단어는 접두어로 찾고, 단어 단위로 다시 확인합니다.
+        for dialog_id, dialog in cursor.execute(
+            'SELECT rowid, dialog FROM world_dialog_fts5 WHERE world_dialog_fts5 MATCH ? AND world_name = ?',
+            (scoped_match(world_name, column_phrase('dialog', name, prefix=True)), world_name)
+        ).fetchall():
+            if _mentioned_names([name], dialog):
+                rows.append((name, dialog_id))
+
+        terms = [column_phrase('terms', token) for token in name_tokens[:-1]]
+        terms.append(column_phrase('terms', name_tokens[-1], prefix=True))
+
+        for (block_id,) in cursor.execute(
+            """
+                SELECT a.id
+                FROM world_dialog_archive_fts5 f
+                JOIN world_dialog_archive a ON a.id = f.rowid
+                WHERE world_dialog_archive_fts5 MATCH ?
+                    AND a.world_name = ?
+            """,
+            (scoped_match(world_name, ' AND '.join(terms)), world_name)
+        ).fetchall():
+            block_names.setdefault(block_id, []).append(name)
+
+    # 여러 이름이 같은 블록에 있어도 블록마다 한 번만 압축을 풉니다.
+    for block_id, block_name_list in block_names.items():
+        row = cursor.execute('SELECT data FROM world_dialog_archive WHERE id = ?', (block_id,)).fetchone()
+        if row is None:
+            continue
+
+        for dialog_id, dialog in decompress_block(row[0]):
+            rows.extend((name, dialog_id) for name in _mentioned_names(block_name_list, dialog))
+
+    return rows
+
+
+def _backfill(cursor, world_name: str, names: set[str]):
+    """
+    names가 등장하는 이전의 모든 dialog(압축된 dialog 포함)를 기록하고, 기록된 이름으로 표시합니다.
+    후보는 잠금 없이 FTS 색인으로 찾고, 쓰기 잠금은 마지막 INSERT에만 잡습니다.
+    """
+    rows = _candidate_rows(cursor, world_name, names)
+
+    cursor.execute('BEGIN IMMEDIATE')
+
+    # 후보를 찾는 동안 다른 연결이 채웠을 수 있습니다.
+    names = names - _indexed_names(cursor, world_name, names)
+    if not names:
+        cursor.connection.commit()
+        return
+
+    cursor.executemany(
+        INSERT_ENTITY_SQL,
+        [(world_name, name, dialog_id) for name, dialog_id in rows if name in names]
+    )
+    cursor.executemany(
+        'INSERT OR IGNORE INTO dialog_entity_name (world_name, entity_name) VALUES (?, ?)',
+        [(world_name, name) for name in names]
+    )
+
+    cursor.connection.commit()
+
+
+def _indexed_names(cursor, world_name: str, names) -> set[str]:
+    names = list(names)
+
+    return {
+        row[0]
+        for row in cursor.execute(
+            f"""
+                SELECT entity_name FROM dialog_entity_name
+                WHERE world_name = ? AND entity_name IN ({', '.join('?' for _ in names)})
+            """,
+            (world_name, *names)
+        )
+    }
+
+
+def _entity_hits(cursor, world_name: str, names: list[str], limit: int) -> dict[str, tuple[int, list[int]]]:
+    """이름마다 (등장한 dialog 수, 최신 dialog id limit개)를 하나의 쿼리로 읽습니다."""
+    hits = {name: (0, []) for name in names}
+
+    for entity_name, dialog_id, count in cursor.execute(
+        f"""
+            SELECT entity_name, dialog_id, entity_count
+            FROM (
+                SELECT
+                    entity_name,
+                    dialog_id,
+                    count(*) OVER (PARTITION BY entity_name) AS entity_count,
+                    row_number() OVER (PARTITION BY entity_name ORDER BY dialog_id DESC) AS hit_rank
+                FROM dialog_entity
+                WHERE world_name = ? AND entity_name IN ({', '.join('?' for _ in names)})
+            )
+            WHERE hit_rank <= ?
+            ORDER BY entity_name, dialog_id DESC
+        """,
+        (world_name, *names, limit)
+    ):
+        hits[entity_name] = (count, hits[entity_name][1] + [dialog_id])
+
+    return hits
+
+
+def _fulltext_hits(cursor, world_name: str, keyword: str, limit: int) -> tuple[int, list[tuple[int, str]]]:
+    # 엔티티가 아닌 키워드는 select_world_dialog와 같은 접두어 검색을 최신 순으로 합니다.
+    match = scoped_match(world_name, column_phrase('dialog', keyword, prefix=True))
+
+    dialog_ids = [
+        row[0]
+        for row in cursor.execute(
+            """
+                SELECT rowid FROM world_dialog_fts5
+                WHERE world_dialog_fts5 MATCH ? AND world_name = ?
+                ORDER BY rowid DESC
+            """,
+            (match, world_name)
+        )
+    ]
+
+    dialogs = _live_dialogs(cursor, dialog_ids[:limit])
+    hits = [(dialog_id, dialogs[dialog_id]) for dialog_id in dialog_ids[:limit]]
+
+    # 압축된 dialog는 최근 dialog가 limit개보다 적을 때 모자란 만큼만 찾아서 셉니다.
+    if len(hits) < limit:
+        archived = search_archived_dialogs(cursor, world_name, keyword, limit - len(hits))
+        hits += [(dialog_id, dialog) for dialog_id, _, dialog in archived]
+        return len(dialog_ids) + len(archived), hits
+
+    return len(dialog_ids), hits
+
+
+def _live_dialogs(cursor, dialog_ids: list[int]) -> dict[int, str]:
+    if not dialog_ids:
+        return {}
+
+    return dict(cursor.execute(
+        f"SELECT id, dialog FROM world_dialog WHERE id IN ({', '.join('?' for _ in dialog_ids)})",
+        dialog_ids
+    ).fetchall())
+
+
+def select_entities(world_name: str, keywords: list[str], limit: int = ENTITY_SEARCH_LIMIT) -> str:
+    """search_entities의 결과를 JSON으로 인코딩하여 반환합니다. dialog, 캐릭터, 인벤토리가 바뀌기 전까지 캐시합니다."""
+    dialog_writer.flush_world(world_name)
+
+    return result_cache.get_or_compute(
+        ('select_entities', world_name, tuple(keywords), limit),
+        [('world_dialog', world_name), *_entity_dependencies(world_name)],
+        lambda: dumps(search_entities(world_name, keywords, limit))
+    )
+
+
+def search_entities(world_name: str, keywords: list[str], limit: int = ENTITY_SEARCH_LIMIT) -> list[dict]:
+    """
+    여러 키워드를 한 번에 검색해 키워드마다 등장한 dialog 수(count)와 최신 dialog limit개를 반환합니다.
+    캐릭터 이름과 아이템 이름과 정확히 같은 키워드는 dialog_entity 색인으로, 나머지는 전문 검색으로 찾습니다.
+    """
+    keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword and keyword.strip()))
+    if len(keywords) > ENTITY_SEARCH_MAX_KEYWORDS:
+        raise ValueError(f'at most {ENTITY_SEARCH_MAX_KEYWORDS} keywords are allowed')
+    if not keywords:
+        return []
+
+    limit = max(1, min(limit, ENTITY_SEARCH_MAX_LIMIT))
+
+    dialog_writer.flush_world(world_name)
+
+    with get_db_cursor(world_name) as cursor:
+        known_names = entity_names(cursor, world_name)
+        entity_keywords = [keyword for keyword in keywords if keyword in known_names]
+
+        if entity_keywords:
+            missing = set(entity_keywords) - _indexed_names(cursor, world_name, entity_keywords)
+            if missing:
+                _backfill(cursor, world_name, missing)
+
+            entity_hits = _entity_hits(cursor, world_name, entity_keywords, limit)
+        else:
+            entity_hits = {}
+
+        hit_ids = {dialog_id for count, dialog_ids in entity_hits.values() for dialog_id in dialog_ids}
+        dialogs = _live_dialogs(cursor, list(hit_ids))
+        dialogs.update(get_archived_dialogs(cursor, world_name, hit_ids - dialogs.keys()))
+
+        result = []
+        for keyword in keywords:
+            if keyword in entity_hits:
+                count, dialog_ids = entity_hits[keyword]
+                hits = [(dialog_id, dialogs[dialog_id]) for dialog_id in dialog_ids if dialog_id in dialogs]
+                source = 'entity'
+            else:
+                count, hits = _fulltext_hits(cursor, world_name, keyword, limit)
+                source = 'fulltext'
+
+            result.append({'keyword': keyword, 'source': source, 'count': count, 'dialogs': hits})
+
+        return result
+
+
+def reset_index(world_name: str | None = None):
+    """
+    dialog가 raw SQL로 바뀌었을 때 world_name의 색인을 비웁니다. 다음 검색에서 다시 채워집니다.
+    world_name이 없으면 어느 world가 바뀌었는지 알 수 없으므로 그 DB의 모든 world의 색인을 비웁니다.
+    """
+    with get_db_cursor(world_name) as cursor:
+        if world_name is None:
+            cursor.execute('DELETE FROM dialog_entity')
+            cursor.execute('DELETE FROM dialog_entity_name')
+        else:
+            cursor.execute('DELETE FROM dialog_entity WHERE world_name = ?', (world_name,))
+            cursor.execute('DELETE FROM dialog_entity_name WHERE world_name = ?', (world_name,))
@@ -0,0 +1,185 @@
+import base64
+import json
+
+from service.dialog_archive_service import iter_world_dialogs, search_archived_dialogs
+from service.dialog_entity_service import index_dialogs
+from service.dialog_write_behind import WRITE_BEHIND_ENABLED, dialog_writer
+from service.fts_query import column_phrase, scoped_match
+from service.repository_service import get_db_cursor
+from service.response_service import encode_row_set, encode_rows, row_set_json
+from service.result_cache import result_cache, write_generations
+
+DIALOG_PAGE_LIMIT = 100
+DIALOG_PAGE_MAX_LIMIT = 1000
+DIALOG_PAGE_MAX_BYTES = 64 * 1024
+
+DIALOG_SEARCH_LIMIT = 20
+DIALOG_SEARCH_MAX_LIMIT = 200
+DIALOG_SEARCH_MAX_BYTES = 64 * 1024
+DIALOG_EXCERPTS = ('dialog', 'snippet', 'highlight')
+
+# dialog 행의 컬럼. 응답에는 요청한 world_name을 되풀이하지 않도록 DIALOG_RESPONSE_COLUMNS만 넣습니다.
+DIALOG_COLUMNS = ('id', 'world_name', 'dialog')
+DIALOG_RESPONSE_COLUMNS = ['id', 'dialog']
+
+
+def insert_world_dialog(world_name: str, dialog: str):
+    # write-behind 모드에서는 큐에 넣고 바로 반환하며, 백그라운드 스레드가 묶어서 기록합니다.
+    if WRITE_BEHIND_ENABLED:
+        dialog_writer.enqueue(world_name, dialog)
+        return
+
+    with get_db_cursor(world_name) as cursor:
+        conn = cursor.connection
+
+        cursor.execute("""
+            INSERT INTO world_dialog (world_name, dialog) VALUES (?, ?)""",
+           (world_name, dialog))
+
+        index_dialogs(cursor, world_name, [(cursor.lastrowid, dialog)])
+
+        conn.commit()
+
+    write_generations.bump('world_dialog', world_name)
+
+
+def select_world_dialog(
+        world_name: str,
+        keyword: str,
+        limit: int = DIALOG_SEARCH_LIMIT,
+        excerpt: str = 'dialog',
+        max_bytes: int = DIALOG_SEARCH_MAX_BYTES
+) -> str:
+    """
+    search_world_dialog의 결과를 max_bytes까지만 row set JSON으로 인코딩하여 반환합니다.
+    같은 검색은 해당 world에 새 dialog가 추가되기 전까지 result_cache에서 반환합니다.
+    """
+    dialog_writer.flush_world(world_name)
+
+    return result_cache.get_or_compute(
+        ('select_world_dialog', world_name, keyword, limit, excerpt, max_bytes),
+        [('world_dialog', world_name)],
+        lambda: encode_row_set(
+            search_world_dialog(world_name, keyword, limit, excerpt),
+            DIALOG_COLUMNS,
+            DIALOG_RESPONSE_COLUMNS,
+            max_rows=None,
+            max_bytes=max_bytes
+        )
+    )
+
+
+def search_world_dialog(
+        world_name: str,
+        keyword: str,
+        limit: int = DIALOG_SEARCH_LIMIT,
+        excerpt: str = 'dialog'
+) -> list:
+    """
+    world_name에 속하는 dialog 중 keyword로 시작하는 단어를 포함하는 dialog를 bm25 순위대로 반환합니다.
+    excerpt가 'snippet'이면 키워드 주변만, 'highlight'이면 키워드를 표시한 전체 dialog를 반환합니다.
+    """
+    if excerpt not in DIALOG_EXCERPTS:
+        raise ValueError(f'excerpt must be one of {DIALOG_EXCERPTS}')
+
+    limit = max(1, min(limit, DIALOG_SEARCH_MAX_LIMIT))
+
+    dialog_column = {
+        'dialog': 'dialog',
+        'snippet': "snippet(world_dialog_fts5, 1, '[', ']', '...', 16)",
+        'highlight': "highlight(world_dialog_fts5, 1, '[', ']')",
+    }[excerpt]
+
+    # world_name 토큰도 MATCH 식에 넣어 색인 안에서 world를 거르고, 정확한 일치는 아래 조건으로 확인합니다.
+    match = scoped_match(world_name, column_phrase('dialog', keyword, prefix=True))
+
+    with get_db_cursor(world_name) as cursor:
+        dialogs = cursor.execute(
+            f"""
+                SELECT rowid, world_name, {dialog_column}
+                FROM world_dialog_fts5
+                WHERE world_dialog_fts5 MATCH ?
+                    AND world_name = ?
+                ORDER BY bm25(world_dialog_fts5, 0.0, 1.0)
+                LIMIT ?
+            """,
+            (match, world_name, limit)
+        ).fetchall()
+
+        # 압축된 오래된 dialog는 최근 dialog의 검색 결과 뒤에 최신 순으로 이어 붙입니다.
+        if len(dialogs) < limit:
+            dialogs += search_archived_dialogs(cursor, world_name, keyword, limit - len(dialogs), excerpt)
+
+        return dialogs
+
+
+def encode_dialog_cursor(after_id: int | None = None, before_id: int | None = None) -> str:
+    payload = json.dumps({'after_id': after_id, 'before_id': before_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_dialog_cursor(cursor: str) -> tuple[int | None, int | None]:
+    payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return payload.get('after_id'), payload.get('before_id')
+
+
+def select_all_before_dialogs(
+        world_name: str,
+        after_id: int | None = None,
+        before_id: int | None = None,
+        limit: int = DIALOG_PAGE_LIMIT,
+        max_bytes: int = DIALOG_PAGE_MAX_BYTES
+) -> str:
+    """
+    id 기준 keyset 페이지네이션으로 world의 dialog를 읽어 JSON 문자열로 반환합니다.
+    before_id만 주어지면 그 직전의 최신 dialog부터 거꾸로 읽습니다. 결과는 항상 id 오름차순입니다.
+    행마다 바로 인코딩하며, limit 또는 max_bytes를 넘기 전에 멈추고 next_cursor를 돌려줍니다.
+    압축된 오래된 dialog도 같은 id 순서로 이어서 읽습니다.
+    """
+    limit = max(1, min(limit, DIALOG_PAGE_MAX_LIMIT))
+    descending = before_id is not None and after_id is None
+
+    dialog_writer.flush_world(world_name)
+
+    dialog_ids = []
+
+    def page_rows():
+        for row_id, _, dialog in iter_world_dialogs(cursor, world_name, after_id, before_id, descending, limit + 1):
+            dialog_ids.append(row_id)
+            yield [row_id, dialog]
+
+    with get_db_cursor(world_name) as cursor:
+        parts, has_more = encode_rows(page_rows(), limit, max_bytes)
+
+    last_id = dialog_ids[len(parts) - 1] if parts else None
+    next_cursor = None
+
+    if has_more:
+        if descending:
+            next_cursor = encode_dialog_cursor(before_id=last_id)
+        else:
+            next_cursor = encode_dialog_cursor(after_id=last_id, before_id=before_id)
+
+    if descending:
+        parts.reverse()
+
+    return row_set_json(DIALOG_RESPONSE_COLUMNS, parts, has_more, next_cursor=next_cursor)
+
+
+def select_last_world_dialog(world_name: str) -> list:
+    dialog_writer.flush_world(world_name)
+
+    dialogs = []
+
+    with get_db_cursor(world_name) as cursor:
+        for row in cursor.execute(
+            """
+                SELECT * FROM world_dialog
+                WHERE world_name = ?
+                ORDER BY id DESC LIMIT 1
+            """,
+            (world_name,)
+        ):
+            dialogs.append(row)
+
+    return dialogs
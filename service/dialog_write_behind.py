@@ -0,0 +1,253 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+
+from service.repository_service import get_db_cursor, get_shard_name
+from service.result_cache import write_generations
+
+WRITE_BEHIND_ENABLED = os.environ.get('RPG_DIALOG_WRITE_BEHIND', '0') == '1'
+
+# 마지막 flush 이후 이 시간이 지나거나 이 행 수가 쌓이면 한 트랜잭션으로 기록합니다.
+FLUSH_INTERVAL_MS = int(os.environ.get('RPG_DIALOG_FLUSH_MS', '50'))
+FLUSH_ROWS = int(os.environ.get('RPG_DIALOG_FLUSH_ROWS', '500'))
+# 쓰기가 밀리면 이 행 수 이상은 쌓지 않고 insert를 기다리게 합니다.
+MAX_PENDING_ROWS = int(os.environ.get('RPG_DIALOG_MAX_PENDING', str(FLUSH_ROWS * 20)))
+
+# 기록하지 못하고 버린 행 중 stats(metrics://main)에 남길 최근 행 수
+DROPPED_ROWS_KEEP = int(os.environ.get('RPG_DIALOG_DROPPED_KEEP', '100'))
+
+INSERT_DIALOG_SQL = 'INSERT INTO world_dialog (world_name, dialog) VALUES (?, ?)'
+
+logger = logging.getLogger(__name__)
+
+
+class DialogWriteBehind:
+    """
+    insert_world_dialog의 행을 메모리 큐에 모았다가 백그라운드 스레드에서 묶어서 기록합니다.
+    여러 행이 하나의 트랜잭션(한 번의 commit)으로 들어가므로 fsync와 쓰기 lock 경합이 줄어듭니다.
+    읽기 전에 flush_world를 호출하면 같은 world에 대해 자신이 쓴 행을 항상 읽을 수 있습니다.
+    """
+
+    def __init__(
+            self,
+            flush_interval_ms: int = FLUSH_INTERVAL_MS,
+            flush_rows: int = FLUSH_ROWS,
+            max_pending_rows: int = MAX_PENDING_ROWS
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_rows = max(1, flush_rows)
+        self.max_pending_rows = max(self.flush_rows, max_pending_rows)
+
+        self._condition = threading.Condition()
+        self._pending: list[tuple[str, str]] = []
+        # 아직 commit되지 않은(큐에 있거나 기록 중인) 행 수
+        self._unflushed: Counter = Counter()
+
+        # flush는 한 번에 하나씩만 실행되어 id 순서가 insert 순서와 같습니다.
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+        self._stats = {
+            'enqueued': 0,
+            'flushed': 0,
+            'batches': 0,
+            'dropped': 0,
+            'last_error': None,
+        }
+        # insert_world_dialog가 이미 성공을 반환한 뒤에 버려진 행 (world_name, dialog, 오류, 시각)
+        self._dropped_rows: deque[dict] = deque(maxlen=DROPPED_ROWS_KEEP)
+
+    def enqueue(self, world_name: str, dialog: str):
+        if world_name is None or dialog is None:
+            raise ValueError('world_name and dialog are required')
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('dialog write-behind queue is closed')
+
+            self._start()
+
+            while len(self._pending) >= self.max_pending_rows:
+                self._condition.notify_all()
+                self._condition.wait()
+
+            self._pending.append((world_name, dialog))
+            self._unflushed[world_name] += 1
+            self._stats['enqueued'] += 1
+
+            if len(self._pending) >= self.flush_rows:
+                self._condition.notify_all()
+
+    def has_unflushed(self, world_name: str | None = None) -> bool:
+        with self._condition:
+            if world_name is None:
+                return bool(self._unflushed)
+
+            return self._unflushed[world_name] > 0
+
+    def flush_world(self, world_name: str | None = None):
+        """world_name(None이면 전체)의 기록되지 않은 행이 있다면 지금 기록합니다."""
+        if self.has_unflushed(world_name):
+            self.flush()
+
+    def flush(self):
+        # 기록 중인 다른 flush가 있다면 끝날 때까지 기다린 뒤 남은 행을 기록합니다.
+        with self._flush_lock:
+            with self._condition:
+                batch = self._pending
+                self._pending = []
+                self._condition.notify_all()
+
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list[tuple[str, str]]):
+        written = 0
+
+        try:
+            # 샤딩을 사용하면 shard마다 하나의 트랜잭션으로 기록합니다. world 안의 순서는 유지됩니다.
+            shard_batches: dict[str, list[tuple[str, str]]] = {}
+            for row in batch:
+                try:
+                    shard_name = get_shard_name(row[0])
+                except Exception as e:
+                    self._drop(row, e)
+                    continue
+
+                shard_batches.setdefault(shard_name, []).append(row)
+
+            for rows in shard_batches.values():
+                written += self._write_shard(rows)
+        finally:
+            # 어떤 오류가 나도 큐에서 꺼낸 행은 더 이상 기다릴 대상이 아닙니다.
+            world_names = Counter(world_name for world_name, dialog in batch)
+
+            with self._condition:
+                self._unflushed.subtract(world_names)
+                self._unflushed += Counter()  # 0 이하인 항목 제거
+
+                self._stats['flushed'] += written
+                self._stats['batches'] += 1
+
+            for world_name in world_names:
+                write_generations.bump('world_dialog', world_name)
+
+    def _write_shard(self, rows: list[tuple[str, str]]) -> int:
+        # 같은 shard의 행은 모두 같은 world_name으로 연결을 찾을 수 있습니다.
+        world_name = rows[0][0]
+
+        # dialog_entity_service가 이 모듈의 dialog_writer를 사용하므로 여기서 가져옵니다.
+        from service.dialog_entity_service import index_dialogs
+
+        try:
+            with get_db_cursor(world_name) as cursor:
+                # 쓰기 잠금을 먼저 잡아, last_id 이후의 id가 모두 이 묶음의 행이 되도록 합니다.
+                cursor.execute('BEGIN IMMEDIATE')
+                last_id = cursor.execute('SELECT coalesce(max(id), 0) FROM world_dialog').fetchone()[0]
+
+                cursor.executemany(INSERT_DIALOG_SQL, rows)
+
+                dialog_ids = [
+                    row[0] for row in cursor.execute('SELECT id FROM world_dialog WHERE id > ? ORDER BY id', (last_id,))
+                ]
+                world_dialogs: dict[str, list[tuple[int, str]]] = {}
+                for dialog_id, (row_world_name, dialog) in zip(dialog_ids, rows):
+                    world_dialogs.setdefault(row_world_name, []).append((dialog_id, dialog))
+
+                for row_world_name, dialogs in world_dialogs.items():
+                    index_dialogs(cursor, row_world_name, dialogs)
+            return len(rows)
+        except Exception as e:
+            # 한 행 때문에 묶음 전체를 잃지 않도록 한 행씩 다시 기록하고, 실패한 행만 버립니다.
+            with self._condition:
+                self._stats['last_error'] = repr(e)
+
+        written = 0
+        for row in rows:
+            try:
+                with get_db_cursor(world_name) as cursor:
+                    cursor.execute(INSERT_DIALOG_SQL, row)
+                    index_dialogs(cursor, row[0], [(cursor.lastrowid, row[1])])
+                written += 1
+            except Exception as row_error:
+                self._drop(row, row_error)
+
+        return written
+
+    def _drop(self, row: tuple[str, str], error: Exception):
+        logger.error('dropped dialog for world %r: %r (%r)', row[0], row[1], error)
+
+        with self._condition:
+            self._stats['dropped'] += 1
+            self._stats['last_error'] = repr(error)
+            self._dropped_rows.append({
+                'world_name': row[0],
+                'dialog': row[1],
+                'error': repr(error),
+                'at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            })
+
+    def _start(self):
+        # 스레드가 예상하지 못한 이유로 끝났다면 다시 시작합니다.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='rpg-dialog-write-behind', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.flush_interval
+
+                while not self._closed and len(self._pending) < self.flush_rows:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                closed = self._closed
+
+            try:
+                self.flush()
+            except Exception as e:
+                # 스레드가 끝나면 큐가 차서 enqueue가 영원히 기다리므로, 오류를 남기고 계속 실행합니다.
+                logger.exception('dialog write-behind flush failed')
+                with self._condition:
+                    self._stats['last_error'] = repr(e)
+
+            if closed:
+                return
+
+    def close(self):
+        """백그라운드 스레드를 멈추고 남은 행을 모두 기록합니다."""
+        with self._condition:
+            if self._closed:
+                return
+
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join()
+
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                'enabled': WRITE_BEHIND_ENABLED,
+                'pending': len(self._pending),
+                'unflushed_worlds': len(self._unflushed),
+                **self._stats,
+                'dropped_rows': list(self._dropped_rows),
+            }
+
+
+dialog_writer = DialogWriteBehind()
+
+if WRITE_BEHIND_ENABLED:
+    atexit.register(dialog_writer.close)
@@ -0,0 +1,128 @@
+import threading
+from typing import TYPE_CHECKING
+
+from service.character_service import get_characters
+
+# numpy는 import 시간이 길어 서버 시작을 늦추므로, 처음 판정할 때 불러옵니다.
+if TYPE_CHECKING:
+    import numpy as np
+
+STAT_NAMES = (
+    'stat_charisma',
+    'stat_strength',
+    'stat_wisdom',
+    'stat_dexterity',
+    'stat_intelligence',
+    'stat_constitution',
+)
+STAT_COUNT = len(STAT_NAMES)
+
+# 판정 주사위 (0 ~ 9)
+DICE_SIDES = 10
+
+CHECK_RESULT_COLUMNS = ('character_name', 'req_stat_name', 'req_stat', 'stat', 'roll', 'result')
+
+# world마다 독립적인 난수 흐름을 갖습니다. Generator는 thread-safe 하지 않으므로 lock과 함께 보관합니다.
+_world_rngs: dict[str | None, tuple['np.random.Generator', threading.Lock]] = {}
+_world_rngs_lock = threading.Lock()
+
+
+def seed_world(world_name: str | None, seed: int | None = None):
+    """world의 난수 흐름을 seed로 다시 시작합니다. 같은 seed와 같은 호출 순서라면 같은 결과가 나옵니다."""
+    import numpy as np
+
+    with _world_rngs_lock:
+        _world_rngs[world_name] = (np.random.default_rng(seed), threading.Lock())
+
+
+def _get_world_rng(world_name: str | None) -> tuple['np.random.Generator', threading.Lock]:
+    import numpy as np
+
+    with _world_rngs_lock:
+        if world_name not in _world_rngs:
+            _world_rngs[world_name] = (np.random.default_rng(), threading.Lock())
+
+        return _world_rngs[world_name]
+
+
+def resolve_checks(world_name: str, checks: list[dict]) -> list[dict]:
+    """
+    checks의 각 항목(character_name, req_stat_name, req_stat)을 한 번에 판정합니다.
+    캐릭터의 스탯이 req_stat 이상이면 성공, 모자라면 모자란 만큼 0~9 주사위가 그보다 작을 때 실패합니다.
+    """
+    import numpy as np
+
+    for check in checks:
+        if check['req_stat_name'] not in STAT_NAMES:
+            raise ValueError(f"req_stat_name must be one of {STAT_NAMES}: {check['req_stat_name']}")
+
+    characters = get_characters(world_name, [check['character_name'] for check in checks])
+
+    missing = sorted({check['character_name'] for check in checks} - characters.keys())
+    if missing:
+        raise ValueError(f'unknown characters in {world_name}: {missing}')
+
+    character_stats = np.array(
+        [characters[check['character_name']][check['req_stat_name']] for check in checks],
+        dtype=np.int64
+    )
+    req_stats = np.array([check['req_stat'] for check in checks], dtype=np.int64)
+
+    rng, rng_lock = _get_world_rng(world_name)
+    with rng_lock:
+        rolls = rng.integers(0, DICE_SIDES, size=len(checks))
+
+    lack_stats = req_stats - character_stats
+    successes = (lack_stats <= 0) | (rolls >= lack_stats)
+
+    return [
+        {
+            'character_name': check['character_name'],
+            'req_stat_name': check['req_stat_name'],
+            'req_stat': check['req_stat'],
+            'stat': int(character_stat),
+            'roll': int(roll),
+            'result': 'success' if success else 'fail',
+        }
+        for check, character_stat, roll, success in zip(checks, character_stats, rolls, successes)
+    ]
+
+
+def divide_stats(total_stats: list[int], world_name: str | None = None) -> list[dict]:
+    """
+    각 total_stat을 6개의 스탯으로 무작위 분배합니다. 모든 스탯은 1 이상입니다.
+    1 ~ total_stat-1 중 서로 다른 5개의 경계를 Floyd의 방법으로 뽑습니다. random.sample과 같은 분포이며,
+    모든 캐릭터의 경계를 5번의 벡터 연산으로 뽑으므로 total_stat의 크기와 관계없이 캐릭터마다 O(1)입니다.
+    """
+    import numpy as np
+
+    totals = np.asarray(total_stats, dtype=np.int64)
+
+    if totals.size == 0:
+        return []
+    if totals.min() < STAT_COUNT:
+        raise ValueError(f'total_stat must be at least {STAT_COUNT}')
+
+    divider_count = STAT_COUNT - 1
+    dividers = np.zeros((totals.size, divider_count), dtype=np.int64)
+
+    rng, rng_lock = _get_world_rng(world_name)
+    with rng_lock:
+        for i in range(divider_count):
+            # 1 ~ upper에서 하나를 뽑고, 이미 뽑은 값이면 upper를 대신 넣습니다. (upper는 아직 뽑힐 수 없는 값입니다)
+            upper = totals - divider_count + i
+            picks = rng.integers(1, upper + 1)
+            duplicated = (dividers[:, :i] == picks[:, None]).any(axis=1)
+            dividers[:, i] = np.where(duplicated, upper, picks)
+
+    dividers.sort(axis=1)
+    dividers = np.concatenate(
+        [np.zeros((totals.size, 1), dtype=np.int64), dividers, totals[:, None]],
+        axis=1
+    )
+    stats = np.diff(dividers, axis=1)
+
+    return [
+        {stat_name: int(value) for stat_name, value in zip(STAT_NAMES, row)}
+        for row in stats
+    ]
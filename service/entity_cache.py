@@ -0,0 +1,87 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+ENTITY_CACHE_SIZE = int(os.environ.get('RPG_ENTITY_CACHE_SIZE', '4096'))
+
+# upsert_data의 SQL에서 변경 대상 테이블을 찾습니다.
+# UPDATE OR REPLACE 같은 충돌 처리 절과 main. 같은 schema 이름은 건너뜁니다.
+SQL_TABLE_PATTERN = re.compile(
+    r'\b(?:UPDATE(?:\s+OR\s+(?:ROLLBACK|ABORT|REPLACE|FAIL|IGNORE))?|INTO|FROM|JOIN)\s+'
+    r'(?:["`\[]?\w+["`\]]?\s*\.\s*)?["`\[]?(\w+)',
+    re.IGNORECASE
+)
+
+
+class EntityCache:
+    """
+    (테이블 이름, world_name, ...) 키로 조회 결과를 보관하는 LRU 캐시입니다.
+    키의 첫 요소가 테이블 이름이므로 테이블 단위로 무효화할 수 있습니다.
+    """
+
+    def __init__(self, max_entries: int = ENTITY_CACHE_SIZE):
+        self.max_entries = max_entries
+
+        self._entries: OrderedDict[tuple, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> tuple[bool, object]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+
+            self.misses += 1
+            return False, None
+
+    def put(self, key: tuple, value):
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: tuple):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_table(self, table_name: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == table_name]:
+                del self._entries[key]
+
+    def invalidate_sql(self, sql: str):
+        """raw SQL이 변경할 수 있는 테이블의 항목을 모두 지웁니다. 테이블을 알 수 없으면 전부 지웁니다."""
+        table_names = {name.lower() for name in SQL_TABLE_PATTERN.findall(sql)}
+
+        if not table_names:
+            self.clear()
+            return
+
+        for table_name in table_names:
+            self.invalidate_table(table_name)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+entity_cache = EntityCache()
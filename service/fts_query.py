@@ -0,0 +1,44 @@
+"""
+FTS5 MATCH 식을 만들고, FTS5 unicode61 토크나이저와 같은 규칙으로 문자열을 단어로 나눕니다.
+MATCH 식의 따옴표 처리와 단어 규칙이 검색하는 곳마다 달라지지 않도록 이 모듈만 사용합니다.
+"""
+import re
+import unicodedata
+
+# FTS5 unicode61 토크나이저처럼 문자와 숫자의 연속을 단어로 봅니다. ('_'는 구분자)
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+WORD_PATTERN = re.compile(r'\w')
+
+
+def fold(token: str) -> str:
+    # unicode61의 기본 설정(소문자화, 라틴 문자의 발음 구별 기호 제거)과 같게 정규화합니다.
+    if token.isascii():
+        return token.lower()
+
+    decomposed = unicodedata.normalize('NFKD', token.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> list[tuple[str, int, int]]:
+    """text의 단어들을 (정규화한 단어, 시작 위치, 끝 위치)로 반환합니다."""
+    return [(fold(match.group()), match.start(), match.end()) for match in TOKEN_PATTERN.finditer(text)]
+
+
+def phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def column_phrase(column: str, value: str, prefix: bool = False) -> str:
+    """column에서 value를 구(phrase)로 찾는 식입니다. prefix이면 마지막 단어는 접두어로 일치합니다."""
+    return f'{column} : {phrase(value)}' + ('*' if prefix else '')
+
+
+def scoped_match(world_name: str, expression: str) -> str:
+    """
+    world_name 컬럼의 일치도 식에 넣어 색인 안에서 world를 거릅니다.
+    world_name에 단어가 없으면 식에 넣을 수 없으므로, 정확한 일치는 호출하는 쪽의 world_name = ? 조건으로 확인합니다.
+    """
+    if WORD_PATTERN.search(world_name):
+        return f'{column_phrase("world_name", world_name)} AND {expression}'
+
+    return expression
@@ -0,0 +1,141 @@
+from sqlmodel import SQLModel
+
+from service.dialog_archive_service import iter_world_dialogs
+from service.dialog_service import encode_dialog_cursor
+from service.dialog_write_behind import dialog_writer
+from service.repository_service import get_db_cursor
+from service.response_service import dumps, row_set
+
+RESUME_DIALOG_LIMIT = 20
+RESUME_DIALOG_MAX_BYTES = 32 * 1024
+RESUME_ENTITY_LIMIT = 200
+
+# load_game에 포함되는 섹션과 선택 가능한 컬럼
+RESUME_SECTIONS = ('world', 'character', 'character_inventory', 'character_attitude', 'world_dialog')
+WORLD_DIALOG_COLUMNS = ('id', 'world_name', 'dialog')
+
+
+def _section_columns(section: str) -> tuple[str, ...]:
+    if section == 'world_dialog':
+        return WORLD_DIALOG_COLUMNS
+
+    return tuple(column.name for column in SQLModel.metadata.tables[section].columns)
+
+
+def _project(section: str, fields: dict[str, list[str]] | None) -> list[str]:
+    columns = _section_columns(section)
+
+    # world 외의 섹션은 모두 요청한 world의 행이므로 기본으로 world_name을 되풀이하지 않습니다.
+    if fields is None or section not in fields:
+        return [column for column in columns if section == 'world' or column != 'world_name']
+
+    unknown = [column for column in fields[section] if column not in columns]
+    if unknown:
+        raise ValueError(f'unknown columns for {section}: {unknown}')
+
+    return list(fields[section])
+
+
+def _select_rows(cursor, sql: str, params: tuple) -> list[dict]:
+    cursor.execute(sql, params)
+    names = [description[0] for description in cursor.description]
+
+    return [dict(zip(names, row)) for row in cursor]
+
+
+def load_game(
+        world_name: str,
+        dialog_limit: int = RESUME_DIALOG_LIMIT,
+        max_dialog_bytes: int = RESUME_DIALOG_MAX_BYTES,
+        entity_limit: int = RESUME_ENTITY_LIMIT,
+        fields: dict[str, list[str]] | None = None
+) -> dict:
+    """
+    게임을 이어하는 데 필요한 world, 캐릭터, 0개가 아닌 인벤토리, 태도, 최근 dialog를 하나의 읽기 트랜잭션으로 읽습니다.
+    fields는 섹션 이름별로 반환할 컬럼 목록이며, 빈 목록이면 해당 섹션을 생략합니다.
+    world 외의 섹션은 {"columns", "rows"} 형태의 row set입니다.
+    """
+    unknown_sections = [section for section in (fields or {}) if section not in RESUME_SECTIONS]
+    if unknown_sections:
+        raise ValueError(f'unknown sections: {unknown_sections}')
+
+    projections = {section: _project(section, fields) for section in RESUME_SECTIONS}
+
+    dialog_limit = max(1, dialog_limit)
+    entity_limit = max(1, entity_limit)
+
+    result = {}
+    truncated = []
+
+    dialog_writer.flush_world(world_name)
+
+    # world는 catalog에, 나머지 섹션은 world의 shard에 있습니다. (샤딩을 사용하지 않으면 같은 DB)
+    if projections['world']:
+        with get_db_cursor() as cursor:
+            rows = _select_rows(
+                cursor,
+                f"SELECT {', '.join(projections['world'])} FROM world WHERE world_name = ?",
+                (world_name,)
+            )
+            result['world'] = rows[0] if rows else None
+
+    with get_db_cursor(world_name) as cursor:
+        # 모든 섹션이 같은 스냅샷을 보도록 하나의 읽기 트랜잭션으로 묶습니다.
+        cursor.execute('BEGIN')
+
+        for section, condition in (
+            ('character', ''),
+            ('character_inventory', 'AND item_count > 0'),
+            ('character_attitude', ''),
+        ):
+            columns = projections[section]
+            if not columns:
+                continue
+
+            rows = _select_rows(
+                cursor,
+                f"""
+                    SELECT {', '.join(columns)}
+                    FROM {section}
+                    WHERE world_name = ? {condition}
+                    LIMIT ?
+                """,
+                (world_name, entity_limit + 1)
+            )
+
+            if len(rows) > entity_limit:
+                rows = rows[:entity_limit]
+                truncated.append(section)
+
+            result[section] = row_set(rows, columns)
+
+        columns = projections['world_dialog']
+        if columns:
+            dialogs = []
+            size = 0
+            oldest_id = None
+
+            # 최신 dialog부터 거꾸로 읽어 dialog_limit, max_dialog_bytes 안에서 자릅니다.
+            for row in iter_world_dialogs(cursor, world_name, descending=True, limit=dialog_limit + 1):
+                dialog = [row[WORLD_DIALOG_COLUMNS.index(name)] for name in columns]
+                dialog_size = len(dumps(dialog).encode())
+
+                if len(dialogs) >= dialog_limit or (dialogs and size + dialog_size > max_dialog_bytes):
+                    truncated.append('world_dialog')
+                    break
+
+                dialogs.append(dialog)
+                size += dialog_size
+                oldest_id = row[0]
+
+            dialogs.reverse()
+            result['world_dialog'] = {'columns': columns, 'rows': dialogs}
+
+            # 더 이전의 이야기는 select_all_before_dialogs에 이 cursor를 넘겨 이어서 읽습니다.
+            result['next_dialog_cursor'] = (
+                encode_dialog_cursor(before_id=oldest_id) if 'world_dialog' in truncated else None
+            )
+
+    result['truncated'] = truncated
+
+    return result
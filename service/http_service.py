@@ -0,0 +1,103 @@
+"""
+HTTP(SSE) 배포 모드입니다. 여러 워커 프로세스가 같은 DB를 사용합니다.
+
+사용법:
+    python -m service.http_service --workers 4 --host 0.0.0.0 --port 8000
+
+워커 i는 port + i에서 SSE(/sse, /messages/)와 /healthz, /readyz를 제공합니다.
+MCP SSE 세션은 연결을 연 프로세스의 메모리에 있으므로, 하나의 세션은 같은 워커로만 요청해야 합니다.
+클라이언트를 워커 포트에 나누어 연결하거나, 앞단 프록시에서 session_id 기준 sticky 라우팅을 사용하십시오.
+
+워커 간 쓰기는 SQLite WAL 잠금(busy timeout, BEGIN IMMEDIATE)으로 조정되며,
+RPG_CROSS_PROCESS_SYNC=1로 실행되어 다른 워커의 쓰기를 PRAGMA data_version으로 감지해 캐시를 비웁니다.
+RPG_DIALOG_WRITE_BEHIND=1이면 아직 flush되지 않은 dialog는 그것을 받은 워커에서만 보입니다. (최대 RPG_DIALOG_FLUSH_MS)
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+
+HTTP_HOST = os.environ.get('RPG_HTTP_HOST', '127.0.0.1')
+HTTP_PORT = int(os.environ.get('RPG_HTTP_PORT', '8000'))
+HTTP_WORKERS = int(os.environ.get('RPG_HTTP_WORKERS', '1'))
+# 종료할 때 열린 SSE 세션을 기다리는 최대 시간(초)입니다. 끊긴 세션의 작업이 남아 있으면 이 시간 뒤에 강제로 종료합니다.
+HTTP_SHUTDOWN_SECONDS = int(os.environ.get('RPG_HTTP_SHUTDOWN_SECONDS', '5'))
+
+
+def check_ready() -> dict:
+    """DB migration을 마치고 catalog에 읽기/쓰기 연결이 가능한지 확인합니다."""
+    from service.migration_service import SCHEMA_VERSION, get_schema_version
+    from service.repository_service import connection_pool, initialize_database
+
+    initialize_database()
+
+    schema_version = get_schema_version(connection_pool.connection())
+    if schema_version < SCHEMA_VERSION:
+        raise RuntimeError(f'schema version {schema_version} < {SCHEMA_VERSION}')
+
+    return {'schema_version': schema_version, 'pid': os.getpid()}
+
+
+def _run_worker(host: str, port: int, log_level: str):
+    import uvicorn
+
+    # server를 import하기 전에 설정해야 합니다.
+    os.environ['RPG_CROSS_PROCESS_SYNC'] = '1'
+
+    uvicorn.run(
+        'server:create_http_app',
+        factory=True,
+        host=host,
+        port=port,
+        log_level=log_level,
+        timeout_graceful_shutdown=HTTP_SHUTDOWN_SECONDS
+    )
+
+
+def serve(host: str = HTTP_HOST, port: int = HTTP_PORT, workers: int = HTTP_WORKERS, log_level: str = 'info'):
+    workers = max(1, workers)
+
+    # fork된 워커가 부모의 SQLite 연결을 물려받지 않도록 spawn을 사용합니다.
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(target=_run_worker, args=(host, port + index, log_level), name=f'rpg-http-{port + index}')
+        for index in range(workers)
+    ]
+
+    for process in processes:
+        process.start()
+        print(f'worker pid={process.pid} http://{host}:{process.name.rsplit("-", 1)[1]}/sse', file=sys.stderr)
+
+    def _stop(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+        for process in processes:
+            process.join(HTTP_SHUTDOWN_SECONDS + 5)
+            if process.is_alive():
+                process.kill()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    for process in processes:
+        process.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument('--host', default=HTTP_HOST)
+    parser.add_argument('--port', type=int, default=HTTP_PORT, help='첫 워커의 포트 (워커 i는 port + i)')
+    parser.add_argument('--workers', type=int, default=HTTP_WORKERS)
+    parser.add_argument('--log-level', default='info')
+
+    args = parser.parse_args(argv)
+
+    serve(args.host, args.port, args.workers, args.log_level)
+
+
+if __name__ == '__main__':
+    main()
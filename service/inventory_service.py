@@ -0,0 +1,161 @@
+from service.repository_service import get_db_cursor
+from service.result_cache import write_generations
+
+# 개수를 더하는 delta는 하나의 UPSERT로, 새 아이템이면 만들고 이미 있으면 개수를 더합니다.
+ADD_ITEM_SQL = """
+    INSERT INTO character_inventory (world_name, character_name, item_name, item_description, item_count)
+    VALUES (?, ?, ?, coalesce(?, ''), ?)
+    ON CONFLICT (world_name, character_name, item_name) DO UPDATE SET
+        item_count = item_count + excluded.item_count,
+        item_description = coalesce(?, item_description)
+    RETURNING item_count
+"""
+
+# 개수를 빼는 delta는 남은 개수가 0 이상일 때만 적용됩니다.
+CONSUME_ITEM_SQL = """
+    UPDATE character_inventory
+    SET item_count = item_count - ?
+    WHERE world_name = ? AND character_name = ? AND item_name = ?
+        AND item_count >= ?
+    RETURNING item_count
+"""
+
+# 받는 캐릭터에게 없는 아이템이면 보내는 캐릭터의 item_description으로 만듭니다.
+RECEIVE_ITEM_SQL = """
+    INSERT INTO character_inventory (world_name, character_name, item_name, item_description, item_count)
+    SELECT world_name, ?, item_name, item_description, ?
+    FROM character_inventory
+    WHERE world_name = ? AND character_name = ? AND item_name = ?
+    ON CONFLICT (world_name, character_name, item_name) DO UPDATE SET
+        item_count = item_count + excluded.item_count
+    RETURNING item_count
+"""
+
+
+def _add(cursor, world_name: str, character_name: str, item_name: str, count: int, item_description: str | None) -> int:
+    return cursor.execute(
+        ADD_ITEM_SQL,
+        (world_name, character_name, item_name, item_description, count, item_description)
+    ).fetchone()[0]
+
+
+def _consume(cursor, world_name: str, character_name: str, item_name: str, count: int) -> int:
+    row = cursor.execute(CONSUME_ITEM_SQL, (count, world_name, character_name, item_name, count)).fetchone()
+
+    if row is None:
+        current = cursor.execute(
+            """
+                SELECT item_count FROM character_inventory
+                WHERE world_name = ? AND character_name = ? AND item_name = ?
+            """,
+            (world_name, character_name, item_name)
+        ).fetchone()
+
+        raise ValueError(
+            f'{character_name} has {current[0] if current else 0} {item_name}, cannot consume {count}'
+        )
+
+    return row[0]
+
+
+def _apply(cursor, world_name: str, character_name: str, item_name: str, delta: int, item_description: str | None) -> int:
+    if delta >= 0:
+        return _add(cursor, world_name, character_name, item_name, delta, item_description)
+
+    return _consume(cursor, world_name, character_name, item_name, -delta)
+
+
+def _positive(count: int) -> int:
+    if count <= 0:
+        raise ValueError(f'count must be positive: {count}')
+    return count
+
+
+def add_item(
+        world_name: str,
+        character_name: str,
+        item_name: str,
+        count: int = 1,
+        item_description: str | None = None
+) -> dict:
+    with get_db_cursor(world_name) as cursor:
+        item_count = _add(cursor, world_name, character_name, item_name, _positive(count), item_description)
+
+    write_generations.bump('character_inventory', world_name)
+
+    return {'character_name': character_name, 'item_name': item_name, 'item_count': item_count}
+
+
+def consume_item(world_name: str, character_name: str, item_name: str, count: int = 1) -> dict:
+    with get_db_cursor(world_name) as cursor:
+        item_count = _consume(cursor, world_name, character_name, item_name, _positive(count))
+
+    write_generations.bump('character_inventory', world_name)
+
+    return {'character_name': character_name, 'item_name': item_name, 'item_count': item_count}
+
+
+def transfer_item(
+        world_name: str,
+        from_character_name: str,
+        to_character_name: str,
+        item_name: str,
+        count: int = 1
+) -> dict:
+    """보내는 캐릭터의 개수를 빼고 받는 캐릭터의 개수를 더하는 것을 하나의 트랜잭션으로 처리합니다."""
+    _positive(count)
+
+    if from_character_name == to_character_name:
+        raise ValueError('from_character_name and to_character_name must differ')
+
+    with get_db_cursor(world_name) as cursor:
+        cursor.execute('BEGIN IMMEDIATE')
+
+        from_count = _consume(cursor, world_name, from_character_name, item_name, count)
+        to_count = cursor.execute(
+            RECEIVE_ITEM_SQL,
+            (to_character_name, count, world_name, from_character_name, item_name)
+        ).fetchone()[0]
+
+    write_generations.bump('character_inventory', world_name)
+
+    return {
+        'item_name': item_name,
+        'from': {'character_name': from_character_name, 'item_count': from_count},
+        'to': {'character_name': to_character_name, 'item_count': to_count},
+    }
+
+
+def apply_deltas(world_name: str, deltas: list[dict]) -> list[dict]:
+    """
+    deltas의 각 항목(character_name, item_name, delta, 선택적으로 item_description)을 순서대로 하나의 트랜잭션으로 적용합니다.
+    delta가 양수면 더하고(없으면 생성), 음수면 뺍니다. 하나라도 개수가 모자라면 아무것도 적용되지 않습니다.
+    """
+    result = []
+
+    with get_db_cursor(world_name) as cursor:
+        cursor.execute('BEGIN IMMEDIATE')
+
+        for delta in deltas:
+            for field in ('character_name', 'item_name', 'delta'):
+                if delta.get(field) is None:
+                    raise ValueError(f'{field} is required: {delta}')
+
+            item_count = _apply(
+                cursor,
+                world_name,
+                delta['character_name'],
+                delta['item_name'],
+                int(delta['delta']),
+                delta.get('item_description')
+            )
+
+            result.append({
+                'character_name': delta['character_name'],
+                'item_name': delta['item_name'],
+                'item_count': item_count,
+            })
+
+    write_generations.bump('character_inventory', world_name)
+
+    return result
@@ -0,0 +1,286 @@
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event
+
+METRICS_ENABLED = os.environ.get('RPG_METRICS', '1') != '0'
+METRICS_FILE = os.environ.get('RPG_METRICS_FILE')
+
+SLOW_QUERY_MS = float(os.environ.get('RPG_SLOW_QUERY_MS', '100'))
+SLOW_QUERY_LIMIT = 50
+STATEMENT_LIMIT = 500
+
+# 지연 시간 히스토그램의 버킷 상한 (ms)
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# 현재 실행 중인 툴 호출의 SQL 통계. anyio 워커 스레드에도 context가 복사되어 전달됩니다.
+_current_call: contextvars.ContextVar[dict | None] = contextvars.ContextVar('rpg_current_call', default=None)
+
+
+class _Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+
+    def observe(self, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+        for index, upper in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= upper:
+                self.buckets[index] += 1
+                break
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'buckets': {
+                ('inf' if upper == float('inf') else str(upper)): bucket_count
+                for upper, bucket_count in zip(LATENCY_BUCKETS_MS, self.buckets)
+            },
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+        self._tools: dict[str, dict] = {}
+        self._statements: dict[str, dict] = {}
+        self._slow_queries: list[dict] = []
+
+    def record_tool(self, name: str, elapsed_ms: float, error: bool, call: dict, response):
+        with self._lock:
+            tool = self._tools.get(name)
+            if tool is None:
+                tool = self._tools[name] = {
+                    'latency': _Histogram(),
+                    'errors': 0,
+                    'statements': 0,
+                    'rows': 0,
+                    'response_bytes': 0,
+                }
+
+            tool['latency'].observe(elapsed_ms)
+            tool['errors'] += 1 if error else 0
+            tool['statements'] += call['statements']
+            tool['rows'] += call['rows']
+            if isinstance(response, str):
+                tool['response_bytes'] += len(response)
+
+    def record_statement(self, sql: str, elapsed_ms: float, rows: int = 0):
+        call = _current_call.get()
+        if call is not None:
+            call['statements'] += 1
+            call['rows'] += rows
+
+        key = WHITESPACE_PATTERN.sub(' ', sql).strip()[:200]
+
+        with self._lock:
+            statement = self._statements.get(key)
+            if statement is None:
+                # 임의 SQL(select_data 등)로 통계가 무한히 늘어나지 않도록 제한합니다.
+                if len(self._statements) >= STATEMENT_LIMIT:
+                    key = '<other>'
+                    statement = self._statements.get(key)
+
+                if statement is None:
+                    statement = self._statements[key] = {'latency': _Histogram(), 'rows': 0}
+
+            statement['latency'].observe(elapsed_ms)
+            statement['rows'] += rows
+
+    def add_rows(self, rows: int):
+        call = _current_call.get()
+        if call is not None:
+            call['rows'] += rows
+
+    def record_slow_query(self, sql: str, elapsed_ms: float, plan: list):
+        with self._lock:
+            self._slow_queries.append({
+                'sql': WHITESPACE_PATTERN.sub(' ', sql).strip(),
+                'elapsed_ms': round(elapsed_ms, 3),
+                'query_plan': plan,
+                'at': time.time(),
+            })
+            del self._slow_queries[:-SLOW_QUERY_LIMIT]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'enabled': METRICS_ENABLED,
+                'uptime_seconds': round(time.time() - self._started, 3),
+                'tools': {
+                    name: {**tool, 'latency': tool['latency'].to_dict()}
+                    for name, tool in self._tools.items()
+                },
+                'statements': {
+                    sql: {**statement, 'latency': statement['latency'].to_dict()}
+                    for sql, statement in self._statements.items()
+                },
+                'slow_queries': list(self._slow_queries),
+            }
+
+
+metrics = MetricsRegistry()
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, parameters=()) -> list:
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')):
+        return []
+
+    try:
+        return [row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', parameters or ())]
+    except sqlite3.Error as e:
+        return [f'<explain failed: {e}>']
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """get_db_cursor가 사용하는 커서입니다. 실행과 fetch에 걸린 시간과 읽은 행 수를 기록합니다."""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        result = super().execute(sql, parameters)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        metrics.record_statement(sql, elapsed_ms)
+        if elapsed_ms >= SLOW_QUERY_MS:
+            metrics.record_slow_query(sql, elapsed_ms, explain_query_plan(self.connection, sql, parameters))
+
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        metrics.record_statement(sql, (time.perf_counter() - started) * 1000, max(self.rowcount, 0))
+
+        return result
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            metrics.add_rows(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        metrics.add_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        metrics.add_rows(len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        metrics.add_rows(1)
+        return row
+
+
+def _instrument_engine(engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('rpg_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info['rpg_query_started'].pop()) * 1000
+
+        metrics.record_statement(statement, elapsed_ms, max(cursor.rowcount, 0))
+        if elapsed_ms >= SLOW_QUERY_MS and not executemany:
+            metrics.record_slow_query(statement, elapsed_ms, explain_query_plan(cursor.connection, statement, parameters))
+
+
+def _instrument_tool(tool):
+    fn = tool.fn
+
+    def _finish(started: float, error: bool, call: dict, response):
+        metrics.record_tool(tool.name, (time.perf_counter() - started) * 1000, error, call, response)
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            call = {'statements': 0, 'rows': 0}
+            token = _current_call.set(call)
+            started = time.perf_counter()
+            response = None
+            error = True
+            try:
+                response = await fn(*args, **kwargs)
+                error = False
+                return response
+            finally:
+                _current_call.reset(token)
+                _finish(started, error, call, response)
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            call = {'statements': 0, 'rows': 0}
+            token = _current_call.set(call)
+            started = time.perf_counter()
+            response = None
+            error = True
+            try:
+                response = fn(*args, **kwargs)
+                error = False
+                return response
+            finally:
+                _current_call.reset(token)
+                _finish(started, error, call, response)
+
+    tool.fn = wrapper
+
+
+def dump_metrics(path: str | None = METRICS_FILE):
+    if not path:
+        return
+
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(metrics.snapshot(), file, ensure_ascii=False, indent=2)
+
+
+def instrument(mcp, engine, *connection_pools):
+    """
+    등록된 모든 툴, SQLAlchemy 엔진, get_db_cursor의 sqlite3 커서에 측정을 설치합니다.
+    RPG_METRICS=0이면 아무것도 설치하지 않으므로 비용이 없습니다.
+    """
+    if not METRICS_ENABLED:
+        return
+
+    for tool in mcp._tool_manager.list_tools():
+        _instrument_tool(tool)
+
+    _instrument_engine(engine)
+    for connection_pool in connection_pools:
+        connection_pool.cursor_factory = InstrumentedCursor
+
+    if METRICS_FILE:
+        atexit.register(dump_metrics, METRICS_FILE)
+
+
+def instrument_shard(shard):
+    """ShardRouter가 새로 연 shard의 엔진과 커서에 측정을 설치합니다."""
+    if not METRICS_ENABLED:
+        return
+
+    _instrument_engine(shard.engine)
+    shard.connection_pool.cursor_factory = InstrumentedCursor
+    shard.read_only_pool.cursor_factory = InstrumentedCursor
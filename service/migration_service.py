@@ -0,0 +1,230 @@
+import sqlite3
+import sys
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateTable
+from sqlmodel import SQLModel
+
+# 모든 테이블 모델이 SQLModel.metadata에 등록되어야 합니다.
+from model import character, character_attitude, character_inventory, world  # noqa: F401
+
+
+def _create_model_tables(cursor: sqlite3.Cursor):
+    for table in SQLModel.metadata.sorted_tables:
+        cursor.execute(str(CreateTable(table, if_not_exists=True).compile(dialect=sqlite.dialect())))
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS world_dialog (
+            id INTEGER PRIMARY KEY,
+
+            world_name TEXT,
+
+            dialog TEXT
+    )
+    ''')
+
+
+def _create_world_dialog_fts(cursor: sqlite3.Cursor):
+    # world_name 컬럼이 없는 이전 FTS 테이블이라면 트리거와 함께 다시 만들고 색인을 재구축합니다.
+    row = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'world_dialog_fts5'"
+    ).fetchone()
+
+    fts_recreated = row is not None and 'world_name' not in row[0]
+
+    if fts_recreated:
+        cursor.execute('DROP TRIGGER IF EXISTS world_dialog_ai')
+        cursor.execute('DROP TRIGGER IF EXISTS world_dialog_ad')
+        cursor.execute('DROP TRIGGER IF EXISTS world_dialog_au')
+        cursor.execute('DROP TABLE world_dialog_fts5')
+
+    # world_name도 색인하여 world 범위의 검색을 FTS 색인 안에서 처리합니다.
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS world_dialog_fts5 USING fts5(
+            world_name,
+            dialog,
+            tokenize='unicode61',
+            content=world_dialog,
+            content_rowid=id
+    )
+   ''')
+
+    # 트리거 생성 - 기본 테이블 변경 시 FTS 테이블 자동 업데이트
+    # external content 테이블이므로 삭제는 'delete' 명령에 이전 값을 넘겨야 합니다.
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS world_dialog_ai AFTER INSERT ON world_dialog BEGIN
+            INSERT INTO world_dialog_fts5(rowid, world_name, dialog) VALUES (new.id, new.world_name, new.dialog);
+        END
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS world_dialog_ad AFTER DELETE ON world_dialog BEGIN
+        INSERT INTO world_dialog_fts5(world_dialog_fts5, rowid, world_name, dialog)
+        VALUES ('delete', old.id, old.world_name, old.dialog);
+    END
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS world_dialog_au AFTER UPDATE ON world_dialog BEGIN
+        INSERT INTO world_dialog_fts5(world_dialog_fts5, rowid, world_name, dialog)
+        VALUES ('delete', old.id, old.world_name, old.dialog);
+        INSERT INTO world_dialog_fts5(rowid, world_name, dialog) VALUES (new.id, new.world_name, new.dialog);
+    END
+    ''')
+
+    # 다시 만든 FTS 테이블은 기존 world_dialog 내용으로 색인을 채웁니다.
+    if fts_recreated:
+        cursor.execute("INSERT INTO world_dialog_fts5(world_dialog_fts5) VALUES ('rebuild')")
+
+
+def _create_lookup_indexes(cursor: sqlite3.Cursor):
+    # select_last_world_dialog, select_all_before_dialogs의 world 범위 id 정렬/범위 검색용
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS ix_world_dialog_world_name_id
+        ON world_dialog (world_name, id)
+    ''')
+
+
+def _create_world_shard_catalog(cursor: sqlite3.Cursor):
+    # 샤딩을 사용할 때 catalog DB에서 world -> shard 파일 배정을 기록합니다.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS world_shard (
+            world_name TEXT PRIMARY KEY,
+
+            shard_name TEXT NOT NULL
+    )
+    ''')
+
+
+def _create_world_dialog_archive(cursor: sqlite3.Cursor):
+    # 오래된 dialog를 연속된 행 단위로 압축해 보관하는 블록입니다. 원래의 id 범위를 유지합니다.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS world_dialog_archive (
+            id INTEGER PRIMARY KEY,
+
+            world_name TEXT NOT NULL,
+
+            first_id INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            raw_bytes INTEGER NOT NULL,
+
+            data BLOB NOT NULL
+    )
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS ix_world_dialog_archive_world_name_last_id
+        ON world_dialog_archive (world_name, last_id)
+    ''')
+
+    # 블록에 등장하는 단어만 색인하는 contentless FTS 테이블입니다. (rowid = 블록 id)
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS world_dialog_archive_fts5 USING fts5(
+            world_name,
+            terms,
+            tokenize='unicode61',
+            content=''
+    )
+    ''')
+
+
+def _create_attitude_in_edge_index(cursor: sqlite3.Cursor):
+    # 다른 캐릭터가 target_character_name에게 갖는 태도(들어오는 관계)를 찾는 색인입니다.
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS ix_character_attitude_world_name_target
+        ON character_attitude (world_name, target_character_name, character_name)
+    ''')
+
+
+def _create_dialog_entity_index(cursor: sqlite3.Cursor):
+    # 캐릭터 이름과 아이템 이름이 등장하는 dialog id입니다. dialog를 저장할 때 함께 기록됩니다.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dialog_entity (
+            world_name TEXT NOT NULL,
+            entity_name TEXT NOT NULL,
+            dialog_id INTEGER NOT NULL,
+
+            PRIMARY KEY (world_name, entity_name, dialog_id)
+        ) WITHOUT ROWID
+    ''')
+
+    # 이전의 모든 dialog까지 dialog_entity에 기록된 이름입니다. 여기 없는 이름은 검색할 때 한 번 채웁니다.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dialog_entity_name (
+            world_name TEXT NOT NULL,
+            entity_name TEXT NOT NULL,
+
+            PRIMARY KEY (world_name, entity_name)
+        ) WITHOUT ROWID
+    ''')
+
+
+# (버전, 설명, 업그레이드 함수) - 순서대로 적용되며, 이미 배포된 단계는 절대 수정하지 말고 새 단계를 추가하십시오.
+MIGRATIONS = [
+    (1, 'model tables and world_dialog', _create_model_tables),
+    (2, 'world-scoped world_dialog_fts5 and triggers', _create_world_dialog_fts),
+    (3, 'lookup indexes', _create_lookup_indexes),
+    (4, 'world_shard catalog', _create_world_shard_catalog),
+    (5, 'compressed world_dialog archive', _create_world_dialog_archive),
+    (6, 'character_attitude in-edge index', _create_attitude_in_edge_index),
+    (7, 'dialog entity index', _create_dialog_entity_index),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> list[int]:
+    """
+    DB에 기록된 schema 버전(PRAGMA user_version) 이후의 단계를 순서대로 적용합니다.
+    각 단계는 하나의 트랜잭션으로 적용되며, 적용한 버전 목록을 반환합니다.
+    """
+    applied = []
+
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return applied
+
+    cursor = conn.cursor()
+    try:
+        for version, description, upgrade in MIGRATIONS:
+            # 여러 프로세스가 동시에 시작해도 한 번만 적용되도록 쓰기 잠금을 잡은 뒤 버전을 다시 확인합니다.
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                if get_schema_version(conn) >= version:
+                    conn.rollback()
+                    continue
+
+                upgrade(cursor)
+                cursor.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            applied.append(version)
+
+        if applied:
+            cursor.execute('PRAGMA optimize')
+    finally:
+        cursor.close()
+
+    return applied
+
+
+if __name__ == '__main__':
+    # 사용법: python -m service.migration_service [DB 경로]
+    from service.connection_pool import ConnectionPool
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else './data/data.db'
+    pool = ConnectionPool(db_path)
+    connection = pool.connection()
+
+    before = get_schema_version(connection)
+    applied_versions = migrate(connection)
+
+    print(f'{db_path}: schema version {before} -> {get_schema_version(connection)}, applied {applied_versions}')
+    pool.close_all()
@@ -0,0 +1,45 @@
+import os
+import threading
+
+from service.entity_cache import entity_cache
+from service.repository_service import catalog_shard, shard_router
+from service.result_cache import write_generations
+
+# 여러 프로세스(stdio에서 클라이언트마다 실행되는 서버, HTTP 워커)가 같은 DB를 사용할 때,
+# 다른 프로세스의 쓰기로 캐시가 낡지 않도록 합니다. DB를 이 프로세스만 사용할 때만 0으로 끌 수 있습니다.
+CROSS_PROCESS_SYNC = os.environ.get('RPG_CROSS_PROCESS_SYNC', '1') == '1'
+
+_sync_lock = threading.Lock()
+_stats = {'checks': 0, 'invalidations': 0}
+
+
+def sync_caches():
+    """
+    catalog와 열려 있는 shard 중 하나라도 다른 프로세스가 commit했다면 이 프로세스의 모든 캐시를 무효화합니다.
+    이 프로세스의 commit은 ConnectionPool.local_commit이 걸러내므로, 자신의 쓰기로는 무효화하지 않습니다.
+    처음 확인하는 shard도 그 사이에 읽어 캐시한 내용이 있을 수 있으므로 무효화합니다.
+    """
+    if not CROSS_PROCESS_SYNC:
+        return
+
+    with _sync_lock:
+        _stats['checks'] += 1
+
+        changed = False
+        for shard in (catalog_shard, *shard_router.open_shards()):
+            # 모든 shard의 기준값을 갱신하도록 단락 평가하지 않습니다.
+            changed = shard.connection_pool.data_version_changed() or changed
+
+        if not changed:
+            return
+
+        _stats['invalidations'] += 1
+
+    write_generations.bump_all()
+    entity_cache.clear()
+    shard_router.clear_assignments()
+
+
+def stats() -> dict:
+    with _sync_lock:
+        return {'enabled': CROSS_PROCESS_SYNC, **_stats}
@@ -0,0 +1,256 @@
+import functools
+import os
+import re
+import sqlite3
+import time
+
+from sqlmodel import text
+
+from service.dialog_entity_service import reset_index
+from service.dialog_write_behind import dialog_writer
+from service.entity_cache import SQL_TABLE_PATTERN, entity_cache
+from service.repository_service import get_engine_session, get_read_only_cursor, get_shard_name, shard_router
+from service.response_service import encode_rows, row_set_json
+from service.result_cache import normalize_sql, result_cache, write_generations
+
+SELECT_MAX_ROWS = 200
+SELECT_MAX_ROWS_LIMIT = 5000
+SELECT_MAX_BYTES = 64 * 1024
+SELECT_TIMEOUT_MS = int(os.environ.get('RPG_SELECT_TIMEOUT_MS', '2000'))
+
+# progress handler를 호출할 SQLite VM 명령 간격
+PROGRESS_HANDLER_STEPS = 10000
+
+# 이 행 수 이상인 테이블의 전체 SCAN은 경고하고, 중첩 SCAN의 예상 행 수가 이 이상이면 LIMIT 없이는 거부합니다.
+SELECT_SCAN_WARN_ROWS = 10000
+SELECT_SCAN_REJECT_ROWS = 10_000_000
+
+PLAN_SCAN_PATTERN = re.compile(r'^SCAN (?!.*VIRTUAL TABLE)(\w+)')
+# EXPLAIN QUERY PLAN은 별칭을 보여주므로, FROM/JOIN 절의 테이블 참조에서 별칭 -> 테이블 이름을 찾습니다.
+FROM_PATTERN = re.compile(r'\b(?:FROM|JOIN)\b', re.IGNORECASE)
+TABLE_REFERENCE_PATTERN = re.compile(
+    r'\s*["`\[]?(\w+)["`\]]?'
+    r'(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|ON|USING|LEFT|RIGHT|FULL|INNER|OUTER|CROSS|NATURAL|GROUP|ORDER|LIMIT'
+    r'|HAVING|WINDOW|UNION|EXCEPT|INTERSECT|INDEXED|NOT)\b)["`\[]?(\w+)["`\]]?)?\s*',
+    re.IGNORECASE
+)
+LIMIT_PATTERN = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+DDL_PATTERN = re.compile(r'\s*(?:CREATE|DROP|ALTER)\b', re.IGNORECASE)
+
+# 다른 테이블의 트리거로만 바뀌는 테이블 -> 원본 테이블
+DERIVED_TABLES = {
+    'world_dialog_fts5': 'world_dialog',
+    'world_dialog_archive': 'world_dialog',
+    'world_dialog_archive_fts5': 'world_dialog',
+    'dialog_entity': 'world_dialog',
+    'dialog_entity_name': 'world_dialog',
+}
+
+# 샤딩을 사용하면 이 테이블들은 world의 shard에, 나머지(world 등)는 catalog에 있습니다.
+SHARDED_TABLES = {
+    'character', 'character_inventory', 'character_attitude',
+    'world_dialog', 'world_dialog_fts5', 'world_dialog_archive', 'world_dialog_archive_fts5',
+    'dialog_entity', 'dialog_entity_name',
+}
+WORLD_NAME_PATTERN = re.compile(r"\bworld_name\s*=\s*'((?:[^']|'')*)'", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def _read_tables(sql: str) -> frozenset[str]:
+    """
+    sql이 읽는 테이블(뷰, CTE, 서브쿼리 안의 테이블 포함)의 이름을 소문자로 반환합니다.
+    catalog의 읽기 전용 연결에서 EXPLAIN으로 준비만 하며, 그동안 SQLite authorizer가 알려주는 테이블을 모읍니다.
+    모든 shard가 catalog와 같은 schema를 가지므로 catalog에서 찾은 테이블로 shard를 정할 수 있습니다.
+    """
+    table_names = set()
+
+    def authorizer(action, table_name, column_name, database_name, source):
+        if action == sqlite3.SQLITE_READ and table_name:
+            table_names.add(table_name.lower())
+        return sqlite3.SQLITE_OK
+
+    with get_read_only_cursor() as cursor:
+        cursor.connection.set_authorizer(authorizer)
+        try:
+            cursor.execute(f'EXPLAIN {sql}')
+        finally:
+            cursor.connection.set_authorizer(None)
+
+    return frozenset(table_names)
+
+
+def _table_aliases(sql: str) -> dict[str, str]:
+    """FROM/JOIN 절과 그 뒤에 쉼표로 이어진 테이블 참조에서 별칭(없으면 테이블 이름) -> 테이블 이름을 찾습니다."""
+    aliases = {}
+
+    for match in FROM_PATTERN.finditer(sql):
+        position = match.end()
+
+        while (reference := TABLE_REFERENCE_PATTERN.match(sql, position)) is not None:
+            table_name, alias = reference.groups()
+            aliases[(alias or table_name).lower()] = table_name
+            position = reference.end()
+
+            if not sql.startswith(',', position):
+                break
+            position += 1
+
+    return aliases
+
+
+def _route_world_name(sql: str, table_names: set[str], world_name: str | None) -> str | None:
+    """
+    sql을 실행할 shard의 world_name을 정합니다. shard 테이블을 참조하지 않으면 catalog(None)입니다.
+    world_name이 주어지지 않았다면 sql의 world_name = '...' 조건이 하나의 world만 가리킬 때 그 world를 사용합니다.
+    샤딩을 사용하는데 world를 정할 수 없으면, world가 읽지 않는 catalog에 쓰거나 빈 결과를 반환하지 않도록 거부합니다.
+    """
+    if not table_names & SHARDED_TABLES:
+        return None
+
+    if world_name is not None:
+        return world_name
+
+    world_names = {value.replace("''", "'") for value in WORLD_NAME_PATTERN.findall(sql)}
+
+    if len(world_names) == 1:
+        return world_names.pop()
+
+    if shard_router.enabled:
+        raise ValueError(
+            f'cannot tell which world {", ".join(sorted(table_names & SHARDED_TABLES))} belongs to; '
+            'pass world_name'
+        )
+
+    return None
+
+
+def _plan_warnings(cursor, sql: str) -> list[str]:
+    """
+    EXPLAIN QUERY PLAN에서 전체 테이블을 읽는 SCAN을 찾아 경고를 만듭니다.
+    여러 테이블을 SCAN하는 중첩 루프(의도치 않은 cross join 등)의 예상 행 수가 너무 크면 거부합니다.
+    """
+    warnings = []
+    estimated_rows = 1
+
+    aliases = _table_aliases(sql)
+
+    for row in cursor.execute(f'EXPLAIN QUERY PLAN {sql}').fetchall():
+        match = PLAN_SCAN_PATTERN.match(row[-1])
+        if match is None:
+            continue
+
+        table_name = aliases.get(match.group(1).lower(), match.group(1))
+        try:
+            table_rows = cursor.execute(f'SELECT max(rowid) FROM "{table_name}"').fetchone()[0] or 0
+        except sqlite3.Error:
+            # WITHOUT ROWID 테이블 등은 크기를 추정하지 않습니다.
+            continue
+
+        estimated_rows *= max(table_rows, 1)
+
+        if table_rows >= SELECT_SCAN_WARN_ROWS:
+            warnings.append(
+                f'full scan of {table_name} (~{table_rows} rows); filter by an indexed column such as world_name'
+            )
+
+    if estimated_rows >= SELECT_SCAN_REJECT_ROWS and not LIMIT_PATTERN.search(sql):
+        raise ValueError(
+            f'query would scan ~{estimated_rows} rows without LIMIT; add a WHERE world_name = ... filter or a LIMIT'
+        )
+
+    return warnings
+
+
+def select_data(
+        sql: str,
+        max_rows: int = SELECT_MAX_ROWS,
+        max_bytes: int = SELECT_MAX_BYTES,
+        timeout_ms: int = SELECT_TIMEOUT_MS,
+        world_name: str | None = None
+) -> str:
+    """
+    같은 SQL의 결과는 참조하는 테이블에 쓰기가 없는 동안 result_cache에서 반환합니다.
+    샤딩을 사용하면 world_name(없으면 sql의 world_name 조건)의 shard에서 실행합니다.
+    """
+    normalized_sql = normalize_sql(sql)
+    table_names = _read_tables(normalized_sql)
+    world_name = _route_world_name(sql, table_names, world_name)
+
+    dependencies = []
+    for table_name in sorted(table_names):
+        table_name = DERIVED_TABLES.get(table_name, table_name)
+        if (table_name, None) not in dependencies:
+            dependencies.append((table_name, None))
+
+    # write-behind 큐에 남은 dialog가 결과에 보이도록 먼저 기록합니다.
+    if not dependencies or ('world_dialog', None) in dependencies:
+        dialog_writer.flush_world()
+
+    # 참조하는 테이블을 알 수 없으면 무효화할 수 없으므로 캐시하지 않습니다.
+    if not dependencies:
+        return _select_data(sql, max_rows, max_bytes, timeout_ms, world_name)
+
+    return result_cache.get_or_compute(
+        ('select_data', get_shard_name(world_name), normalized_sql, max_rows, max_bytes),
+        dependencies,
+        lambda: _select_data(sql, max_rows, max_bytes, timeout_ms, world_name)
+    )
+
+
+def _select_data(
+        sql: str,
+        max_rows: int,
+        max_bytes: int,
+        timeout_ms: int,
+        world_name: str | None
+) -> str:
+    """
+    읽기 전용 연결에서 sql을 실행하고, max_rows개 혹은 max_bytes까지만 행을 row set JSON 문자열로 인코딩하여 반환합니다.
+    timeout_ms가 지나면 SQLite progress handler로 실행을 중단합니다.
+    """
+    max_rows = max(1, min(max_rows, SELECT_MAX_ROWS_LIMIT))
+    deadline = time.monotonic() + timeout_ms / 1000
+
+    with get_read_only_cursor(world_name) as cursor:
+        conn = cursor.connection
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_HANDLER_STEPS)
+        try:
+            warnings = _plan_warnings(cursor, sql)
+
+            cursor.execute(sql)
+            names = [description[0] for description in cursor.description or ()]
+
+            parts, truncated = encode_rows(cursor, max_rows, max_bytes)
+        except sqlite3.OperationalError as e:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'select_data exceeded {timeout_ms} ms; narrow the query') from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    return row_set_json(names, parts, truncated, warnings=warnings)
+
+
+def upsert_data(sql: str, world_name: str | None = None):
+    # write-behind 큐에 남은 dialog보다 이 쓰기가 먼저 적용되지 않도록 합니다.
+    if 'world_dialog' in sql.lower():
+        dialog_writer.flush_world()
+
+    world_name = _route_world_name(sql, {name.lower() for name in SQL_TABLE_PATTERN.findall(sql)}, world_name)
+
+    with get_engine_session(world_name) as session:
+        session.exec(text(sql))
+
+        session.commit()
+
+        entity_cache.invalidate_sql(sql)
+
+    # schema가 바뀌었다면 (뷰를 다시 만든 경우 등) 읽는 테이블을 다시 찾습니다.
+    if DDL_PATTERN.match(sql):
+        _read_tables.cache_clear()
+
+    # dialog가 바뀌었다면 dialog_entity가 맞지 않을 수 있으므로 비웁니다.
+    if 'world_dialog' in sql.lower():
+        reset_index(world_name)
+
+    write_generations.bump_sql(sql)
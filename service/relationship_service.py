@@ -0,0 +1,216 @@
+import os
+import threading
+from collections import OrderedDict
+
+from service.repository_service import get_db_cursor
+from service.result_cache import write_generations
+
+# 태도 그래프를 메모리에 올려 둘 world 수 (0이면 캐시하지 않고 매번 색인 쿼리로 답합니다)
+GRAPH_CACHE_WORLDS = int(os.environ.get('RPG_ATTITUDE_GRAPH_WORLDS', '64'))
+# 이보다 태도가 많은 world는 캐시하지 않습니다.
+GRAPH_CACHE_MAX_EDGES = int(os.environ.get('RPG_ATTITUDE_GRAPH_MAX_EDGES', '20000'))
+
+NEIGHBORHOOD_MAX_DEPTH = 3
+DIRECTIONS = ('out', 'in', 'both')
+
+EDGE_COLUMNS = ('character_name', 'target_character_name', 'attitude')
+
+
+class _WorldGraph:
+    def __init__(self, edges: list[tuple[str, str, str]]):
+        self.out_edges: dict[str, dict[str, str]] = {}
+        self.in_edges: dict[str, dict[str, str]] = {}
+
+        for character_name, target_character_name, attitude in edges:
+            self.out_edges.setdefault(character_name, {})[target_character_name] = attitude
+            self.in_edges.setdefault(target_character_name, {})[character_name] = attitude
+
+    def edges_among(self, names: set[str]) -> list[tuple[str, str, str]]:
+        return [
+            (character_name, target_character_name, attitude)
+            for character_name in names
+            for target_character_name, attitude in self.out_edges.get(character_name, {}).items()
+            if target_character_name in names
+        ]
+
+    def out_of(self, character_name: str) -> list[tuple[str, str, str]]:
+        return [
+            (character_name, target_character_name, attitude)
+            for target_character_name, attitude in self.out_edges.get(character_name, {}).items()
+        ]
+
+    def into(self, character_name: str) -> list[tuple[str, str, str]]:
+        return [
+            (source_name, character_name, attitude)
+            for source_name, attitude in self.in_edges.get(character_name, {}).items()
+        ]
+
+    def reach(self, character_name: str, depth: int) -> set[str]:
+        reached = {character_name}
+        frontier = {character_name}
+
+        for _ in range(depth):
+            frontier = {
+                neighbor
+                for name in frontier
+                for neighbor in (*self.out_edges.get(name, ()), *self.in_edges.get(name, ()))
+            } - reached
+            reached |= frontier
+
+        return reached
+
+
+# world_name -> (쓰기 세대, 그래프 혹은 너무 커서 캐시하지 않음을 뜻하는 None)
+_graphs: OrderedDict[str, tuple[tuple, _WorldGraph | None]] = OrderedDict()
+_graphs_lock = threading.Lock()
+
+
+def _cached_graph(world_name: str) -> _WorldGraph | None:
+    """world의 태도 그래프를 반환합니다. 캐시를 사용하지 않거나 world가 너무 크면 None입니다."""
+    if GRAPH_CACHE_WORLDS <= 0:
+        return None
+
+    generation = write_generations.snapshot([('character_attitude', world_name)])
+
+    with _graphs_lock:
+        entry = _graphs.get(world_name)
+        if entry is not None and entry[0] == generation:
+            _graphs.move_to_end(world_name)
+            return entry[1]
+
+    with get_db_cursor(world_name) as cursor:
+        edges = cursor.execute(
+            """
+                SELECT character_name, target_character_name, attitude
+                FROM character_attitude
+                WHERE world_name = ?
+                LIMIT ?
+            """,
+            (world_name, GRAPH_CACHE_MAX_EDGES + 1)
+        ).fetchall()
+
+    graph = _WorldGraph(edges) if len(edges) <= GRAPH_CACHE_MAX_EDGES else None
+
+    with _graphs_lock:
+        _graphs[world_name] = (generation, graph)
+        _graphs.move_to_end(world_name)
+        while len(_graphs) > GRAPH_CACHE_WORLDS:
+            _graphs.popitem(last=False)
+
+    return graph
+
+
+def _to_dicts(edges) -> list[dict]:
+    return [dict(zip(EDGE_COLUMNS, edge)) for edge in sorted(edges)]
+
+
+def _placeholders(values) -> str:
+    return ', '.join('?' for _ in values)
+
+
+def get_attitudes_among(world_name: str, character_names: list[str]) -> list[dict]:
+    """character_names 사이의 모든 방향의 태도를 반환합니다. n명의 장면에 필요한 n·(n-1)개의 관계를 한 번에 읽습니다."""
+    names = set(character_names)
+    if not names:
+        return []
+
+    graph = _cached_graph(world_name)
+    if graph is not None:
+        return _to_dicts(graph.edges_among(names))
+
+    with get_db_cursor(world_name) as cursor:
+        return _to_dicts(cursor.execute(
+            f"""
+                SELECT character_name, target_character_name, attitude
+                FROM character_attitude
+                WHERE world_name = ?
+                    AND character_name IN ({_placeholders(names)})
+                    AND target_character_name IN ({_placeholders(names)})
+            """,
+            (world_name, *names, *names)
+        ).fetchall())
+
+
+def get_attitude_edges(world_name: str, character_name: str, direction: str = 'both') -> dict:
+    """
+    character_name이 다른 캐릭터에게 갖는 태도(out)와 다른 캐릭터가 character_name에게 갖는 태도(in)를 반환합니다.
+    out은 기본 키, in은 ix_character_attitude_world_name_target 색인으로 읽습니다.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f'direction must be one of {DIRECTIONS}')
+
+    result = {}
+    graph = _cached_graph(world_name)
+
+    if graph is not None:
+        if direction in ('out', 'both'):
+            result['out'] = _to_dicts(graph.out_of(character_name))
+        if direction in ('in', 'both'):
+            result['in'] = _to_dicts(graph.into(character_name))
+
+        return result
+
+    with get_db_cursor(world_name) as cursor:
+        edges = cursor.execute(
+            """
+                SELECT character_name, target_character_name, attitude
+                FROM character_attitude
+                WHERE world_name = ? AND character_name = ?
+                UNION ALL
+                SELECT character_name, target_character_name, attitude
+                FROM character_attitude
+                WHERE world_name = ? AND target_character_name = ?
+            """,
+            (world_name, character_name, world_name, character_name)
+        ).fetchall()
+
+    if direction in ('out', 'both'):
+        result['out'] = _to_dicts(edge for edge in edges if edge[0] == character_name)
+    if direction in ('in', 'both'):
+        result['in'] = _to_dicts(edge for edge in edges if edge[1] == character_name)
+
+    return result
+
+
+def get_attitude_neighborhood(world_name: str, character_name: str, depth: int = 1) -> dict:
+    """
+    character_name에서 태도 관계(방향 무관)로 depth 단계 안에 닿는 캐릭터들과, 그 캐릭터들 사이의 모든 태도를 반환합니다.
+    """
+    depth = max(1, min(depth, NEIGHBORHOOD_MAX_DEPTH))
+
+    graph = _cached_graph(world_name)
+    if graph is not None:
+        names = graph.reach(character_name, depth)
+        return {'character_names': sorted(names), 'attitudes': _to_dicts(graph.edges_among(names))}
+
+    with get_db_cursor(world_name) as cursor:
+        cursor.execute(
+            """
+                WITH RECURSIVE reach(name, depth) AS (
+                    SELECT ?, 0
+                    UNION
+                    SELECT
+                        CASE WHEN a.character_name = reach.name THEN a.target_character_name ELSE a.character_name END,
+                        reach.depth + 1
+                    FROM reach
+                    JOIN character_attitude a
+                        ON a.world_name = ?
+                        AND (a.character_name = reach.name OR a.target_character_name = reach.name)
+                    WHERE reach.depth < ?
+                ),
+                names AS (SELECT DISTINCT name FROM reach)
+                SELECT character_name, target_character_name, attitude
+                FROM character_attitude
+                WHERE world_name = ?
+                    AND character_name IN names
+                    AND target_character_name IN names
+            """,
+            (character_name, world_name, depth, world_name)
+        )
+        edges = cursor.fetchall()
+
+    names = {character_name}
+    for edge in edges:
+        names.update(edge[:2])
+
+    return {'character_names': sorted(names), 'attitudes': _to_dicts(edges)}
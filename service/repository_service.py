@@ -1,78 +1,103 @@
-import sqlite3
+import os
+import threading
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine
-from sqlmodel import SQLModel, Session
+from sqlmodel import Session
 
-DB_PATH = './data/data.db'
+from service.shard_router import Shard, ShardRouter
+
+DB_PATH = os.environ.get('RPG_DB_PATH', './data/data.db')
+
+os.makedirs(os.path.dirname(os.path.abspath(DB_PATH)), exist_ok=True)
 
 # Initialize on startup
-engine = create_engine(f"sqlite:///{DB_PATH}")
+# 기본 DB는 world 목록과 shard 배정을 보관하는 catalog이며, 샤딩을 사용하지 않으면 모든 데이터가 여기에 있습니다.
+# sqlite3 커서와 SQLAlchemy 엔진 모두 같은 풀의 연결 설정(WAL, PRAGMA, busy timeout)을 사용합니다.
+catalog_shard = Shard('main', DB_PATH)
 
-# 테이블 생성
-SQLModel.metadata.create_all(engine)
+connection_pool = catalog_shard.connection_pool
+# select_data처럼 임의의 SQL을 실행하는 경로는 읽기 전용 연결만 사용합니다.
+read_only_pool = catalog_shard.read_only_pool
+engine = catalog_shard.engine
 
-def get_engine_session():
-    with Session(engine) as session:
-        yield session
+shard_router = ShardRouter(catalog_shard)
+
+_initialized = False
+_initialize_lock = threading.Lock()
+
+
+def initialize_database():
+    """
+    catalog DB에 기록된 schema 버전 이후의 migration을 적용합니다.
+    import 시점이 아니라 서버 lifespan 혹은 첫 DB 사용 시에 한 번만 실행되며,
+    schema 버전이 같다면 PRAGMA user_version만 읽고 DDL은 실행하지 않습니다.
+    """
+    global _initialized
+
+    if _initialized:
+        return
+
+    with _initialize_lock:
+        if not _initialized:
+            catalog_shard.migrate()
+            _initialized = True
 
 
 @contextmanager
-def get_db_cursor():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def _use_shard(world_name: str | None):
+    initialize_database()
+
+    # 사용 중인 shard는 idle 정리 대상에서 제외됩니다.
+    shard = shard_router.acquire(world_name)
     try:
-        yield cursor
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
+        yield shard
     finally:
-        cursor.close()
-        conn.close()
-
-
-with get_db_cursor() as cursor:
-    conn = cursor.connection
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS world_dialog (
-            id INTEGER PRIMARY KEY,
-            
-            world_name TEXT,
-            
-            dialog TEXT
-    )
-    ''')
-
-    cursor.execute('''
-        CREATE VIRTUAL TABLE IF NOT EXISTS world_dialog_fts5 USING fts5(
-            dialog,
-            tokenize='unicode61',
-            content=world_dialog,
-            content_rowid=id
-    )
-   ''')
-
-    conn.commit()
-
-    # 3. 트리거 생성 - 기본 테이블 변경 시 FTS 테이블 자동 업데이트
-    cursor.execute('''
-        CREATE TRIGGER IF NOT EXISTS world_dialog_ai AFTER INSERT ON world_dialog BEGIN
-            INSERT INTO world_dialog_fts5(rowid, dialog) VALUES (new.id, new.dialog);
-        END
-    ''')
-
-    cursor.execute('''
-    CREATE TRIGGER IF NOT EXISTS world_dialog_ad AFTER DELETE ON world_dialog BEGIN
-        DELETE FROM world_dialog_fts5 WHERE rowid = old.id;
-    END
-    ''')
-
-    cursor.execute('''
-    CREATE TRIGGER IF NOT EXISTS world_dialog_au AFTER UPDATE ON world_dialog BEGIN
-        UPDATE world_dialog_fts5 SET dialog = new.dialog WHERE rowid = old.id;
-    END
-    ''')
-
-    conn.commit()
\ No newline at end of file
+        shard_router.release(shard)
+
+
+@contextmanager
+def get_engine_session(world_name: str | None = None):
+    # with 블록이 끝나면 세션과 연결을 바로 풀에 반환합니다.
+    with _use_shard(world_name) as shard, Session(shard.engine) as session:
+        yield session
+
+
+@contextmanager
+def get_db_cursor(world_name: str | None = None):
+    # 연결은 스레드마다 재사용하므로 닫지 않습니다.
+    with _use_shard(world_name) as shard:
+        conn = shard.connection_pool.connection()
+        cursor = conn.cursor(shard.connection_pool.cursor_factory)
+        try:
+            yield cursor
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+
+@contextmanager
+def get_read_only_cursor(world_name: str | None = None):
+    with _use_shard(world_name) as shard:
+        conn = shard.read_only_pool.connection()
+        cursor = conn.cursor(shard.read_only_pool.cursor_factory)
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            # 읽기 트랜잭션이 남아 WAL checkpoint를 막지 않도록 끝냅니다.
+            conn.rollback()
+
+
+def get_shard_name(world_name: str | None) -> str:
+    return shard_router.shard_name(world_name)
+
+
+def get_pool_stats() -> dict:
+    return {
+        **catalog_shard.stats(),
+        'shards': shard_router.stats(),
+    }
+
@@ -0,0 +1,124 @@
+"""
+툴 응답을 JSON으로 인코딩하는 공통 함수입니다.
+
+- orjson이 설치되어 있으면 사용하고, 없으면 json으로 같은 모양의 결과를 만듭니다.
+  한글 등은 \\u 이스케이프 없이 UTF-8 그대로 두어 응답 크기를 줄입니다.
+- 행 목록은 {"columns": [...], "rows": [[...], ...], "truncated": bool}로, 컬럼 이름을 행마다 반복하지 않습니다.
+- fields로 반환할 컬럼을 고르고, max_rows, max_bytes(UTF-8 바이트) 예산을 넘으면 자른 뒤 truncated를 true로 표시합니다.
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 툴마다 따로 정하지 않았을 때 한 응답의 행 목록에 사용할 예산
+RESPONSE_MAX_ROWS = int(os.environ.get('RPG_RESPONSE_MAX_ROWS', '500'))
+RESPONSE_MAX_BYTES = int(os.environ.get('RPG_RESPONSE_MAX_BYTES', str(64 * 1024)))
+
+
+def _dumpb(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str).encode()
+
+
+def dumps(value) -> str:
+    return _dumpb(value).decode()
+
+
+def project_columns(columns, fields: list[str] | None) -> list[str]:
+    """fields가 없으면 columns 전체를, 있으면 columns에 있는 이름인지 확인한 뒤 fields를 반환합니다."""
+    columns = list(columns)
+    if fields is None:
+        return columns
+
+    unknown = [field for field in fields if field not in columns]
+    if unknown:
+        raise ValueError(f'unknown fields: {unknown} (available: {columns})')
+
+    return list(fields)
+
+
+def project(value: dict | None, fields: list[str] | None) -> dict | None:
+    if value is None or fields is None:
+        return value
+
+    return {name: value[name] for name in project_columns(value, fields)}
+
+
+def encode_rows(
+        rows,
+        max_rows: int | None = RESPONSE_MAX_ROWS,
+        max_bytes: int | None = RESPONSE_MAX_BYTES
+) -> tuple[list[bytes], bool]:
+    """
+    rows의 각 행(리스트)을 차례로 인코딩하여 예산 안에 들어오는 행들과 잘렸는지를 반환합니다.
+    rows는 필요한 만큼만 읽으며, 다음 페이지로 진행할 수 있도록 최소 한 행은 포함합니다.
+    """
+    parts = []
+    size = 0
+
+    for row in rows:
+        encoded = _dumpb(row)
+
+        if (max_rows is not None and len(parts) >= max_rows) \
+                or (max_bytes is not None and parts and size + len(encoded) + 1 > max_bytes):
+            return parts, True
+
+        parts.append(encoded)
+        size += len(encoded) + 1
+
+    return parts, False
+
+
+def row_set_json(columns: list[str], parts: list[bytes], truncated: bool, **extra) -> str:
+    """encode_rows의 결과로 {"columns", "rows", "truncated", ...extra} JSON을 만듭니다."""
+    return (
+        b'{"columns":' + _dumpb(columns)
+        + b',"rows":[' + b','.join(parts) + b']'
+        + b',"truncated":' + (b'true' if truncated else b'false')
+        + b''.join(b',' + _dumpb(key) + b':' + _dumpb(value) for key, value in extra.items())
+        + b'}'
+    ).decode()
+
+
+def _aligned(rows, columns: list[str], all_columns: list[str]):
+    indexes = [all_columns.index(column) for column in columns]
+
+    for row in rows:
+        if isinstance(row, dict):
+            yield [row.get(column) for column in columns]
+        else:
+            yield [row[index] for index in indexes]
+
+
+def row_set(rows: list, columns, fields: list[str] | None = None) -> dict:
+    """예산 없이 행 목록을 {"columns", "rows"}로 바꿉니다. 다른 응답 안에 넣을 때 사용합니다."""
+    all_columns = list(columns)
+    columns = project_columns(all_columns, fields)
+
+    return {'columns': columns, 'rows': list(_aligned(rows, columns, all_columns))}
+
+
+def encode_row_set(
+        rows,
+        columns,
+        fields: list[str] | None = None,
+        max_rows: int | None = RESPONSE_MAX_ROWS,
+        max_bytes: int | None = RESPONSE_MAX_BYTES,
+        **extra
+) -> str:
+    """
+    dict 혹은 columns 순서의 시퀀스인 rows를 fields 컬럼만 골라 예산 안에서 row set JSON으로 인코딩합니다.
+    extra는 결과 객체에 그대로 더해집니다.
+    """
+    all_columns = list(columns)
+    columns = project_columns(all_columns, fields)
+
+    parts, truncated = encode_rows(_aligned(rows, columns, all_columns), max_rows, max_bytes)
+
+    return row_set_json(columns, parts, truncated, **extra)
@@ -0,0 +1,162 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from service.entity_cache import SQL_TABLE_PATTERN
+
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RPG_RESULT_CACHE_BYTES', str(16 * 1024 * 1024)))
+
+# 캐시 키로 쓰는 SQL을 정규화할 때 사용합니다.
+# 문자열 리터럴, 따옴표로 감싼 식별자, 주석은 그대로 두고 그 밖의 공백만 하나로 합칩니다.
+SQL_TOKEN_PATTERN = re.compile(
+    r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\]|--[^\n]*\n?|/\*.*?(?:\*/|$)|(\s+)""",
+    re.DOTALL
+)
+
+
+class WriteGenerations:
+    """
+    테이블 단위, (테이블, world_name) 단위의 쓰기 세대 번호입니다.
+    world 단위의 쓰기는 해당 world와 테이블 전체의 세대를 올리고,
+    world를 알 수 없는 쓰기(upsert_data 등)는 테이블 전체와 그 테이블의 모든 world를 무효화합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        self._global = 0
+        self._tables: dict[str, int] = {}
+        self._table_wide: dict[str, int] = {}
+        self._worlds: dict[tuple[str, str], int] = {}
+
+    def bump(self, table_name: str, world_name: str | None = None):
+        with self._lock:
+            self._tables[table_name] = self._tables.get(table_name, 0) + 1
+
+            if world_name is None:
+                self._table_wide[table_name] = self._table_wide.get(table_name, 0) + 1
+            else:
+                key = (table_name, world_name)
+                self._worlds[key] = self._worlds.get(key, 0) + 1
+
+    def bump_all(self):
+        with self._lock:
+            self._global += 1
+
+    def bump_sql(self, sql: str):
+        table_names = {name.lower() for name in SQL_TABLE_PATTERN.findall(sql)}
+
+        if not table_names:
+            self.bump_all()
+            return
+
+        for table_name in table_names:
+            self.bump(table_name)
+
+    def snapshot(self, dependencies: list[tuple[str, str | None]]) -> tuple:
+        """dependencies((테이블, world_name 혹은 None))의 현재 세대를 반환합니다."""
+        with self._lock:
+            result = [self._global]
+
+            for table_name, world_name in dependencies:
+                if world_name is None:
+                    result.append(self._tables.get(table_name, 0))
+                else:
+                    result.append(self._table_wide.get(table_name, 0))
+                    result.append(self._worlds.get((table_name, world_name), 0))
+
+            return tuple(result)
+
+
+class ResultCache:
+    """
+    인코딩된 결과 문자열을 보관하는 LRU 캐시입니다. 전체 크기는 max_bytes로 제한됩니다.
+    항목은 저장할 때의 쓰기 세대와 함께 저장되며, 세대가 바뀌었다면 무효입니다.
+    """
+
+    def __init__(self, generations: WriteGenerations, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.generations = generations
+        self.max_bytes = max_bytes
+
+        self._entries: OrderedDict[tuple, tuple[tuple, str]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    @staticmethod
+    def _entry_size(key: tuple, value: str) -> int:
+        return len(value) + sum(len(str(part)) for part in key)
+
+    def get_or_compute(self, key: tuple, dependencies: list[tuple[str, str | None]], compute) -> str:
+        # 계산 전에 세대를 읽어야, 계산 중에 들어온 쓰기가 있으면 다음 조회에서 무효가 됩니다.
+        generation = self.generations.snapshot(dependencies)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                self.stale += 1
+                self._remove(key)
+
+            self.misses += 1
+
+        value = compute()
+
+        self._put(key, generation, value)
+
+        return value
+
+    def _remove(self, key: tuple):
+        generation, value = self._entries.pop(key)
+        self._size -= self._entry_size(key, value)
+
+    def _put(self, key: tuple, generation: tuple, value: str):
+        size = self._entry_size(key, value)
+        if size > self.max_bytes // 4:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (generation, value)
+            self._size += size
+
+            while self._size > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+            }
+
+
+def normalize_sql(sql: str) -> str:
+    sql = SQL_TOKEN_PATTERN.sub(lambda match: ' ' if match.group(1) else match.group(0), sql)
+
+    return sql.strip().rstrip(';').strip()
+
+
+write_generations = WriteGenerations()
+result_cache = ResultCache(write_generations)
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import threading
+import time
+import zlib
+
+from sqlalchemy import create_engine, event
+
+from service.connection_pool import ConnectionPool
+from service.migration_service import migrate
+
+SHARDING_ENABLED = os.environ.get('RPG_SHARDING', '0') == '1'
+# 0이면 world마다 하나의 파일, 1 이상이면 world 이름의 해시로 나눈 버킷마다 하나의 파일입니다.
+SHARD_BUCKETS = int(os.environ.get('RPG_SHARD_BUCKETS', '0'))
+# 이 시간 동안 사용되지 않은 shard의 연결과 엔진을 닫습니다.
+SHARD_IDLE_SECONDS = float(os.environ.get('RPG_SHARD_IDLE_SECONDS', '300'))
+
+# catalog DB(DB_PATH)의 shard 이름
+CATALOG_SHARD_NAME = 'main'
+
+
+class Shard:
+    """하나의 SQLite 파일에 대한 쓰기/읽기 전용 연결 풀과 SQLAlchemy 엔진입니다."""
+
+    def __init__(self, name: str, db_path: str):
+        self.name = name
+        self.db_path = db_path
+
+        self.connection_pool = ConnectionPool(db_path)
+        self.read_only_pool = ConnectionPool(db_path, read_only=True)
+        self.engine = create_engine(f'sqlite:///{db_path}', creator=self.connection_pool.open_connection)
+
+        @event.listens_for(self.engine, 'close')
+        def _on_engine_connection_close(dbapi_connection, connection_record):
+            self.connection_pool.discard_connection(dbapi_connection)
+
+        # 사용 중인 cursor/session 수와 마지막 사용 시각 (idle shard 정리용)
+        self.active = 0
+        self.last_used = time.monotonic()
+
+    def migrate(self):
+        # 기록된 schema 버전 이후의 migration을 적용합니다.
+        migrate(self.connection_pool.connection())
+
+    def close(self):
+        self.engine.dispose()
+        self.connection_pool.close_all()
+        self.read_only_pool.close_all()
+
+    def stats(self) -> dict:
+        return {
+            'sqlite3': self.connection_pool.stats(),
+            'sqlite3_read_only': self.read_only_pool.stats(),
+            'engine': self.engine.pool.status(),
+            'active': self.active,
+        }
+
+
+class ShardRouter:
+    """
+    world_name으로 그 world의 데이터가 있는 shard를 찾습니다.
+    catalog(기본 DB)의 world, world_shard 테이블이 world 목록과 world -> shard 배정을 보관하며,
+    배정이 없는 world(샤딩 전에 만든 world 등)와 world_name이 없는 요청은 catalog를 사용합니다.
+    """
+
+    def __init__(
+            self,
+            catalog: Shard,
+            enabled: bool = SHARDING_ENABLED,
+            buckets: int = SHARD_BUCKETS,
+            idle_seconds: float = SHARD_IDLE_SECONDS
+    ):
+        self.catalog = catalog
+        self.enabled = enabled
+        self.buckets = buckets
+        self.idle_seconds = idle_seconds
+
+        self.shard_dir = os.path.join(os.path.dirname(os.path.abspath(catalog.db_path)), 'shards')
+
+        self._lock = threading.Lock()
+        self._shards: dict[str, Shard] = {}
+        self._assignments: dict[str, str] = {}
+        self._last_idle_check = time.monotonic()
+
+        # 새로 연 shard마다 호출됩니다. (metrics_service의 측정 설치 등)
+        self._listeners = []
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def new_shard_name(self, world_name: str) -> str | None:
+        """create_world가 catalog에 기록할 shard 이름입니다. 샤딩을 사용하지 않으면 None입니다."""
+        if not self.enabled:
+            return None
+
+        if self.buckets > 0:
+            return f'bucket-{zlib.crc32(world_name.encode()) % self.buckets}'
+
+        return f'world-{hashlib.sha1(world_name.encode()).hexdigest()[:16]}'
+
+    def shard_name(self, world_name: str | None) -> str:
+        if not self.enabled or world_name is None:
+            return CATALOG_SHARD_NAME
+
+        with self._lock:
+            shard_name = self._assignments.get(world_name)
+
+        if shard_name is None:
+            row = self.catalog.read_only_pool.connection().execute(
+                'SELECT shard_name FROM world_shard WHERE world_name = ?',
+                (world_name,)
+            ).fetchone()
+
+            # 배정되지 않은 world는 catalog에 두며, 배정은 create_world에서만 기록됩니다.
+            shard_name = CATALOG_SHARD_NAME if row is None else row[0]
+            with self._lock:
+                self._assignments[world_name] = shard_name
+
+        return shard_name
+
+    def forget(self, world_name: str):
+        """create_world가 배정을 기록한 뒤, 이전에 캐시한 배정(catalog)을 지웁니다."""
+        with self._lock:
+            self._assignments.pop(world_name, None)
+
+    def shard(self, world_name: str | None = None) -> Shard:
+        shard_name = self.shard_name(world_name)
+        if shard_name == CATALOG_SHARD_NAME:
+            return self.catalog
+
+        self._close_idle_shards()
+
+        with self._lock:
+            shard = self._shards.get(shard_name)
+            if shard is not None:
+                shard.last_used = time.monotonic()
+                return shard
+
+        os.makedirs(self.shard_dir, exist_ok=True)
+        shard = Shard(shard_name, os.path.join(self.shard_dir, f'{shard_name}.db'))
+        shard.migrate()
+
+        with self._lock:
+            # 다른 스레드가 먼저 열었다면 그 shard를 사용합니다.
+            existing = self._shards.get(shard_name)
+            if existing is None:
+                self._shards[shard_name] = shard
+        if existing is not None:
+            shard.close()
+            return existing
+
+        for listener in self._listeners:
+            listener(shard)
+
+        return shard
+
+    def acquire(self, world_name: str | None = None) -> Shard:
+        shard = self.shard(world_name)
+        with self._lock:
+            shard.active += 1
+        return shard
+
+    def release(self, shard: Shard):
+        with self._lock:
+            shard.active -= 1
+            shard.last_used = time.monotonic()
+
+    def _close_idle_shards(self):
+        now = time.monotonic()
+
+        with self._lock:
+            if now - self._last_idle_check < min(self.idle_seconds, 30):
+                return
+            self._last_idle_check = now
+
+            idle = [
+                shard for shard in self._shards.values()
+                if shard.active == 0 and now - shard.last_used >= self.idle_seconds
+            ]
+            for shard in idle:
+                del self._shards[shard.name]
+
+        for shard in idle:
+            shard.close()
+
+    def open_shards(self) -> list[Shard]:
+        with self._lock:
+            return list(self._shards.values())
+
+    def clear_assignments(self):
+        with self._lock:
+            self._assignments.clear()
+
+    def close_all(self):
+        with self._lock:
+            shards = list(self._shards.values())
+            self._shards.clear()
+
+        for shard in shards:
+            shard.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'buckets': self.buckets,
+                'open_shards': {name: shard.stats() for name, shard in self._shards.items()},
+            }
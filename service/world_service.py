@@ -0,0 +1,72 @@
+from sqlmodel import select, text
+
+from model.world import World
+from service.entity_cache import entity_cache
+from service.repository_service import get_engine_session, shard_router
+from service.result_cache import write_generations
+
+WORLD_COLUMNS = tuple(World.model_fields)
+
+
+def create_world(world_name: str, world_description: str) -> dict:
+    with get_engine_session() as session:
+        new_world = World()
+
+        new_world.world_name = world_name
+        new_world.world_description = world_description
+
+        session.add(new_world)
+        result = new_world.model_dump()
+
+        # 샤딩을 사용하면 world가 사용할 shard를 catalog에 같은 트랜잭션으로 기록합니다.
+        shard_name = shard_router.new_shard_name(world_name)
+        if shard_name is not None:
+            session.flush()
+            session.exec(
+                text('INSERT INTO world_shard (world_name, shard_name) VALUES (:world_name, :shard_name)'),
+                params={'world_name': world_name, 'shard_name': shard_name}
+            )
+
+        session.commit()
+
+        shard_router.forget(world_name)
+        entity_cache.put(('world', world_name), result)
+        write_generations.bump('world', world_name)
+
+        return result
+
+
+def get_world(world_name: str) -> dict | None:
+    cache_key = ('world', world_name)
+
+    found, cached = entity_cache.get(cache_key)
+    if found:
+        return cached
+
+    with get_engine_session() as session:
+        target_world = session.exec(
+            select(World)
+            .where(World.world_name == world_name)
+        ).first()
+
+        if target_world is None:
+            return None
+
+        result = target_world.model_dump()
+        entity_cache.put(cache_key, result)
+
+        return result
+
+
+def list_worlds(limit: int = 100, offset: int = 0) -> list[dict]:
+    """catalog의 world 목록을 world_name 순으로 반환합니다."""
+    with get_engine_session() as session:
+        return [
+            world.model_dump()
+            for world in session.exec(
+                select(World)
+                .order_by(World.world_name)
+                .offset(max(0, offset))
+                .limit(max(1, limit))
+            )
+        ]
@@ -0,0 +1,416 @@
+"""
+world 하나를 gzip으로 압축한 NDJSON 파일로 내보내고 가져오며, 전체 DB의 스냅샷을 만듭니다.
+
+사용법:
+    python -m service.world_transfer_service export <world_name> [--file-name 파일 이름]
+    python -m service.world_transfer_service import <파일 이름> [--world-name 새 이름] [--replace]
+    python -m service.world_transfer_service snapshot [--name 디렉터리 이름]
+
+툴로도 호출되므로 파일은 EXPORT_DIR(data/exports), 스냅샷은 SNAPSHOT_DIR(data/snapshots) 안의 이름으로만 지정합니다.
+
+내보낸 파일의 각 줄은 하나의 JSON입니다.
+    {"type": "header", ...}                                      형식, schema 버전, world_name, dialog id 범위
+    {"table": "world" | "character" | ..., "row": {...}}         world_name을 뺀 행
+    {"table": "world_dialog_archive", "rows": [[id, dialog], ...]} 압축된 블록 하나
+    {"type": "end", "counts": {...}}                              테이블별 행 수 (잘린 파일을 가려냅니다)
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import sqlite3
+import time
+
+from service.dialog_archive_service import delete_archive_blocks, insert_archive_block, iter_archive_blocks
+from service.dialog_write_behind import dialog_writer
+from service.entity_cache import entity_cache
+from service.migration_service import SCHEMA_VERSION
+from service.repository_service import DB_PATH, get_db_cursor, get_read_only_cursor, shard_router
+from service.result_cache import write_generations
+
+EXPORT_FORMAT = 1
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), 'exports')
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), 'snapshots')
+
+# 가져올 때 한 번에 executemany할 행 수
+IMPORT_BATCH_ROWS = 1000
+
+# 백업 API가 한 단계에 복사할 페이지 수와 단계 사이의 대기 시간.
+# WAL에서는 읽기가 쓰기를 막지 않으므로, 쓰기가 매우 많은 DB는 -1(한 번에 복사)이 재시작 없이 더 빨리 끝납니다.
+SNAPSHOT_STEP_PAGES = int(os.environ.get('RPG_SNAPSHOT_STEP_PAGES', '1024'))
+SNAPSHOT_STEP_SLEEP = 0.005
+
+# world의 shard에 있는, world_name 컬럼을 가진 테이블 (내보내는 순서)
+WORLD_TABLES = ('character', 'character_inventory', 'character_attitude')
+
+SAFE_NAME_PATTERN = re.compile(r'[^\w.-]+')
+
+
+def _resolve(directory: str, name: str) -> str:
+    """directory 바로 아래의 name 경로를 반환합니다. 디렉터리를 벗어나거나 심볼릭 링크인 이름은 거부합니다."""
+    if name in ('', '.', '..') or os.path.basename(name) != name or '\\' in name:
+        raise ValueError(f'name must be a plain file name inside {directory}: {name!r}')
+
+    path = os.path.join(directory, name)
+    if os.path.islink(path) or os.path.dirname(os.path.realpath(path)) != os.path.realpath(directory):
+        raise ValueError(f'name must be a plain file name inside {directory}: {name!r}')
+
+    return path
+
+
+def _line(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _rows(cursor, sql: str, params: tuple):
+    cursor.execute(sql, params)
+    columns = [column[0] for column in cursor.description]
+
+    for row in cursor:
+        yield {column: value for column, value in zip(columns, row) if column != 'world_name'}
+
+
+def export_world(world_name: str, file_name: str | None = None) -> dict:
+    """
+    world의 world, character, character_inventory, character_attitude, world_dialog(압축된 블록 포함)를
+    EXPORT_DIR의 file_name에 씁니다. 이미 있는 파일은 덮어쓰지 않습니다.
+    shard의 모든 테이블은 하나의 읽기 트랜잭션에서 행 단위로 읽어 바로 쓰므로, 쓰기를 막지 않고 메모리도 일정합니다.
+    """
+    if file_name is None:
+        file_name = f'{SAFE_NAME_PATTERN.sub("_", world_name)}-{time.strftime("%Y%m%d-%H%M%S")}.ndjson.gz'
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = _resolve(EXPORT_DIR, file_name)
+
+    dialog_writer.flush_world(world_name)
+
+    with get_read_only_cursor() as cursor:
+        world_rows = list(_rows(cursor, 'SELECT * FROM world WHERE world_name = ?', (world_name,)))
+
+    if not world_rows:
+        raise ValueError(f'world not found: {world_name}')
+
+    counts = {'world': 1}
+
+    with get_read_only_cursor(world_name) as cursor, gzip.open(path, 'xt', encoding='utf-8') as file:
+        cursor.execute('BEGIN')
+
+        first_id, last_id = cursor.execute(
+            """
+                SELECT min(first_id), max(last_id) FROM (
+                    SELECT min(id) AS first_id, max(id) AS last_id FROM world_dialog WHERE world_name = ?
+                    UNION ALL
+                    SELECT min(first_id), max(last_id) FROM world_dialog_archive WHERE world_name = ?
+                )
+            """,
+            (world_name, world_name)
+        ).fetchone()
+
+        file.write(_line({
+            'type': 'header',
+            'format': EXPORT_FORMAT,
+            'schema_version': SCHEMA_VERSION,
+            'world_name': world_name,
+            'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'dialog_id_range': [first_id, last_id],
+        }))
+        file.write(_line({'table': 'world', 'row': world_rows[0]}))
+
+        for table in WORLD_TABLES:
+            counts[table] = 0
+            for row in _rows(cursor, f'SELECT * FROM {table} WHERE world_name = ?', (world_name,)):
+                file.write(_line({'table': table, 'row': row}))
+                counts[table] += 1
+
+        counts['world_dialog_archive'] = 0
+        for block in iter_archive_blocks(cursor, world_name):
+            file.write(_line({'table': 'world_dialog_archive', 'rows': block}))
+            counts['world_dialog_archive'] += 1
+
+        counts['world_dialog'] = 0
+        for row in _rows(cursor, 'SELECT id, dialog FROM world_dialog WHERE world_name = ? ORDER BY id', (world_name,)):
+            file.write(_line({'table': 'world_dialog', 'row': row}))
+            counts['world_dialog'] += 1
+
+        file.write(_line({'type': 'end', 'counts': counts}))
+
+    return {'file_name': file_name, 'bytes': os.path.getsize(path), 'counts': counts}
+
+
+def _table_columns(cursor, table: str) -> set[str]:
+    return {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+
+
+def _insert_rows(cursor, table: str, world_name: str, rows: list[dict], columns: set[str]):
+    # 내보낸 뒤에 없어진 컬럼은 버리고, 새로 생긴 컬럼은 기본값을 사용합니다.
+    names = ['world_name', *sorted({name for row in rows for name in row} & columns - {'world_name'})]
+
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+        [(world_name, *(row.get(name) for name in names[1:])) for row in rows]
+    )
+
+
+def _delete_world_data(cursor, world_name: str):
+    for table in (*WORLD_TABLES, 'dialog_entity', 'dialog_entity_name'):
+        cursor.execute(f'DELETE FROM {table} WHERE world_name = ?', (world_name,))
+
+    # world_dialog_ad 트리거가 world_dialog_fts5에서도 지웁니다.
+    cursor.execute('DELETE FROM world_dialog WHERE world_name = ?', (world_name,))
+    delete_archive_blocks(cursor, world_name)
+
+
+def _import_world_data(cursor, world_name: str, header: dict, records, replace: bool) -> dict:
+    """shard에 world의 행을 하나의 트랜잭션으로 넣습니다. 끝 줄의 행 수와 다르면 아무것도 넣지 않습니다."""
+    cursor.execute('BEGIN IMMEDIATE')
+
+    if replace:
+        _delete_world_data(cursor, world_name)
+    elif cursor.execute('SELECT 1 FROM character WHERE world_name = ? LIMIT 1', (world_name,)).fetchone() \
+            or cursor.execute('SELECT 1 FROM world_dialog WHERE world_name = ? LIMIT 1', (world_name,)).fetchone():
+        raise ValueError(f'world already has data: {world_name}')
+
+    # dialog id는 DB 전체에서 고유하므로, 가져온 id가 기존 id보다 크도록 같은 간격만큼 옮겨 순서를 유지합니다.
+    first_id = header['dialog_id_range'][0]
+    current_max_id = cursor.execute(
+        """
+            SELECT max(coalesce((SELECT max(id) FROM world_dialog), 0),
+                       coalesce((SELECT max(last_id) FROM world_dialog_archive), 0))
+        """
+    ).fetchone()[0]
+    offset = max(0, current_max_id + 1 - first_id) if first_id is not None else 0
+
+    # 행마다 트리거로 FTS에 넣는 대신, 이 트랜잭션에서만 트리거를 빼고 마지막에 한 번에 색인합니다.
+    # DDL도 트랜잭션에 포함되므로 실패하면 트리거도 함께 되돌아가며, 다른 연결은 쓰기 잠금 때문에 그 사이에 쓰지 못합니다.
+    insert_trigger_sql = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'world_dialog_ai'"
+    ).fetchone()[0]
+    cursor.execute('DROP TRIGGER world_dialog_ai')
+
+    columns = {table: _table_columns(cursor, table) for table in WORLD_TABLES}
+    counts = {'world': 1, **{table: 0 for table in (*WORLD_TABLES, 'world_dialog_archive', 'world_dialog')}}
+    end = None
+
+    table = None
+    batch: list = []
+
+    def flush():
+        if not batch:
+            return
+
+        if table == 'world_dialog':
+            cursor.executemany(
+                'INSERT INTO world_dialog (id, world_name, dialog) VALUES (?, ?, ?)',
+                [(row['id'] + offset, world_name, row['dialog']) for row in batch]
+            )
+        else:
+            _insert_rows(cursor, table, world_name, batch, columns[table])
+
+        batch.clear()
+
+    for record in records:
+        if record.get('type') == 'end':
+            end = record
+            break
+
+        if record['table'] == 'world_dialog_archive':
+            flush()
+            insert_archive_block(cursor, world_name, [(row_id + offset, dialog) for row_id, dialog in record['rows']])
+            counts['world_dialog_archive'] += 1
+            continue
+
+        if record['table'] != table:
+            flush()
+            table = record['table']
+
+            if table != 'world_dialog' and table not in WORLD_TABLES:
+                raise ValueError(f'unexpected table in export: {table}')
+
+        batch.append(record['row'])
+        counts[table] += 1
+
+        if len(batch) >= IMPORT_BATCH_ROWS:
+            flush()
+
+    flush()
+
+    if end is None or end['counts'] != counts:
+        raise ValueError(f'export file is incomplete: expected {end and end["counts"]}, read {counts}')
+
+    cursor.execute(
+        'INSERT INTO world_dialog_fts5 (rowid, world_name, dialog) SELECT id, world_name, dialog FROM world_dialog WHERE world_name = ?',
+        (world_name,)
+    )
+    cursor.execute(insert_trigger_sql)
+
+    return counts
+
+
+def _read_records(path: str):
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _write_world_row(cursor, world_row: dict):
+    names = sorted(set(world_row) & _table_columns(cursor, 'world'))
+    cursor.execute(
+        f"INSERT OR REPLACE INTO world ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+        [world_row[name] for name in names]
+    )
+
+
+def import_world(file_name: str, world_name: str | None = None, replace: bool = False) -> dict:
+    """
+    export_world로 EXPORT_DIR에 내보낸 file_name을 world_name(없으면 내보낸 world 이름)으로 가져옵니다.
+    world가 이미 있으면 replace일 때만 기존 행을 모두 지우고 바꿉니다.
+    """
+    path = _resolve(EXPORT_DIR, file_name)
+    records = _read_records(path)
+
+    header = next(records, None)
+    if header is None or header.get('type') != 'header':
+        raise ValueError(f'not a world export: {file_name}')
+    if header['format'] > EXPORT_FORMAT:
+        raise ValueError(f'unsupported export format: {header["format"]}')
+
+    world_record = next(records)
+    if world_record.get('table') != 'world':
+        raise ValueError(f'world row is missing: {file_name}')
+
+    world_name = world_name or header['world_name']
+    world_row = {**world_record['row'], 'world_name': world_name}
+
+    dialog_writer.flush_world(world_name)
+
+    with get_db_cursor() as cursor:
+        cursor.execute('BEGIN IMMEDIATE')
+
+        exists = cursor.execute('SELECT 1 FROM world WHERE world_name = ?', (world_name,)).fetchone() is not None
+        if exists and not replace:
+            raise ValueError(f'world already exists: {world_name}')
+
+        # 새 world는 catalog에 먼저 만들어야 샤딩을 사용할 때 shard가 정해집니다.
+        # 이미 있는 world의 행은 shard를 모두 바꾼 뒤에 바꾸어, 가져오기가 실패하면 world가 그대로 남게 합니다.
+        if not exists:
+            _write_world_row(cursor, world_row)
+
+            shard_name = shard_router.new_shard_name(world_name)
+            if shard_name is not None:
+                cursor.execute(
+                    'INSERT OR IGNORE INTO world_shard (world_name, shard_name) VALUES (?, ?)',
+                    (world_name, shard_name)
+                )
+
+    shard_router.forget(world_name)
+
+    try:
+        with get_db_cursor(world_name) as cursor:
+            counts = _import_world_data(cursor, world_name, header, records, replace)
+
+        if exists:
+            with get_db_cursor() as cursor:
+                _write_world_row(cursor, world_row)
+    except Exception:
+        # 새로 만든 world라면 되돌려 다시 가져올 수 있게 합니다.
+        if not exists:
+            with get_db_cursor() as cursor:
+                cursor.execute('DELETE FROM world WHERE world_name = ?', (world_name,))
+                cursor.execute('DELETE FROM world_shard WHERE world_name = ?', (world_name,))
+            shard_router.forget(world_name)
+        raise
+    finally:
+        entity_cache.invalidate(('world', world_name))
+        for table in WORLD_TABLES:
+            entity_cache.invalidate_table(table)
+        for table in ('world', *WORLD_TABLES, 'world_dialog'):
+            write_generations.bump(table, world_name)
+
+    return {'world_name': world_name, 'replaced': exists, 'counts': counts}
+
+
+def snapshot_database(name: str | None = None) -> dict:
+    """
+    catalog와 모든 shard 파일을 SQLite 백업 API로 SNAPSHOT_DIR의 새 디렉터리 name에 복사합니다.
+    SNAPSHOT_STEP_PAGES씩 나누어 복사하고 단계 사이에 잠금을 놓으므로, 서버를 멈추지 않고 일관된 파일을 얻습니다.
+    """
+    if name is None:
+        name = time.strftime('%Y%m%d-%H%M%S')
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    dest_dir = _resolve(SNAPSHOT_DIR, name)
+    os.mkdir(dest_dir)
+
+    source_paths = [os.path.abspath(DB_PATH), *sorted(glob.glob(os.path.join(shard_router.shard_dir, '*.db')))]
+    source_root = os.path.dirname(os.path.abspath(DB_PATH))
+
+    files = []
+
+    for source_path in source_paths:
+        dest_path = os.path.join(dest_dir, os.path.relpath(source_path, source_root))
+        if os.path.exists(dest_path):
+            raise FileExistsError(dest_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+        steps = 0
+
+        def progress(status, remaining, total):
+            nonlocal steps
+            steps += 1
+
+        started = time.perf_counter()
+
+        source = sqlite3.connect(f'file:{source_path}?mode=ro', uri=True)
+        dest = sqlite3.connect(dest_path)
+        try:
+            source.backup(dest, pages=SNAPSHOT_STEP_PAGES, progress=progress, sleep=SNAPSHOT_STEP_SLEEP)
+        finally:
+            dest.close()
+            source.close()
+
+        files.append({
+            'path': os.path.relpath(dest_path, dest_dir),
+            'bytes': os.path.getsize(dest_path),
+            'steps': steps,
+            'seconds': time.perf_counter() - started,
+        })
+
+    return {'name': name, 'files': files}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export')
+    export_parser.add_argument('world_name')
+    export_parser.add_argument('--file-name', default=None)
+
+    import_parser = commands.add_parser('import')
+    import_parser.add_argument('file_name')
+    import_parser.add_argument('--world-name', default=None)
+    import_parser.add_argument('--replace', action='store_true')
+
+    snapshot_parser = commands.add_parser('snapshot')
+    snapshot_parser.add_argument('--name', default=None)
+
+    args = parser.parse_args(argv)
+
+    from service.repository_service import initialize_database
+    initialize_database()
+
+    if args.command == 'export':
+        result = export_world(args.world_name, args.file_name)
+    elif args.command == 'import':
+        result = import_world(args.file_name, args.world_name, args.replace)
+    else:
+        result = snapshot_database(args.name)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
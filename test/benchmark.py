@@ -0,0 +1,260 @@
+"""
+합성된 대규모 캠페인 데이터로 server.py 툴 함수의 지연 시간과 처리량을 측정합니다.
+
+사용법:
+    python -m test.benchmark --dialogs 1000000 --characters 2000 --attitudes 10000 --concurrency 16
+
+결과는 JSON으로 출력되며(--output으로 파일 저장), 툴별 p50/p99 지연(ms), 처리량(calls/s), 최대 RSS를 포함합니다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+KOREAN_WORDS = (
+    '용사', '마을', '기사', '마법사', '드래곤', '성', '숲', '동굴', '보물', '검',
+    '방패', '물약', '여관', '상인', '왕국', '전설', '그림자', '달빛', '폭풍', '약속',
+)
+ENGLISH_WORDS = (
+    'hero', 'village', 'knight', 'wizard', 'dragon', 'castle', 'forest', 'cave', 'treasure', 'sword',
+    'shield', 'potion', 'tavern', 'merchant', 'kingdom', 'legend', 'shadow', 'moonlight', 'storm', 'promise',
+)
+WORDS = KOREAN_WORDS + ENGLISH_WORDS
+
+STAT_NAMES = (
+    'stat_charisma',
+    'stat_strength',
+    'stat_wisdom',
+    'stat_dexterity',
+    'stat_intelligence',
+    'stat_constitution',
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument('--worlds', type=int, default=4)
+    parser.add_argument('--dialogs', type=int, default=100_000, help='전체 world_dialog 행 수')
+    parser.add_argument('--characters', type=int, default=1_000, help='전체 character 수')
+    parser.add_argument('--attitudes', type=int, default=5_000, help='전체 character_attitude 수')
+    parser.add_argument('--dialog-words', type=int, default=40, help='dialog 하나의 평균 단어 수')
+
+    parser.add_argument('--iterations', type=int, default=200, help='툴마다 호출할 횟수')
+    parser.add_argument('--concurrency', type=int, default=8, help='동시에 실행할 호출 수')
+
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db-dir', default=None, help='임시 DB를 만들 디렉터리 (기본: 시스템 임시 디렉터리)')
+    parser.add_argument('--output', default=None, help='결과 JSON을 저장할 파일')
+    parser.add_argument('--keep-db', action='store_true', help='측정 후 임시 DB를 지우지 않습니다')
+
+    return parser.parse_args(argv)
+
+
+def _dialog_text(rng: random.Random, word_count: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(max(1, int(rng.gauss(word_count, word_count / 4)))))
+
+
+def generate_campaign(args, rng: random.Random) -> dict:
+    """임시 DB에 world, character, character_attitude, world_dialog를 채웁니다."""
+    from service.repository_service import get_db_cursor
+
+    world_names = [f'world_{index}' for index in range(args.worlds)]
+    characters = {world_name: [] for world_name in world_names}
+    attitudes = {world_name: [] for world_name in world_names}
+
+    started = time.perf_counter()
+
+    with get_db_cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO world (world_name, world_description) VALUES (?, ?)',
+            [(world_name, _dialog_text(rng, 20)) for world_name in world_names]
+        )
+
+        for index in range(args.characters):
+            world_name = world_names[index % args.worlds]
+            characters[world_name].append(f'{rng.choice(KOREAN_WORDS)}_{rng.choice(ENGLISH_WORDS)}_{index}')
+
+        cursor.executemany(
+            f"""
+                INSERT INTO character (world_name, character_name, characteristic, situation, {', '.join(STAT_NAMES)})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (world_name, character_name, _dialog_text(rng, 20), _dialog_text(rng, 20),
+                 *(rng.randint(1, 10) for _ in STAT_NAMES))
+                for world_name, names in characters.items()
+                for character_name in names
+            ]
+        )
+
+        pairs = set()
+        worlds_with_pairs = [world_name for world_name in world_names if len(characters[world_name]) >= 2]
+        max_pairs = sum(len(characters[name]) * (len(characters[name]) - 1) for name in worlds_with_pairs)
+
+        while len(pairs) < min(args.attitudes, max_pairs):
+            world_name = rng.choice(worlds_with_pairs)
+            character_name, target_character_name = rng.sample(characters[world_name], 2)
+            pairs.add((world_name, character_name, target_character_name))
+
+        for world_name, character_name, target_character_name in pairs:
+            attitudes[world_name].append((character_name, target_character_name))
+
+        cursor.executemany(
+            """
+                INSERT INTO character_attitude (world_name, character_name, target_character_name, attitude)
+                VALUES (?, ?, ?, ?)
+            """,
+            [(*pair, _dialog_text(rng, 8)) for pair in pairs]
+        )
+
+    # 대량의 dialog는 트랜잭션을 나누어 넣습니다. FTS 색인은 트리거로 함께 채워집니다.
+    batch_size = 10_000
+    for offset in range(0, args.dialogs, batch_size):
+        with get_db_cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO world_dialog (world_name, dialog) VALUES (?, ?)',
+                [
+                    (world_names[index % args.worlds], _dialog_text(rng, args.dialog_words))
+                    for index in range(offset, min(offset + batch_size, args.dialogs))
+                ]
+            )
+
+    return {
+        'world_names': world_names,
+        'characters': characters,
+        'attitudes': attitudes,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def _percentile(sorted_values: list[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+
+    index = min(len(sorted_values) - 1, int(round(percentile / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def measure(call_factory, iterations: int, concurrency: int) -> dict:
+    """call_factory()가 만든 코루틴을 concurrency개씩 동시에 iterations번 실행합니다."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    response_bytes = 0
+    errors = 0
+    first_error = None
+
+    async def run_one():
+        nonlocal response_bytes, errors, first_error
+
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await call_factory()
+            except Exception as e:
+                errors += 1
+                first_error = first_error or repr(e)
+                return
+            latencies.append(time.perf_counter() - started)
+            response_bytes += len(response) if isinstance(response, str) else 0
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_one() for _ in range(iterations)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    return {
+        'calls': iterations,
+        'errors': errors,
+        'first_error': first_error,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+        'throughput_per_s': iterations / elapsed if elapsed > 0 else 0.0,
+        'avg_response_bytes': response_bytes / len(latencies) if latencies else 0,
+    }
+
+
+async def run_benchmarks(args, campaign: dict, rng: random.Random) -> dict:
+    import server
+
+    world_names = campaign['world_names']
+    attitude_worlds = [world_name for world_name in world_names if campaign['attitudes'][world_name]]
+
+    def random_world():
+        return rng.choice(world_names)
+
+    def attitude_call():
+        world_name = rng.choice(attitude_worlds)
+        character_name, target_character_name = rng.choice(campaign['attitudes'][world_name])
+        return server.get_character_attitude(world_name, character_name, target_character_name)
+
+    cases = {
+        'select_world_dialog': lambda: server.select_world_dialog(random_world(), rng.choice(WORDS)[:2]),
+        'select_all_before_dialogs': lambda: server.select_all_before_dialogs(random_world()),
+        'select_last_world_dialog': lambda: server.select_last_world_dialog(random_world()),
+        'insert_world_dialog': lambda: server.insert_world_dialog(random_world(), _dialog_text(rng, args.dialog_words)),
+    }
+    if attitude_worlds:
+        cases['get_character_attitude'] = attitude_call
+
+    results = {}
+    for name, call_factory in cases.items():
+        results[name] = {
+            'sequential': await measure(call_factory, args.iterations, 1),
+            'concurrent': await measure(call_factory, args.iterations, args.concurrency),
+        }
+
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    db_dir = tempfile.mkdtemp(prefix='rpg-benchmark-', dir=args.db_dir)
+    db_path = os.path.join(db_dir, 'data.db')
+
+    # service.repository_service를 import하기 전에 임시 DB를 지정해야 합니다.
+    os.environ['RPG_DB_PATH'] = db_path
+
+    campaign = generate_campaign(args, rng)
+    results = asyncio.run(run_benchmarks(args, campaign, rng))
+
+    report = {
+        'parameters': vars(args),
+        'db_path': db_path,
+        'db_bytes': sum(
+            os.path.getsize(os.path.join(db_dir, name)) for name in os.listdir(db_dir)
+        ),
+        'generate_seconds': campaign['seconds'],
+        # Linux의 ru_maxrss는 KiB 단위입니다.
+        'peak_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'tools': results,
+    }
+
+    if not args.keep_db:
+        from service.repository_service import connection_pool, engine
+
+        engine.dispose()
+        connection_pool.close_all()
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    else:
+        sys.stdout.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+import uuid
+
+import pytest
+
+# service 모듈은 import할 때 DB 경로를 읽으므로, 어떤 service보다도 먼저 임시 디렉터리로 바꿉니다.
+_data_dir = tempfile.mkdtemp(prefix='rpg-test-')
+os.environ['RPG_DB_PATH'] = os.path.join(_data_dir, 'data.db')
+
+# 직접 실행하는 부하 측정 스크립트입니다.
+collect_ignore = ['benchmark.py', 'load_test.py', 'startup_profile.py']
+
+
+def pytest_sessionfinish(session, exitstatus):
+    from service.dialog_write_behind import dialog_writer
+
+    # write-behind로 아직 기록되지 않은 dialog가 임시 디렉터리를 지운 뒤에 기록되지 않도록 먼저 닫습니다.
+    dialog_writer.close()
+    shutil.rmtree(_data_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def world_name() -> str:
+    """테스트마다 새 world를 만들어, 같은 DB를 쓰는 테스트끼리 서로의 행을 보지 않게 합니다."""
+    from service import world_service
+
+    name = f'world-{uuid.uuid4().hex[:8]}'
+    world_service.create_world(name, 'test world')
+
+    return name
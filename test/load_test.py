@@ -0,0 +1,299 @@
+"""
+HTTP(SSE) 배포 모드에 동시에 여러 플레이어를 접속시켜 지연 시간, 처리량, 오류를 측정합니다.
+
+사용법:
+    # 임시 DB로 워커 4개를 띄워 측정
+    python -m test.load_test --spawn-workers 4 --players 64 --turns 20
+
+    # 이미 실행 중인 서버(들)를 측정 (플레이어는 URL에 번갈아 배정됩니다)
+    python -m test.load_test --url http://127.0.0.1:8000/sse --url http://127.0.0.1:8001/sse --players 64
+
+플레이어 하나는 하나의 MCP 세션으로 world와 캐릭터를 만들고, 매 턴마다 dialog 저장, 검색, 행동 판정,
+인벤토리 변경을 하며, 몇 턴마다 load_game으로 게임을 다시 불러옵니다.
+마지막에 다른 워커의 세션으로 각 world를 불러와, 워커 간에 쓰기가 모두 보이는지 확인합니다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from test.benchmark import WORDS, _percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument('--url', action='append', default=[], help='SSE 엔드포인트 (여러 번 지정 가능)')
+    parser.add_argument('--spawn-workers', type=int, default=0, help='임시 DB로 띄울 워커 수')
+
+    parser.add_argument('--players', type=int, default=16, help='동시에 접속하는 플레이어 수')
+    parser.add_argument('--turns', type=int, default=10, help='플레이어마다 진행할 턴 수')
+    parser.add_argument('--load-every', type=int, default=5, help='몇 턴마다 load_game을 호출할지')
+
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='결과 JSON을 저장할 파일')
+
+    return parser.parse_args(argv)
+
+
+def _free_port_range(count: int) -> int:
+    """count개의 연속된 빈 포트 중 첫 포트를 찾습니다."""
+    for _ in range(100):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            base = probe.getsockname()[1]
+
+        if base + count >= 65535:
+            continue
+
+        try:
+            sockets = []
+            for port in range(base, base + count):
+                sock = socket.socket()
+                sockets.append(sock)
+                sock.bind(('127.0.0.1', port))
+        except OSError:
+            continue
+        finally:
+            for sock in sockets:
+                sock.close()
+
+        return base
+
+    raise RuntimeError('no free port range')
+
+
+async def _wait_ready(urls: list[str], timeout: float = 60):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+
+    async with httpx.AsyncClient() as client:
+        for url in urls:
+            ready_url = url.rsplit('/sse', 1)[0] + '/readyz'
+            while True:
+                try:
+                    if (await client.get(ready_url)).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f'{ready_url} not ready')
+                await asyncio.sleep(0.2)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.first_errors: dict[str, str] = {}
+
+    async def call(self, session, name: str, arguments: dict):
+        started = time.perf_counter()
+        error = None
+
+        try:
+            result = await session.call_tool(name, arguments)
+            if result.isError:
+                error = ' '.join(getattr(content, 'text', '') for content in result.content)
+        except Exception as e:
+            result = None
+            error = repr(e)
+
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+
+        if error is not None:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            self.first_errors.setdefault(name, error[:300])
+            return None
+
+        return result
+
+    def report(self) -> dict:
+        report = {}
+
+        for name, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            report[name] = {
+                'calls': len(latencies),
+                'errors': self.errors.get(name, 0),
+                'first_error': self.first_errors.get(name),
+                'p50_ms': _percentile(latencies, 50) * 1000,
+                'p99_ms': _percentile(latencies, 99) * 1000,
+                'max_ms': latencies[-1] * 1000,
+            }
+
+        return report
+
+
+def _text(result) -> str:
+    return result.content[0].text if result is not None and result.content else ''
+
+
+async def play(url: str, player: int, args, recorder: Recorder, run_id: str) -> str:
+    from mcp import ClientSession
+    from mcp.client.sse import sse_client
+
+    rng = random.Random(args.seed * 100_003 + player)
+    world_name = f'load_{run_id}_{player}'
+    hero, companion = f'hero_{player}', f'companion_{player}'
+
+    async with sse_client(url) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            await recorder.call(session, 'create_world', {'world_name': world_name, 'world_description': 'load test'})
+
+            for character_name in (hero, companion):
+                stats = json.loads(_text(await recorder.call(session, 'divide_character_stat', {'total_stat': 36})) or '{}')
+                await recorder.call(session, 'create_character', {
+                    'world_name': world_name,
+                    'character_name': character_name,
+                    'characteristic': 'load test',
+                    'situation': 'load test',
+                    **stats,
+                })
+
+            await recorder.call(session, 'add_inventory_item', {
+                'world_name': world_name, 'character_name': hero, 'item_name': 'potion', 'count': args.turns,
+                'item_description': 'heals',
+            })
+
+            for turn in range(args.turns):
+                dialog = ' '.join(rng.choice(WORDS) for _ in range(30))
+
+                await recorder.call(session, 'insert_world_dialog', {'world_name': world_name, 'dialog': dialog})
+                await recorder.call(session, 'select_world_dialog', {
+                    'world_name': world_name, 'keyword': rng.choice(WORDS)[:2],
+                })
+                await recorder.call(session, 'resolve_actions', {
+                    'world_name': world_name,
+                    'checks': [
+                        {'character_name': hero, 'req_stat_name': 'stat_strength', 'req_stat': 6},
+                        {'character_name': companion, 'req_stat_name': 'stat_wisdom', 'req_stat': 6},
+                    ],
+                })
+                await recorder.call(session, 'consume_inventory_item', {
+                    'world_name': world_name, 'character_name': hero, 'item_name': 'potion',
+                })
+                await recorder.call(session, 'get_character_attitudes', {
+                    'world_name': world_name, 'character_names': [hero, companion],
+                })
+
+                if args.load_every > 0 and (turn + 1) % args.load_every == 0:
+                    await recorder.call(session, 'load_game', {'world_name': world_name})
+
+    return world_name
+
+
+async def verify(urls: list[str], world_names: list[str], turns: int) -> dict:
+    """각 world를 만든 워커가 아닌 다른 워커에서 불러와 모든 턴이 보이는지 확인합니다."""
+    from mcp import ClientSession
+    from mcp.client.sse import sse_client
+
+    mismatches = []
+
+    async with sse_client(urls[-1]) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            for world_name in world_names:
+                result = await session.call_tool('load_game', {'world_name': world_name, 'dialog_limit': turns})
+                game = json.loads(_text(result) or '{}')
+
+                dialogs = game.get('world_dialog', {}).get('rows', [])
+                characters = game.get('character', {}).get('rows', [])
+
+                if len(dialogs) != turns or len(characters) != 2:
+                    mismatches.append(world_name)
+
+    return {'worlds': len(world_names), 'mismatches': mismatches}
+
+
+async def run(args, urls: list[str]) -> dict:
+    await _wait_ready(urls)
+
+    recorder = Recorder()
+    run_id = f'{os.getpid()}_{int(time.time())}'
+
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(
+        *(play(urls[player % len(urls)], player, args, recorder, run_id) for player in range(args.players)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+
+    world_names = [outcome for outcome in outcomes if isinstance(outcome, str)]
+    failed_players = [repr(outcome) for outcome in outcomes if not isinstance(outcome, str)]
+
+    tools = recorder.report()
+    calls = sum(tool['calls'] for tool in tools.values())
+
+    return {
+        'parameters': {**vars(args), 'urls': urls},
+        'elapsed_seconds': elapsed,
+        'calls': calls,
+        'errors': sum(tool['errors'] for tool in tools.values()),
+        'throughput_per_s': calls / elapsed if elapsed > 0 else 0.0,
+        'failed_players': failed_players[:10],
+        'tools': tools,
+        'consistency': await verify(urls, world_names, args.turns) if world_names else None,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    urls = list(args.url)
+    server = None
+    db_dir = None
+
+    if args.spawn_workers > 0:
+        db_dir = tempfile.mkdtemp(prefix='rpg-load-')
+        base_port = _free_port_range(args.spawn_workers)
+
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'service.http_service',
+                '--workers', str(args.spawn_workers),
+                '--port', str(base_port),
+                '--log-level', 'warning',
+            ],
+            cwd=ROOT,
+            env={**os.environ, 'RPG_DB_PATH': os.path.join(db_dir, 'data.db'), 'PYTHONPATH': ROOT},
+        )
+        urls += [f'http://127.0.0.1:{base_port + index}/sse' for index in range(args.spawn_workers)]
+
+    if not urls:
+        raise SystemExit('--url or --spawn-workers is required')
+
+    try:
+        report = asyncio.run(run(args, urls))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if db_dir is not None:
+            shutil.rmtree(db_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    else:
+        sys.stdout.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
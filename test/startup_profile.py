@@ -0,0 +1,147 @@
+"""
+서버의 시작 비용을 측정합니다. MCP 클라이언트는 세션마다 서버를 새로 띄우므로 cold start가 곧 첫 응답 지연입니다.
+
+사용법:
+    python -m test.startup_profile --runs 5 --top 20
+
+결과는 JSON으로 출력되며(--output으로 파일 저장), 다음을 포함합니다.
+    - import_ms: `python -X importtime -c "import server"`의 전체 import 시간
+    - packages: 최상위 패키지별 import 시간 (self 합계)
+    - modules: 누적 import 시간이 긴 모듈 top N
+    - cold_start: stdio로 서버를 띄워 initialize, 첫 툴 호출(list_worlds)까지 걸린 시간 (빈 DB / 기존 DB)
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument('--runs', type=int, default=3, help='cold start를 측정할 횟수')
+    parser.add_argument('--top', type=int, default=20, help='출력할 모듈 수')
+    parser.add_argument('--output', default=None, help='결과 JSON을 저장할 파일')
+
+    return parser.parse_args(argv)
+
+
+def _environment(db_path: str) -> dict:
+    return {**os.environ, 'RPG_DB_PATH': db_path, 'PYTHONPATH': ROOT}
+
+
+def profile_imports(db_path: str, top: int) -> dict:
+    """-X importtime 출력(stderr)을 모듈별, 최상위 패키지별로 집계합니다."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import server'],
+        cwd=ROOT,
+        env=_environment(db_path),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        self_us, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    packages = {}
+    for name, self_us, cumulative_us in modules:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    server_us = next((cumulative_us for name, self_us, cumulative_us in modules if name == 'server'), 0)
+
+    return {
+        'import_ms': server_us / 1000,
+        'packages': {
+            package: self_us / 1000
+            for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        },
+        'modules': [
+            {'module': name, 'self_ms': self_us / 1000, 'cumulative_ms': cumulative_us / 1000}
+            for name, self_us, cumulative_us in sorted(modules, key=lambda module: -module[2])[:top]
+        ],
+    }
+
+
+async def measure_cold_start(db_path: str) -> dict:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    parameters = StdioServerParameters(
+        command=sys.executable,
+        args=[os.path.join(ROOT, 'server.py')],
+        env=_environment(db_path),
+        cwd=ROOT,
+    )
+
+    started = time.perf_counter()
+
+    async with stdio_client(parameters) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            initialized = time.perf_counter()
+
+            await session.call_tool('list_worlds', {})
+            first_call = time.perf_counter()
+
+    return {
+        'initialize_ms': (initialized - started) * 1000,
+        'first_tool_call_ms': (first_call - started) * 1000,
+    }
+
+
+def _summary(samples: list[dict]) -> dict:
+    return {
+        key: {
+            'min': min(sample[key] for sample in samples),
+            'max': max(sample[key] for sample in samples),
+            'avg': sum(sample[key] for sample in samples) / len(samples),
+        }
+        for key in samples[0]
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    db_dir = tempfile.mkdtemp(prefix='rpg-startup-')
+    db_path = os.path.join(db_dir, 'data.db')
+
+    try:
+        report = {'imports': profile_imports(db_path, args.top)}
+
+        # 첫 실행은 빈 DB에 migration을 적용하고, 이후 실행은 schema 버전만 확인합니다.
+        empty_db = asyncio.run(measure_cold_start(db_path))
+        existing_db = [asyncio.run(measure_cold_start(db_path)) for _ in range(max(1, args.runs))]
+
+        report['cold_start'] = {
+            'empty_db': empty_db,
+            'existing_db': _summary(existing_db),
+        }
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    else:
+        sys.stdout.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
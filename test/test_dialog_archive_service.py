@@ -0,0 +1,53 @@
+import json
+
+from service import dialog_service
+from service.dialog_archive_service import archive_world_dialogs
+
+
+def _rows(world_name: str, **kwargs) -> list:
+    return json.loads(dialog_service.select_all_before_dialogs(world_name, limit=1000, **kwargs))['rows']
+
+
+def test_archived_dialogs_read_back_unchanged(world_name):
+    dialogs = [f'turn {index}: the party meets the dragon named Smaug' for index in range(10)]
+    dialogs[3] = 'turn 3: a quiet night at the inn'
+
+    for dialog in dialogs:
+        dialog_service.insert_world_dialog(world_name, dialog)
+
+    before = _rows(world_name)
+
+    result = archive_world_dialogs(world_name, keep_recent=2, block_rows=3)
+    assert result['rows'] == 8
+    assert result['blocks'] == 3
+
+    # 압축 전후로 같은 id와 dialog를 같은 순서로 읽어야 합니다.
+    assert _rows(world_name) == before
+    assert [row[1] for row in before] == dialogs
+
+    # 압축된 블록과 남은 행에 걸친 페이지도 이어서 읽습니다.
+    ids = [row[0] for row in before]
+    assert _rows(world_name, after_id=ids[1], before_id=ids[9]) == before[2:9]
+    assert json.loads(dialog_service.select_all_before_dialogs(world_name, before_id=ids[9], limit=2))['rows'] == before[7:9]
+
+    # 검색은 최근 dialog를 먼저, 압축된 dialog를 최신 순으로 이어서 반환합니다.
+    found = json.loads(dialog_service.select_world_dialog(world_name, 'smaug', limit=20))['rows']
+    assert [row[0] for row in found] == ids[8:] + [ids[7], ids[6], ids[5], ids[4], ids[2], ids[1], ids[0]]
+    assert all(row[1] == dialogs[ids.index(row[0])] for row in found)
+
+    inn = json.loads(dialog_service.select_world_dialog(world_name, 'inn', limit=20))['rows']
+    assert [(row[0], row[1]) for row in inn] == [(ids[3], dialogs[3])]
+
+
+def test_new_dialogs_follow_archived_ids(world_name):
+    for index in range(5):
+        dialog_service.insert_world_dialog(world_name, f'dialog {index}')
+
+    archive_world_dialogs(world_name, keep_recent=1, block_rows=2)
+    dialog_service.insert_world_dialog(world_name, 'after archive')
+
+    rows = _rows(world_name)
+    ids = [row[0] for row in rows]
+
+    assert ids == sorted(set(ids))
+    assert [row[1] for row in rows] == [f'dialog {index}' for index in range(5)] + ['after archive']
@@ -0,0 +1,58 @@
+from service import character_service, dialog_service, inventory_service
+from service.dialog_archive_service import archive_world_dialogs
+from service.dialog_entity_service import search_entities
+
+
+def _counts(world_name: str, keywords: list[str]) -> dict[str, tuple[str, int]]:
+    return {hit['keyword']: (hit['source'], hit['count']) for hit in search_entities(world_name, keywords)}
+
+
+def _setup(world_name: str):
+    character_service.create_character(world_name, '아리아', 'bard', 'at the inn', 1, 2, 3, 4, 5, 6)
+    character_service.create_character(world_name, 'Bob', 'smith', 'at the forge', 1, 2, 3, 4, 5, 6)
+    inventory_service.add_item(world_name, 'Bob', 'potion', 1)
+
+
+DIALOGS = [
+    '아리아가 노래를 불렀다',
+    '아리아에게 Bob이 다가왔다',
+    '아리아가 Bob에게 potion을 주었다',
+    'Bob drinks the potion',
+    'Bobby and the potions are elsewhere',
+    '아리아나는 다른 사람이다',
+]
+
+
+def test_hangul_particles_after_names(world_name):
+    _setup(world_name)
+    for dialog in DIALOGS:
+        dialog_service.insert_world_dialog(world_name, dialog)
+
+    assert _counts(world_name, ['아리아'])['아리아'] == ('entity', 3)
+
+
+def test_hangul_particles_after_latin_names(world_name):
+    # 새 dialog를 기록할 때의 색인과, 이미 있는 dialog를 검색할 때 채우는 색인이 같아야 합니다.
+    for dialog in DIALOGS[:3]:
+        dialog_service.insert_world_dialog(world_name, dialog)
+    _setup(world_name)
+    for dialog in DIALOGS[3:]:
+        dialog_service.insert_world_dialog(world_name, dialog)
+
+    assert _counts(world_name, ['Bob', 'potion']) == {
+        'Bob': ('entity', 3),
+        'potion': ('entity', 2),
+    }
+
+
+def test_backfill_reads_archived_latin_names_with_particles(world_name):
+    for dialog in DIALOGS:
+        dialog_service.insert_world_dialog(world_name, dialog)
+    archive_world_dialogs(world_name, keep_recent=1, block_rows=2)
+    _setup(world_name)
+
+    assert _counts(world_name, ['Bob', 'potion', '아리아']) == {
+        'Bob': ('entity', 3),
+        'potion': ('entity', 2),
+        '아리아': ('entity', 3),
+    }
@@ -0,0 +1,81 @@
+import json
+
+from service import dialog_service, world_service
+
+
+def _insert(world_name: str, dialogs: list[str]):
+    for dialog in dialogs:
+        dialog_service.insert_world_dialog(world_name, dialog)
+
+
+def _read_pages(world_name: str, before_id: int | None = None, between_pages=None) -> list[list[int]]:
+    """next_cursor를 따라 끝까지 읽은 페이지별 id를 반환합니다. between_pages는 다음 페이지를 읽기 전마다 불립니다."""
+    pages = []
+    after_id = None
+
+    while True:
+        page = json.loads(dialog_service.select_all_before_dialogs(world_name, after_id, before_id, limit=3))
+
+        page_ids = [row[0] for row in page['rows']]
+        assert page_ids == sorted(page_ids)
+        pages.append(page_ids)
+
+        if page['next_cursor'] is None:
+            return pages
+
+        if between_pages is not None:
+            between_pages()
+
+        after_id, before_id = dialog_service.decode_dialog_cursor(page['next_cursor'])
+
+
+def _all_ids(world_name: str) -> list[int]:
+    page = json.loads(dialog_service.select_all_before_dialogs(world_name, limit=1000))
+    return [row[0] for row in page['rows']]
+
+
+def test_ascending_cursor_is_stable_across_inserts(world_name):
+    _insert(world_name, [f'old {index}' for index in range(8)])
+
+    # 페이지 사이에 추가된 dialog는 뒤쪽에 이어서 나올 뿐, 이미 읽은 행이 다시 나오거나 빠지지 않아야 합니다.
+    pages = _read_pages(world_name, between_pages=lambda: _insert(world_name, ['new']))
+    ids = [row_id for page in pages for row_id in page]
+
+    assert len(pages) > 3
+    assert ids == _all_ids(world_name)
+
+
+def test_descending_cursor_is_stable_across_inserts(world_name):
+    _insert(world_name, [f'old {index}' for index in range(8)])
+    old_ids = _all_ids(world_name)
+
+    # 거꾸로 읽는 중에 추가된 dialog는 처음의 before_id보다 크므로 나오지 않아야 합니다.
+    pages = _read_pages(world_name, before_id=old_ids[-1] + 1, between_pages=lambda: _insert(world_name, ['new']))
+    ids = [row_id for page in reversed(pages) for row_id in page]
+
+    assert pages[0] == old_ids[-3:]
+    assert ids == old_ids
+    assert len(_all_ids(world_name)) == len(old_ids) + len(pages) - 1
+
+
+def test_world_name_with_apostrophe(world_name):
+    name = f"{world_name}'s Keep"
+    world_service.create_world(name, 'apostrophe')
+
+    dialog_service.insert_world_dialog(name, "the keeper's dragon wakes")
+
+    assert [row[2] for row in dialog_service.select_last_world_dialog(name)] == ["the keeper's dragon wakes"]
+    assert [row[2] for row in dialog_service.search_world_dialog(name, 'dragon')] == ["the keeper's dragon wakes"]
+
+    page = json.loads(dialog_service.select_all_before_dialogs(name))
+    assert [row[1] for row in page['rows']] == ["the keeper's dragon wakes"]
+
+
+def test_world_name_is_not_interpolated_into_sql(world_name):
+    dialog_service.insert_world_dialog(world_name, 'secret plans')
+
+    injected = "x' OR '1'='1"
+
+    assert dialog_service.select_last_world_dialog(injected) == []
+    assert dialog_service.search_world_dialog(injected, 'secret') == []
+    assert json.loads(dialog_service.select_all_before_dialogs(injected))['rows'] == []
@@ -0,0 +1,80 @@
+import pytest
+
+from service import inventory_service
+from service.repository_service import get_db_cursor
+
+
+def _count(world_name: str, character_name: str, item_name: str) -> int | None:
+    with get_db_cursor(world_name) as cursor:
+        row = cursor.execute(
+            """
+                SELECT item_count FROM character_inventory
+                WHERE world_name = ? AND character_name = ? AND item_name = ?
+            """,
+            (world_name, character_name, item_name)
+        ).fetchone()
+
+    return row[0] if row else None
+
+
+@pytest.mark.parametrize('count', [0, -1])
+def test_counts_must_be_positive(world_name, count):
+    inventory_service.add_item(world_name, 'alice', 'potion', 2)
+
+    with pytest.raises(ValueError, match='count must be positive'):
+        inventory_service.add_item(world_name, 'alice', 'potion', count)
+    with pytest.raises(ValueError, match='count must be positive'):
+        inventory_service.consume_item(world_name, 'alice', 'potion', count)
+    with pytest.raises(ValueError, match='count must be positive'):
+        inventory_service.transfer_item(world_name, 'alice', 'bob', 'potion', count)
+
+    assert _count(world_name, 'alice', 'potion') == 2
+    assert _count(world_name, 'bob', 'potion') is None
+
+
+def test_cannot_consume_more_than_held(world_name):
+    assert inventory_service.add_item(world_name, 'alice', 'potion', 2)['item_count'] == 2
+
+    with pytest.raises(ValueError, match='alice has 2 potion, cannot consume 3'):
+        inventory_service.consume_item(world_name, 'alice', 'potion', 3)
+    with pytest.raises(ValueError, match='alice has 0 elixir, cannot consume 1'):
+        inventory_service.consume_item(world_name, 'alice', 'elixir')
+    with pytest.raises(ValueError, match='alice has 2 potion, cannot consume 5'):
+        inventory_service.transfer_item(world_name, 'alice', 'bob', 'potion', 5)
+
+    assert _count(world_name, 'alice', 'potion') == 2
+    assert _count(world_name, 'bob', 'potion') is None
+
+    assert inventory_service.consume_item(world_name, 'alice', 'potion', 2)['item_count'] == 0
+
+
+def test_transfer_moves_items(world_name):
+    inventory_service.add_item(world_name, 'alice', 'arrow', 10, 'wooden arrow')
+
+    result = inventory_service.transfer_item(world_name, 'alice', 'bob', 'arrow', 4)
+
+    assert result['from']['item_count'] == 6
+    assert result['to']['item_count'] == 4
+    assert (_count(world_name, 'alice', 'arrow'), _count(world_name, 'bob', 'arrow')) == (6, 4)
+
+
+def test_apply_deltas_is_all_or_nothing(world_name):
+    inventory_service.add_item(world_name, 'alice', 'gold', 5)
+
+    with pytest.raises(ValueError, match='alice has 3 gold, cannot consume 4'):
+        inventory_service.apply_deltas(world_name, [
+            {'character_name': 'alice', 'item_name': 'gold', 'delta': -2},
+            {'character_name': 'bob', 'item_name': 'gold', 'delta': 2},
+            {'character_name': 'alice', 'item_name': 'gold', 'delta': -4},
+        ])
+
+    # 마지막 delta가 실패했으므로 앞의 delta도 적용되지 않아야 합니다.
+    assert _count(world_name, 'alice', 'gold') == 5
+    assert _count(world_name, 'bob', 'gold') is None
+
+    result = inventory_service.apply_deltas(world_name, [
+        {'character_name': 'alice', 'item_name': 'gold', 'delta': -2},
+        {'character_name': 'bob', 'item_name': 'gold', 'delta': 2},
+    ])
+
+    assert [item['item_count'] for item in result] == [3, 2]
@@ -0,0 +1,110 @@
+import sqlite3
+
+from sqlalchemy import create_engine
+from sqlmodel import SQLModel
+
+from service.connection_pool import ConnectionPool
+from service.fts_query import column_phrase, scoped_match
+from service.migration_service import MIGRATIONS, SCHEMA_VERSION, get_schema_version, migrate
+
+
+def _create_baseline_database(path: str):
+    """이 저장소의 첫 버전(schema 버전 0)이 만들던 것과 같은 DB를 만듭니다."""
+    engine = create_engine(f'sqlite:///{path}')
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS world_dialog (
+            id INTEGER PRIMARY KEY,
+            world_name TEXT,
+            dialog TEXT
+        );
+
+        CREATE VIRTUAL TABLE IF NOT EXISTS world_dialog_fts5 USING fts5(
+            dialog,
+            tokenize='unicode61',
+            content=world_dialog,
+            content_rowid=id
+        );
+
+        CREATE TRIGGER IF NOT EXISTS world_dialog_ai AFTER INSERT ON world_dialog BEGIN
+            INSERT INTO world_dialog_fts5(rowid, dialog) VALUES (new.id, new.dialog);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS world_dialog_ad AFTER DELETE ON world_dialog BEGIN
+            DELETE FROM world_dialog_fts5 WHERE rowid = old.id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS world_dialog_au AFTER UPDATE ON world_dialog BEGIN
+            UPDATE world_dialog_fts5 SET dialog = new.dialog WHERE rowid = old.id;
+        END;
+
+        INSERT INTO world (world_name, world_description) VALUES ('old world', 'before migrations');
+        INSERT INTO world_dialog (world_name, dialog) VALUES ('old world', 'the dragon sleeps');
+        INSERT INTO world_dialog (world_name, dialog) VALUES ('other world', 'the dragon wakes');
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def test_baseline_database_upgrades_to_current_schema(tmp_path):
+    path = str(tmp_path / 'baseline.db')
+    _create_baseline_database(path)
+
+    pool = ConnectionPool(path)
+    conn = pool.connection()
+
+    assert get_schema_version(conn) == 0
+    assert migrate(conn) == [version for version, description, upgrade in MIGRATIONS]
+    assert get_schema_version(conn) == SCHEMA_VERSION == MIGRATIONS[-1][0]
+
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+    # world_name을 색인하도록 다시 만든 FTS 테이블이 기존 dialog로 재구축되어 있어야 합니다.
+    fts_sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'world_dialog_fts5'"
+    ).fetchone()[0]
+    assert 'world_name' in fts_sql
+
+    rows = conn.execute(
+        'SELECT rowid, world_name FROM world_dialog_fts5 WHERE world_dialog_fts5 MATCH ?',
+        (scoped_match('old world', column_phrase('dialog', 'dragon')),)
+    ).fetchall()
+    assert rows == [(1, 'old world')]
+
+    # 색인이 world_dialog와 어긋나 있으면 integrity-check가 오류를 냅니다.
+    conn.execute("INSERT INTO world_dialog_fts5 (world_dialog_fts5) VALUES ('integrity-check')")
+
+    # 이후 migration이 추가한 테이블과 트리거도 모두 있어야 합니다.
+    names = {row[0] for row in conn.execute('SELECT name FROM sqlite_master')}
+    assert {
+        'world_dialog_ai', 'world_dialog_ad', 'world_dialog_au',
+        'world_shard', 'world_dialog_archive', 'world_dialog_archive_fts5',
+        'dialog_entity', 'dialog_entity_name',
+    } <= names
+
+    # 새로 넣은 dialog는 트리거로 world_name과 함께 색인됩니다.
+    conn.execute("INSERT INTO world_dialog (world_name, dialog) VALUES ('old world', 'a dragon returns')")
+    conn.commit()
+    assert conn.execute(
+        'SELECT count(*) FROM world_dialog_fts5 WHERE world_dialog_fts5 MATCH ?',
+        (scoped_match('old world', column_phrase('dialog', 'dragon')),)
+    ).fetchone()[0] == 2
+
+    pool.close_all()
+
+
+def test_migrate_is_idempotent(tmp_path):
+    path = str(tmp_path / 'current.db')
+    _create_baseline_database(path)
+
+    pool = ConnectionPool(path)
+    conn = pool.connection()
+
+    migrate(conn)
+    assert migrate(conn) == []
+    assert get_schema_version(conn) == SCHEMA_VERSION
+
+    pool.close_all()
@@ -0,0 +1,34 @@
+import sqlite3
+
+from service import character_service, dialog_service, process_sync
+from service.entity_cache import entity_cache
+from service.repository_service import shard_router
+
+
+def test_own_writes_keep_cached_rows_and_foreign_writes_clear_them(world_name):
+    character_service.create_character(world_name, 'Bob', 'brave', 'at the inn', 1, 2, 3, 4, 5, 6)
+    cache_key = ('character', world_name, 'Bob')
+
+    process_sync.sync_caches()
+    character_service.get_character(world_name, 'Bob')
+
+    # 이 프로세스의 dialog 기록은 캐시한 캐릭터를 지우지 않아야 합니다.
+    for index in range(3):
+        dialog_service.insert_world_dialog(world_name, f'turn {index}')
+        process_sync.sync_caches()
+
+        assert entity_cache.get(cache_key)[0]
+
+    # 다른 프로세스의 commit은 감지하여 캐시를 비웁니다.
+    conn = sqlite3.connect(shard_router.shard(world_name).db_path)
+    conn.execute(
+        "UPDATE character SET situation = 'in the woods' WHERE world_name = ? AND character_name = 'Bob'",
+        (world_name,)
+    )
+    conn.commit()
+    conn.close()
+
+    process_sync.sync_caches()
+
+    assert not entity_cache.get(cache_key)[0]
+    assert character_service.get_character(world_name, 'Bob')['situation'] == 'in the woods'
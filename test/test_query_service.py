@@ -0,0 +1,91 @@
+import json
+import uuid
+
+import pytest
+
+from service import dialog_service, query_service, world_service
+from service.repository_service import get_read_only_cursor, get_shard_name, shard_router
+
+
+@pytest.fixture
+def sharded_world_name(monkeypatch) -> str:
+    """샤딩을 켠 상태에서 만들어 자신의 shard를 배정받은 world입니다."""
+    monkeypatch.setattr(shard_router, 'enabled', True)
+
+    name = f'world-{uuid.uuid4().hex[:8]}'
+    world_service.create_world(name, 'sharded world')
+    assert get_shard_name(name) != 'main'
+
+    return name
+
+
+def _select(sql: str, **kwargs) -> list:
+    return json.loads(query_service.select_data(sql, **kwargs))['rows']
+
+
+def test_cached_select_sees_new_rows_with_multi_column_select_list(world_name):
+    dialog_service.insert_world_dialog(world_name, 'first')
+
+    sql = f"SELECT id, dialog FROM world_dialog WHERE world_name = '{world_name}' ORDER BY id"
+    assert [row[1] for row in _select(sql)] == ['first']
+
+    # 쉼표로 나열한 컬럼을 테이블로 읽지 않아야 world_dialog에 대한 쓰기로 캐시가 무효화됩니다.
+    dialog_service.insert_world_dialog(world_name, 'second')
+    assert [row[1] for row in _select(sql)] == ['first', 'second']
+
+
+def test_read_tables_come_from_sqlite():
+    assert query_service._read_tables('SELECT id, dialog FROM world_dialog') == {'world_dialog'}
+    assert query_service._read_tables(
+        'WITH recent AS (SELECT world_name, dialog FROM world_dialog) '
+        'SELECT c.character_name, (SELECT count(*) FROM character_inventory) '
+        'FROM character c, recent r WHERE c.world_name = r.world_name'
+    ) == {'world_dialog', 'character', 'character_inventory'}
+
+
+def test_table_aliases_skip_select_list():
+    assert query_service._table_aliases(
+        'SELECT c.id, i.item_name FROM character AS c, character_inventory i JOIN world w ON w.world_name = c.world_name'
+    ) == {'c': 'character', 'i': 'character_inventory', 'w': 'world'}
+    assert query_service._table_aliases('SELECT id, dialog FROM world_dialog WHERE id > 1') == {
+        'world_dialog': 'world_dialog'
+    }
+
+
+def test_sharded_upsert_requires_world(sharded_world_name):
+    sql = (
+        'INSERT INTO character_inventory (world_name, character_name, item_name, item_description, item_count) '
+        f"VALUES ('{sharded_world_name}', 'Bob', 'sword', 'sharp', 1)"
+    )
+
+    # VALUES의 world_name으로는 shard를 정할 수 없으므로 catalog에 쓰지 않고 거부합니다.
+    with pytest.raises(ValueError, match='pass world_name'):
+        query_service.upsert_data(sql)
+
+    with get_read_only_cursor() as cursor:
+        assert cursor.execute(
+            'SELECT count(*) FROM character_inventory WHERE world_name = ?',
+            (sharded_world_name,)
+        ).fetchone()[0] == 0
+
+    query_service.upsert_data(sql, world_name=sharded_world_name)
+
+    rows = _select(
+        'SELECT character_name, item_name, item_count FROM character_inventory',
+        world_name=sharded_world_name
+    )
+    assert rows == [['Bob', 'sword', 1]]
+
+
+def test_sharded_select_requires_world(sharded_world_name):
+    dialog_service.insert_world_dialog(sharded_world_name, 'in the shard')
+
+    with pytest.raises(ValueError, match='pass world_name'):
+        query_service.select_data('SELECT id, dialog FROM world_dialog ORDER BY id')
+
+    # world_name 조건이 하나뿐이면 그 world의 shard에서 읽습니다.
+    sql = f"SELECT id, dialog FROM world_dialog WHERE world_name = '{sharded_world_name}'"
+    assert [row[1] for row in _select(sql)] == ['in the shard']
+
+    # world와 상관없는 catalog 테이블은 그대로 읽습니다.
+    assert _select(f"SELECT world_name FROM world WHERE world_name = '{sharded_world_name}'") == [[sharded_world_name]]